@@ -1,13 +1,36 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
-from src.api.routes.covid_routes import covid_routes
+from src.api.routes.covid_routes import collect_metrics, covid_routes, dataset_watcher, query_cache
+from src.api.utils.compression import register_compression
+from src.api.utils.json_provider import FastJSONProvider
+from src.utils.logger import get_logger
+from src.utils.metrics import metrics_response, register_metrics, registry
+from src.utils.profiler import RequestProfiler
 import config
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+# Enregistré en premier : le profil couvre aussi les hooks des autres extensions
+profiler = RequestProfiler(
+    config.Config.PROFILING_FOLDER,
+    sample_rate=config.Config.PROFILING_SAMPLE_RATE,
+    mode=config.Config.PROFILING_MODE,
+    token=config.Config.PROFILING_TOKEN,
+    max_files=config.Config.PROFILING_MAX_FILES,
+    interval=config.Config.PROFILING_INTERVAL
+)
+profiler.register(app)
 CORS(app)
+register_compression(app, config.Config.COMPRESSION_MIN_SIZE, config.Config.COMPRESSION_LEVEL)
+if config.Config.METRICS_ENABLED:
+    register_metrics(app, get_logger(__name__))
+    registry.add_collector(collect_metrics)
 
 app.register_blueprint(covid_routes, url_prefix='/api')
 
+if config.Config.DATASET_WATCH_ENABLED:
+    app.before_request(dataset_watcher.ensure_started)
+
 @app.route('/health')
 def health():
     return {
@@ -15,6 +38,23 @@ def health():
         'message': 'API is running'
     }
 
+@app.route('/metrics')
+def metrics():
+    if not config.Config.METRICS_ENABLED:
+        return jsonify({'error': 'Métriques désactivées'}), 404
+    return metrics_response()
+
+@app.route('/admin/cache/stats')
+def cache_stats():
+    return jsonify({'query_cache': query_cache.stats()})
+
+@app.route('/admin/cache/clear', methods=['POST'])
+def cache_clear():
+    if not config.Config.DEBUG:
+        return jsonify({'error': 'Disponible uniquement en développement'}), 403
+    query_cache.clear()
+    return jsonify({'status': 'cleared'})
+
 if __name__ == '__main__':
     config = config.Config
     app.run(debug=config.DEBUG, port=config.PORT)
\ No newline at end of file
@@ -0,0 +1,73 @@
+import json
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+BASELINE_FOLDER = Path(__file__).parent / "baselines"
+
+Results = Dict[str, Dict[str, Dict[str, Any]]]
+
+def environment() -> Dict[str, str]:
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'created': datetime.now().isoformat(timespec='seconds')
+    }
+
+def save_baseline(path: Path, results: Results, meta: Optional[Dict[str, Any]] = None):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {'meta': dict(environment(), **(meta or {})), 'results': results}
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding='utf-8')
+
+def load_baseline(path: Path) -> Optional[Dict[str, Any]]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+def find_regressions(results: Results, baseline: Results, metrics: List[Tuple[str, float]],
+                     threshold: float, higher_is_better: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    # metrics : (nom de la mesure, écart absolu minimal) pour ignorer le bruit des mesures très courtes
+    # higher_is_better : mesures dont la baisse est une régression (débit)
+    regressions = []
+    for group, entries in results.items():
+        for name, current in entries.items():
+            previous = baseline.get(group, {}).get(name)
+            if previous is None:
+                continue
+            for metric, min_delta in metrics:
+                before, after = previous.get(metric), current.get(metric)
+                if not before or after is None:
+                    continue
+                if metric in higher_is_better:
+                    if not after:
+                        continue
+                    ratio, delta = before / after, before - after
+                else:
+                    ratio, delta = after / before, after - before
+                if ratio > 1 + threshold and delta > min_delta:
+                    regressions.append({
+                        'group': group, 'name': name, 'metric': metric,
+                        'baseline': before, 'current': after, 'ratio': round(ratio, 3)
+                    })
+    return regressions
+
+def print_regressions(regressions: List[Dict[str, Any]], threshold: float, stream=sys.stdout):
+    if not regressions:
+        print(f"Aucune régression au-delà de {threshold:.0%}", file=stream)
+        return
+    print(f"{len(regressions)} régression(s) au-delà de {threshold:.0%}:", file=stream)
+    for item in regressions:
+        print(
+            f"  {item['group']}/{item['name']} {item['metric']}: "
+            f"{item['baseline']:.6g} → {item['current']:.6g} (x{item['ratio']})",
+            file=stream
+        )
@@ -0,0 +1,150 @@
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+import numpy as np
+import pandas as pd
+
+MODERN_COLUMNS = [
+    'FIPS', 'Admin2', 'Province_State', 'Country_Region', 'Last_Update', 'Lat', 'Long_',
+    'Confirmed', 'Deaths', 'Recovered', 'Active', 'Combined_Key', 'Incident_Rate', 'Case_Fatality_Ratio'
+]
+LEGACY_COLUMNS = ['Province/State', 'Country/Region', 'Last Update', 'Confirmed', 'Deaths', 'Recovered']
+
+SCHEMAS = ['modern', 'legacy', 'mixed']
+
+@dataclass(frozen=True)
+class GeneratorSpec:
+    days: int = 30
+    countries: int = 50
+    provinces: int = 0
+    province_countries: int = 0
+    admin2: int = 0
+    start: str = '2020-03-01'
+    schema: str = 'modern'
+    missing_rate: float = 0.0
+    blank_recovered: bool = False
+    seed: int = 42
+
+@dataclass
+class _Region:
+    country: str
+    province: str
+    admin2: str
+    fips: str
+    weight: float
+
+def country_names(count: int) -> List[str]:
+    return [f"Country {position:03d}" for position in range(1, count + 1)]
+
+def generate_reports(folder: Path, spec: GeneratorSpec) -> List[Path]:
+    if spec.schema not in SCHEMAS:
+        raise ValueError(f"Schéma inconnu: {spec.schema} ({', '.join(SCHEMAS)})")
+    
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = np.random.RandomState(spec.seed)
+    regions = _regions(spec)
+    dates = pd.date_range(spec.start, periods=spec.days, freq='D')
+    
+    # Cumuls monotones par région : croissance aléatoire mais reproductible à graine égale
+    growth = rng.poisson(lam=np.array([region.weight for region in regions]) * 50, size=(spec.days, len(regions)))
+    confirmed = np.cumsum(growth, axis=0) + 1
+    deaths = (confirmed * rng.uniform(0.005, 0.03, size=len(regions))).astype(np.int64)
+    recovered = (confirmed * np.linspace(0.1, 0.9, spec.days)[:, None]).astype(np.int64)
+    present = rng.uniform(size=(spec.days, len(regions))) >= spec.missing_rate
+    legacy_days = spec.days // 3 if spec.schema == 'mixed' else (spec.days if spec.schema == 'legacy' else 0)
+    
+    paths = []
+    for day, date in enumerate(dates):
+        rows = np.flatnonzero(present[day])
+        if day < legacy_days:
+            df = _legacy_frame(regions, rows, date, confirmed[day], deaths[day], recovered[day])
+        else:
+            df = _modern_frame(regions, rows, date, confirmed[day], deaths[day], recovered[day], spec.blank_recovered)
+        path = folder / f"{date.strftime('%m-%d-%Y')}.csv"
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+def _regions(spec: GeneratorSpec) -> List[_Region]:
+    regions = []
+    for position, country in enumerate(country_names(spec.countries)):
+        weight = 1.0 / (1 + position % 17)
+        if position == 0 and spec.admin2 > 0:
+            # Premier pays découpé en comtés, comme les États-Unis dans les rapports JHU
+            for county in range(spec.admin2):
+                state = f"State {county % 50 + 1:02d}"
+                regions.append(_Region(country, state, f"County {county + 1:04d}", f"{10000 + county}", weight / spec.admin2))
+        elif position < spec.province_countries and spec.provinces > 0:
+            for province in range(spec.provinces):
+                regions.append(_Region(country, f"Province {province + 1:02d}", '', '', weight / spec.provinces))
+        else:
+            regions.append(_Region(country, '', '', '', weight))
+    return regions
+
+def _modern_frame(regions: List[_Region], rows: np.ndarray, date: pd.Timestamp,
+                  confirmed: np.ndarray, deaths: np.ndarray, recovered: np.ndarray,
+                  blank_recovered: bool = False) -> pd.DataFrame:
+    selected = [regions[row] for row in rows]
+    confirmed, deaths, recovered = confirmed[rows], deaths[rows], recovered[rows]
+    # Rapports récents : Recovered et Active laissés vides, lus comme entiers nullables
+    recovered = np.full(len(rows), np.nan) if blank_recovered else recovered
+    return pd.DataFrame({
+        'FIPS': [region.fips for region in selected],
+        'Admin2': [region.admin2 for region in selected],
+        'Province_State': [region.province for region in selected],
+        'Country_Region': [region.country for region in selected],
+        'Last_Update': (date + pd.Timedelta(hours=28, minutes=21)).strftime('%Y-%m-%d %H:%M:%S'),
+        'Lat': np.round(np.linspace(-50, 60, len(rows)), 4),
+        'Long_': np.round(np.linspace(-120, 150, len(rows)), 4),
+        'Confirmed': confirmed,
+        'Deaths': deaths,
+        'Recovered': recovered,
+        'Active': confirmed - deaths - recovered,
+        'Combined_Key': [', '.join(part for part in (region.admin2, region.province, region.country) if part) for region in selected],
+        'Incident_Rate': np.round(confirmed / 1000.0, 6),
+        'Case_Fatality_Ratio': np.round(100.0 * deaths / np.maximum(confirmed, 1), 6)
+    }, columns=MODERN_COLUMNS)
+
+def _legacy_frame(regions: List[_Region], rows: np.ndarray, date: pd.Timestamp,
+                  confirmed: np.ndarray, deaths: np.ndarray, recovered: np.ndarray) -> pd.DataFrame:
+    # Rapports du début 2020 : séparateurs « / », une ligne par province sans comtés ni colonne Active
+    selected = [regions[row] for row in rows]
+    df = pd.DataFrame({
+        'Province/State': [region.province for region in selected],
+        'Country/Region': [region.country for region in selected],
+        'Confirmed': confirmed[rows],
+        'Deaths': deaths[rows],
+        'Recovered': recovered[rows]
+    })
+    df = df.groupby(['Province/State', 'Country/Region'], sort=False).sum().reset_index()
+    df['Last Update'] = (date + pd.Timedelta(hours=23, minutes=43)).strftime('%Y-%m-%dT%H:%M:%S')
+    return df[LEGACY_COLUMNS]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère des rapports quotidiens synthétiques au format JHU")
+    parser.add_argument('folder', type=Path)
+    parser.add_argument('--days', type=int, default=GeneratorSpec.days)
+    parser.add_argument('--countries', type=int, default=GeneratorSpec.countries)
+    parser.add_argument('--provinces', type=int, default=GeneratorSpec.provinces)
+    parser.add_argument('--province-countries', type=int, default=GeneratorSpec.province_countries)
+    parser.add_argument('--admin2', type=int, default=GeneratorSpec.admin2)
+    parser.add_argument('--start', default=GeneratorSpec.start)
+    parser.add_argument('--schema', choices=SCHEMAS, default=GeneratorSpec.schema)
+    parser.add_argument('--missing-rate', type=float, default=GeneratorSpec.missing_rate)
+    parser.add_argument('--blank-recovered', action='store_true')
+    parser.add_argument('--seed', type=int, default=GeneratorSpec.seed)
+    args = parser.parse_args(argv)
+    
+    spec = GeneratorSpec(
+        days=args.days, countries=args.countries, provinces=args.provinces,
+        province_countries=args.province_countries, admin2=args.admin2, start=args.start,
+        schema=args.schema, missing_rate=args.missing_rate,
+        blank_recovered=args.blank_recovered, seed=args.seed
+    )
+    paths = generate_reports(args.folder, spec)
+    print(f"{len(paths)} fichiers générés dans {args.folder}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from bench.baseline import BASELINE_FOLDER, find_regressions, load_baseline, print_regressions, save_baseline
+from bench.generator import generate_reports
+from bench.micro import TIERS
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+ROUTES = ['global', 'top-countries', 'country', 'filtered']
+DEFAULT_MIX = 'global=2,top-countries=2,country=4,filtered=2'
+DEFAULT_THRESHOLD = 0.25
+
+TOP_METRICS = ['total_cases', 'total_deaths', 'new_cases']
+TOP_LIMITS = [5, 10, 20]
+TIMELINE_DAYS = [7, 30, 90]
+
+# Écart absolu minimal (ms, req/s) pour ignorer le bruit des requêtes très courtes
+REGRESSION_METRICS = [('p50_ms', 1.0), ('p95_ms', 2.0), ('p99_ms', 5.0), ('requests_per_second', 5.0)]
+HIGHER_IS_BETTER = ['requests_per_second']
+
+Session = Callable[[str], Tuple[int, bytes]]
+Sample = Tuple[str, float, int]
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in ROUTES:
+            raise ValueError(f"Route inconnue: {name} ({', '.join(ROUTES)})")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("Le mélange de routes doit contenir au moins un poids positif")
+    return mix
+
+def plan_requests(mix: Dict[str, float], countries: List[str], dates: List[str], count: int,
+                  seed: int = 42) -> List[Tuple[str, str]]:
+    # Séquence fixée à graine égale : deux exécutions rejouent exactement les mêmes requêtes
+    rng = random.Random(seed)
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    plan = []
+    for name in rng.choices(names, weights=weights, k=count):
+        plan.append((name, _request_path(name, rng, countries, dates)))
+    return plan
+
+def _request_path(name: str, rng: random.Random, countries: List[str], dates: List[str]) -> str:
+    if name == 'global':
+        return '/api/global'
+    if name == 'top-countries':
+        return f"/api/top-countries?limit={rng.choice(TOP_LIMITS)}&metric={rng.choice(TOP_METRICS)}"
+    if name == 'country':
+        return f"/api/countries/{urllib.parse.quote(rng.choice(countries))}?days={rng.choice(TIMELINE_DAYS)}"
+    # Fenêtre aléatoire dans les dates disponibles
+    start, end = sorted(rng.sample(range(len(dates)), 2)) if len(dates) > 1 else (0, 0)
+    return f"/api/data/filtered?start_date={dates[start]}&end_date={dates[end]}"
+
+class ClientTarget:
+    def __init__(self, app):
+        self.app = app
+    
+    def session(self) -> Session:
+        # Un client de test par thread : les requêtes passent par toute la pile WSGI sans socket
+        client = self.app.test_client()
+        def send(path: str) -> Tuple[int, bytes]:
+            response = client.get(path)
+            return response.status_code, response.get_data()
+        return send
+
+class HttpTarget:
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+    
+    def session(self) -> Session:
+        def send(path: str) -> Tuple[int, bytes]:
+            try:
+                with urllib.request.urlopen(self.base_url + path, timeout=self.timeout) as response:
+                    return response.status, response.read()
+            except urllib.error.HTTPError as e:
+                return e.code, e.read()
+        return send
+
+def discover(session: Session) -> Tuple[List[str], List[str]]:
+    status, body = session('/api/countries')
+    if status != 200:
+        raise RuntimeError(f"Liste des pays indisponible (HTTP {status})")
+    countries = json.loads(body)['countries']
+    status, body = session('/api/dates/available')
+    if status != 200:
+        raise RuntimeError(f"Dates disponibles introuvables (HTTP {status})")
+    return countries, json.loads(body)['dates']
+
+def run_load(target, plan: List[Tuple[str, str]], concurrency: int = 8) -> Tuple[List[Sample], float]:
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    queue = iter(plan)
+    
+    def worker():
+        session = target.session()
+        while True:
+            with lock:
+                item = next(queue, None)
+            if item is None:
+                return
+            name, path = item
+            start = time.perf_counter()
+            try:
+                status, _ = session(path)
+            except OSError:
+                # Connexion refusée ou coupée : comptée comme erreur (statut 0)
+                status = 0
+            elapsed = time.perf_counter() - start
+            with lock:
+                samples.append((name, elapsed, status))
+    
+    threads = [threading.Thread(target=worker, name=f'load-{position}') for position in range(max(concurrency, 1))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+def summarize(samples: List[Sample], wall_seconds: float) -> Dict[str, Dict[str, Any]]:
+    groups: Dict[str, List[Sample]] = {'all': samples}
+    for sample in samples:
+        groups.setdefault(sample[0], []).append(sample)
+    
+    summary = {}
+    for name, group in groups.items():
+        if not group:
+            continue
+        latencies = np.array([elapsed for _, elapsed, _ in group]) * 1000
+        errors = sum(1 for _, _, status in group if status == 0 or status >= 400)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary[name] = {
+            'requests': len(group),
+            'errors': errors,
+            'error_rate': errors / len(group),
+            # Débit de la route dans le mélange, pas débit maximal de la route seule
+            'requests_per_second': len(group) / wall_seconds if wall_seconds > 0 else 0.0,
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'max_ms': float(latencies.max())
+        }
+    return summary
+
+def print_summary(label: str, summary: Dict[str, Dict[str, Any]], stream=sys.stdout):
+    print(f"{'cible':<12} {'route':<14} {'requêtes':>9} {'erreurs':>8} {'req/s':>9} "
+          f"{'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}", file=stream)
+    for name, result in summary.items():
+        print(
+            f"{label:<12} {name:<14} {result['requests']:>9} {result['error_rate']:>8.1%} "
+            f"{result['requests_per_second']:>9.1f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{result['p99_ms']:>9.2f} {result['max_ms']:>9.2f}",
+            file=stream
+        )
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(base_url: str, process: Optional[subprocess.Popen] = None, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"gunicorn s'est arrêté au démarrage (code {process.returncode})")
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=1.0):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Serveur {base_url} non disponible après {timeout:.0f}s")
+
+@contextmanager
+def gunicorn_server(workers: int, env: Dict[str, str], port: Optional[int] = None) -> Iterator[str]:
+    port = port or free_port()
+    command = [
+        sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+        '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'
+    ]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url, process)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+def load_app(overrides: Optional[Dict[str, str]] = None):
+    # Config est lue à l'import : les variables doivent être fixées avant d'importer l'application
+    os.environ.update(overrides or {})
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app import app
+    return app
+
+def run(target, label: str, mix: Dict[str, float], requests: int, concurrency: int, warmup: int,
+        seed: int = 42) -> Dict[str, Dict[str, Any]]:
+    session = target.session()
+    # La première requête construit le dataset : hors mesure
+    countries, dates = discover(session)
+    if warmup > 0:
+        run_load(target, plan_requests(mix, countries, dates, warmup, seed + 1), concurrency)
+    samples, wall_seconds = run_load(target, plan_requests(mix, countries, dates, requests, seed), concurrency)
+    summary = summarize(samples, wall_seconds)
+    print_summary(label, summary)
+    return summary
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge HTTP des routes de l'API")
+    parser.add_argument('--target', choices=['client', 'http', 'gunicorn'], default='client',
+                        help="client : client de test Flask ; http : serveur existant (--url) ; gunicorn : serveur lancé localement")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--workers', type=int, default=2, help="Workers gunicorn (cible gunicorn)")
+    parser.add_argument('--data-folder', type=Path)
+    parser.add_argument('--synthetic', choices=sorted(TIERS), help="Servir un jeu de données synthétique du palier donné")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Poids par route, ex. global=2,country=4")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', type=Path)
+    parser.add_argument('--save', action='store_true', help="Enregistrer les résultats comme nouvelle référence")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--max-error-rate', type=float, default=0.0)
+    args = parser.parse_args(argv)
+    
+    mix = parse_mix(args.mix)
+    label = f"gunicorn-{args.workers}" if args.target == 'gunicorn' else args.target
+    baseline_path = args.baseline or BASELINE_FOLDER / f"load_{args.target}.json"
+    
+    with tempfile.TemporaryDirectory(prefix='covid-load-') as tmp:
+        overrides = {'DATA_FOLDER': str(args.data_folder)} if args.data_folder else {}
+        if args.synthetic:
+            generate_reports(Path(tmp), TIERS[args.synthetic])
+            # Dossier temporaire : inutile de remplir le cache CSV avec des entrées jetables
+            overrides.update(DATA_FOLDER=tmp, CSV_CACHE_ENABLED='false')
+        
+        if args.target == 'client':
+            # Les journaux par requête fausseraient les latences mesurées
+            logging.disable(logging.WARNING)
+            summary = run(ClientTarget(load_app(overrides)), label, mix, args.requests, args.concurrency, args.warmup, args.seed)
+        elif args.target == 'gunicorn':
+            with gunicorn_server(args.workers, dict(os.environ, **overrides)) as base_url:
+                summary = run(HttpTarget(base_url), label, mix, args.requests, args.concurrency, args.warmup, args.seed)
+        else:
+            summary = run(HttpTarget(args.url), label, mix, args.requests, args.concurrency, args.warmup, args.seed)
+    
+    results = {label: summary}
+    status = 0
+    error_rate = summary['all']['error_rate']
+    if error_rate > args.max_error_rate:
+        print(f"Taux d'erreur {error_rate:.1%} au-delà de {args.max_error_rate:.1%}")
+        status = 1
+    
+    settings = {
+        'target': label, 'requests': args.requests, 'concurrency': args.concurrency,
+        'mix': mix, 'seed': args.seed, 'synthetic': args.synthetic
+    }
+    baseline = load_baseline(baseline_path)
+    if baseline is not None:
+        # Latences comparables seulement à paramètres égaux (la concurrence surtout)
+        changed = [key for key, value in settings.items() if baseline['meta'].get(key) != value]
+        if changed:
+            print(f"Attention: paramètres différents de la référence ({', '.join(changed)})")
+        regressions = find_regressions(results, baseline['results'], REGRESSION_METRICS, args.threshold, HIGHER_IS_BETTER)
+        print_regressions(regressions, args.threshold)
+        status = 1 if regressions else status
+    
+    if args.save:
+        save_baseline(baseline_path, results, settings)
+        print(f"Référence enregistrée: {baseline_path}")
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
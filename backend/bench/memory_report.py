@@ -0,0 +1,187 @@
+import argparse
+import gc
+import logging
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+import pandas as pd
+from bench.baseline import BASELINE_FOLDER, find_regressions, load_baseline, print_regressions, save_baseline
+from bench.generator import GeneratorSpec, generate_reports
+from bench.micro import TIERS
+from src.services.data_loader import DataLoader
+from src.services.data_processor import DataProcessor
+from src.services.schema import memory_footprint, unify_categories
+
+MIB = 1024 * 1024
+
+DEFAULT_BASELINE = BASELINE_FOLDER / "memory.json"
+DEFAULT_THRESHOLD = 0.2
+# Pic du pipeline ramené à 1 000 fichiers quotidiens de la taille du palier mesuré
+# (rapports JHU de data/, environ 4 000 lignes par fichier : environ 450 Mo ; rapports générés de test_bench : environ 300 Mo)
+DEFAULT_BUDGET_PER_1000_FILES = 512 * MIB
+
+REGRESSION_METRICS = [('peak_bytes', MIB), ('retained_bytes', MIB)]
+
+class MemoryTracker:
+    def __init__(self, top: int = 0):
+        self.top = top
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.max_traced = 0
+    
+    def __enter__(self) -> 'MemoryTracker':
+        tracemalloc.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        tracemalloc.stop()
+    
+    def traced(self) -> int:
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+    
+    def stage(self, name: str, function: Callable[[], Any]) -> Any:
+        # peak : mémoire supplémentaire au plus haut de l'étape ; retained : mémoire encore allouée à la fin
+        # Instantané initial pris avant la mesure : sa propre taille compte dans « avant » comme dans « après »
+        initial = _snapshot() if self.top else None
+        before = self.traced()
+        tracemalloc.reset_peak()
+        result = function()
+        peak = tracemalloc.get_traced_memory()[1]
+        after = self.traced()
+        self.max_traced = max(self.max_traced, peak)
+        
+        frames = result if isinstance(result, list) else [result]
+        entry = {
+            'rows': sum(len(frame) for frame in frames if isinstance(frame, pd.DataFrame)),
+            'frame_bytes': sum(memory_footprint(frame) for frame in frames if isinstance(frame, pd.DataFrame)),
+            'peak_bytes': peak - before,
+            'retained_bytes': after - before
+        }
+        if initial is not None:
+            statistics = _snapshot().compare_to(initial, 'lineno')
+            entry['top'] = [_format_stat(stat) for stat in statistics[:self.top]]
+        self.stages[name] = entry
+        return result
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>')
+    ])
+
+def _format_stat(stat: tracemalloc.StatisticDiff) -> str:
+    frame = stat.traceback[0]
+    return f"{Path(frame.filename).name}:{frame.lineno} {stat.size_diff / MIB:+.2f} Mo"
+
+def memory_report(folder: Path, top: int = 0) -> Dict[str, Dict[str, Any]]:
+    loader = DataLoader(folder, folder / "missing.csv")
+    processor = DataProcessor()
+    files = sorted(Path(folder).glob("*.csv"))
+    if not files:
+        raise ValueError(f"Aucun fichier CSV dans {folder}")
+    
+    with MemoryTracker(top) as tracker:
+        start = tracker.traced()
+        # Mêmes étapes que load_multiple_csv_files puis process_raw_data, isolées pour les mesurer une à une
+        frames = tracker.stage('read_csv_files', lambda: [
+            df for _, file_date, df, _ in loader._read_dated_files(files) if file_date is not None
+        ])
+        raw = tracker.stage('concat', lambda: pd.concat(unify_categories(frames), ignore_index=True))
+        del frames
+        aggregated = tracker.stage('aggregate_raw_data', lambda: processor.aggregate_raw_data(raw))
+        country_data = tracker.stage('_calculate_new_values', lambda: processor._calculate_new_values(aggregated))
+        del aggregated
+        processed = tracker.stage('finalize_country_data', lambda: processor.finalize_country_data(country_data))
+        del country_data, raw
+        retained = tracker.traced() - start
+        peak = tracker.max_traced - start
+    
+    # Chemin df.copy() : rapports déjà agrégés par pays, sans colonne Province_State ; entrée préparée hors mesure
+    by_country = loader.load_csv_files(files).drop(columns=['Province_State'])
+    with tracker:
+        tracker.stage('aggregate_copy_fallback', lambda: processor.aggregate_raw_data(by_country))
+    del by_country
+    
+    stages = tracker.stages
+    stages['total'] = {
+        'files': len(files),
+        'rows': len(processed),
+        'frame_bytes': memory_footprint(processed),
+        'peak_bytes': peak,
+        'retained_bytes': retained,
+        'peak_bytes_per_1000_files': int(peak * 1000 / len(files))
+    }
+    return stages
+
+def check_budget(report: Dict[str, Dict[str, Any]], budget_per_1000_files: int) -> Optional[str]:
+    scaled = report['total']['peak_bytes_per_1000_files']
+    if scaled <= budget_per_1000_files:
+        return None
+    return f"Pic de {scaled / MIB:.1f} Mo pour 1 000 fichiers, budget {budget_per_1000_files / MIB:.1f} Mo"
+
+def run_tier(spec: GeneratorSpec, top: int = 0, data_folder: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    with tempfile.TemporaryDirectory(prefix='covid-memory-') as tmp:
+        folder = Path(data_folder or tmp)
+        if not any(folder.glob("*.csv")):
+            generate_reports(folder, spec)
+        return memory_report(folder, top)
+
+def print_report(results: Dict[str, Dict[str, Dict[str, Any]]], stream=sys.stdout):
+    print(f"{'palier':<8} {'étape':<24} {'lignes':>9} {'DataFrame (Mo)':>15} {'pic (Mo)':>9} {'retenu (Mo)':>12}", file=stream)
+    for tier, stages in results.items():
+        for name, entry in stages.items():
+            print(
+                f"{tier:<8} {name:<24} {entry['rows']:>9} {entry['frame_bytes'] / MIB:>15.2f} "
+                f"{entry['peak_bytes'] / MIB:>9.2f} {entry['retained_bytes'] / MIB:>12.2f}",
+                file=stream
+            )
+            for line in entry.get('top', []):
+                print(f"{'':<8}   {line}", file=stream)
+        total = stages['total']
+        print(f"{tier:<8} {total['files']} fichiers, pic ramené à 1 000 fichiers: "
+              f"{total['peak_bytes_per_1000_files'] / MIB:.1f} Mo", file=stream)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mémoire allouée par étape du pipeline de chargement et de traitement")
+    parser.add_argument('--tiers', nargs='+', choices=sorted(TIERS), default=['small', 'medium'])
+    parser.add_argument('--data-folder', type=Path, help="Mesurer un dossier de rapports existant plutôt que des données synthétiques")
+    parser.add_argument('--top', type=int, default=0, help="Lignes de code qui allouent le plus, par étape")
+    parser.add_argument('--budget-mb', type=float, default=DEFAULT_BUDGET_PER_1000_FILES / MIB,
+                        help="Pic maximal (Mo) ramené à 1 000 fichiers")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help="Enregistrer les résultats comme nouvelle référence")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+    
+    logging.disable(logging.WARNING)
+    if args.data_folder:
+        results = {args.data_folder.name: memory_report(args.data_folder, args.top)}
+    else:
+        results = {tier: run_tier(TIERS[tier], args.top) for tier in args.tiers}
+    print_report(results)
+    
+    status = 0
+    for tier, stages in results.items():
+        failure = check_budget(stages, int(args.budget_mb * MIB))
+        if failure:
+            print(f"{tier}: {failure}")
+            status = 1
+    
+    baseline = load_baseline(args.baseline)
+    if baseline is not None:
+        regressions = find_regressions(results, baseline['results'], REGRESSION_METRICS, args.threshold)
+        print_regressions(regressions, args.threshold)
+        status = 1 if regressions else status
+    
+    if args.save:
+        for stages in results.values():
+            for entry in stages.values():
+                entry.pop('top', None)
+        save_baseline(args.baseline, results, {'tiers': list(results)})
+        print(f"Référence enregistrée: {args.baseline}")
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
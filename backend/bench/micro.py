@@ -0,0 +1,130 @@
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import pandas as pd
+from bench.baseline import BASELINE_FOLDER, find_regressions, load_baseline, print_regressions, save_baseline
+from bench.generator import GeneratorSpec, country_names, generate_reports
+from src.services.data_cube import DataCube
+from src.services.data_loader import DataLoader
+from src.services.data_processor import DataProcessor
+from src.services.location_index import LocationIndex, sort_for_index
+
+TIERS = {
+    'small': GeneratorSpec(days=30, countries=50),
+    'medium': GeneratorSpec(days=180, countries=190, provinces=20, province_countries=10, missing_rate=0.02),
+    'large': GeneratorSpec(days=720, countries=190, provinces=30, province_countries=10, admin2=3000,
+                           schema='mixed', missing_rate=0.02)
+}
+
+DEFAULT_BASELINE = BASELINE_FOLDER / "micro.json"
+DEFAULT_THRESHOLD = 0.25
+
+# Le minimum des répétitions est le temps le moins bruité ; écart absolu minimal pour ignorer les mesures très courtes
+REGRESSION_METRICS = [('min_seconds', 0.005), ('peak_bytes', 1024 * 1024)]
+
+def measure(function: Callable[[], Any], repeats: int = 3) -> Dict[str, Any]:
+    timings = []
+    result = None
+    for _ in range(max(repeats, 1)):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    
+    # Passe séparée : tracemalloc ralentit l'exécution et fausserait les temps
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    measurement = {
+        'seconds': statistics.median(timings),
+        'min_seconds': min(timings),
+        'peak_bytes': peak
+    }
+    if isinstance(result, pd.DataFrame):
+        measurement['rows'] = len(result)
+    return measurement
+
+def build_operations(folder: Path) -> Dict[str, Callable[[], Any]]:
+    loader = DataLoader(folder, folder / "missing.csv")
+    processor = DataProcessor()
+    raw = loader.load_multiple_csv_files()
+    aggregated = processor.aggregate_raw_data(raw)
+    processed = sort_for_index(processor.process_raw_data(raw))
+    index = LocationIndex.build(processed)
+    cube = DataCube.build(processed)
+    locations = cube.location_list()
+    country = locations[len(locations) // 2]
+    countries = country_names(min(5, len(locations)))
+    
+    return {
+        'load_multiple_csv_files': loader.load_multiple_csv_files,
+        'process_raw_data': lambda: processor.process_raw_data(raw),
+        '_calculate_new_values': lambda: processor._calculate_new_values(aggregated),
+        'get_country_data': lambda: processor.get_country_data(processed, country, 30),
+        'get_country_data_indexed': lambda: processor.get_country_data(processed, country, 30, index=index, cube=cube),
+        'compare_countries': lambda: processor.compare_countries(processed, countries, 'total_cases'),
+        'compare_countries_cube': lambda: processor.compare_countries(processed, countries, 'total_cases', index=index, cube=cube)
+    }
+
+def run_tier(spec: GeneratorSpec, repeats: int = 3, operations: Optional[List[str]] = None,
+             data_folder: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    with tempfile.TemporaryDirectory(prefix='covid-bench-') as tmp:
+        folder = Path(data_folder or tmp)
+        if not any(folder.glob("*.csv")):
+            generate_reports(folder, spec)
+        
+        available = build_operations(folder)
+        selected = operations or list(available)
+        unknown = [name for name in selected if name not in available]
+        if unknown:
+            raise ValueError(f"Opérations inconnues: {', '.join(unknown)}")
+        return {name: measure(available[name], repeats) for name in selected}
+
+def print_results(results: Dict[str, Dict[str, Dict[str, Any]]], stream=sys.stdout):
+    print(f"{'palier':<8} {'opération':<26} {'médiane (ms)':>13} {'min (ms)':>10} {'pic mémoire (Mo)':>17}", file=stream)
+    for tier, entries in results.items():
+        for name, result in entries.items():
+            print(
+                f"{tier:<8} {name:<26} {result['seconds'] * 1000:>13.2f} {result['min_seconds'] * 1000:>10.2f} "
+                f"{result['peak_bytes'] / (1024 * 1024):>17.2f}",
+                file=stream
+            )
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de DataLoader et DataProcessor")
+    parser.add_argument('--tiers', nargs='+', choices=sorted(TIERS), default=['small', 'medium'])
+    parser.add_argument('--operations', nargs='+')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help="Enregistrer les résultats comme nouvelle référence")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+    
+    # Les avertissements « lent » de log_performance n'ont pas de sens pendant une mesure
+    logging.disable(logging.WARNING)
+    results = {tier: run_tier(TIERS[tier], args.repeats, args.operations) for tier in args.tiers}
+    print_results(results)
+    
+    status = 0
+    baseline = load_baseline(args.baseline)
+    if baseline is not None:
+        regressions = find_regressions(results, baseline['results'], REGRESSION_METRICS, args.threshold)
+        print_regressions(regressions, args.threshold)
+        status = 1 if regressions else 0
+    
+    if args.save:
+        save_baseline(args.baseline, results, {'repeats': args.repeats, 'tiers': args.tiers})
+        print(f"Référence enregistrée: {args.baseline}")
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,10 +11,18 @@ class Config:
     PORT = int(os.environ.get('PORT', 5000))
     
     BASE_DIR = Path(__file__).parent
-    DATA_FOLDER = BASE_DIR / "data"
+    DATA_FOLDER = Path(os.environ.get('DATA_FOLDER', BASE_DIR / "data"))
     CSV_FILE = BASE_DIR / "01-01-2021.csv"
     MULTI_CSV_MODE = os.environ.get('MULTI_CSV_MODE', 'true').lower() == 'true'
     
+    LOAD_WORKERS = int(os.environ.get('LOAD_WORKERS', 1))
+    LOAD_START_METHOD = os.environ.get('LOAD_START_METHOD', 'spawn')
+    
+    CSV_CACHE_ENABLED = os.environ.get('CSV_CACHE_ENABLED', 'true').lower() == 'true'
+    CSV_CACHE_FOLDER = Path(os.environ.get('CSV_CACHE_FOLDER', BASE_DIR / "cache" / "csv"))
+    CSV_CACHE_FORMAT = os.environ.get('CSV_CACHE_FORMAT', 'parquet')
+    CSV_CACHE_LOCK_TIMEOUT = float(os.environ.get('CSV_CACHE_LOCK_TIMEOUT', 60))
+    
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     DEBUG = os.environ.get('DEBUG', os.environ.get('FLASK_DEBUG', 'False')).lower() in ['true', '1', 'yes']
     
@@ -22,11 +30,41 @@ class Config:
     API_VERSION = 'v1'
     
     CACHE_TIMEOUT = timedelta(hours=6)
+    DATASET_CHECK_INTERVAL = float(os.environ.get('DATASET_CHECK_INTERVAL', 5))
+    DATASET_BUILD_TIMEOUT = float(os.environ.get('DATASET_BUILD_TIMEOUT', 60))
+    DATASET_WATCH_ENABLED = os.environ.get('DATASET_WATCH_ENABLED', 'true').lower() == 'true'
+    DATASET_WATCH_INTERVAL = float(os.environ.get('DATASET_WATCH_INTERVAL', 5))
+    DATASET_WATCH_INOTIFY = os.environ.get('DATASET_WATCH_INOTIFY', 'true').lower() == 'true'
+    SHARED_DATASET_ENABLED = os.environ.get('SHARED_DATASET_ENABLED', 'false').lower() == 'true'
+    SHARED_DATASET_FOLDER = Path(os.environ.get('SHARED_DATASET_FOLDER', BASE_DIR / "cache" / "shared"))
+    
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 6))
+    
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+    PROFILING_MODE = os.environ.get('PROFILING_MODE', 'cprofile')
+    PROFILING_FOLDER = Path(os.environ.get('PROFILING_FOLDER', BASE_DIR / "cache" / "profiles"))
+    PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', 50))
+    PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL', 0.005))
     
     CORS_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000", "http://localhost:3001", "http://127.0.0.1:3001"]
     
-    DEFAULT_PAGE_SIZE = 20
-    MAX_PAGE_SIZE = 200
+    QUERY_CACHE_ENABLED = os.environ.get('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+    QUERY_CACHE_MAX_ENTRIES = int(os.environ.get('QUERY_CACHE_MAX_ENTRIES', 512))
+    QUERY_CACHE_MAX_BYTES = int(os.environ.get('QUERY_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    QUERY_CACHE_TTL = float(os.environ.get('QUERY_CACHE_TTL', 0))
+    
+    COMPARE_MAX_COUNTRIES = int(os.environ.get('COMPARE_MAX_COUNTRIES', 50))
+    COMPARE_OUTBREAK_THRESHOLD = int(os.environ.get('COMPARE_OUTBREAK_THRESHOLD', 100))
+    
+    BATCH_MAX_QUERIES = int(os.environ.get('BATCH_MAX_QUERIES', 20))
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 4))
+    
+    DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 20))
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 200))
     
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
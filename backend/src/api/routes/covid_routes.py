@@ -1,22 +1,121 @@
 import pandas as pd
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, g, jsonify, request
+from src.services.csv_cache import CsvCache
 from src.services.data_loader import DataLoader
-from src.services.data_processor import DataProcessor
+from src.services.data_cube import CUBE_METRICS, GRANULARITIES
+from src.services.data_processor import COMPARISON_ALIGNMENTS, DataProcessor
+from src.services.dataset_manager import DatasetManager
+from src.services.dataset_watcher import DatasetWatcher
+from src.services.location_index import normalize_location
+from src.services.shared_store import SharedDatasetStore
 from src.utils.logger import get_logger
+from src.utils.metrics import timed
+from src.utils.query_cache import QueryCache
+from src.api.utils.batch import BatchError, parse_batch, run_batch
+from src.api.utils.formats import render
+from src.api.utils.http_cache import register_http_cache
+from src.api.utils.pagination import ndjson_response, paginate, parse_page_request, set_pagination_headers, wants_ndjson
+from src.utils.serialization import FILTERED_COLUMNS, LATEST_COLUMNS, PERIOD_COLUMNS, TIMELINE_COLUMNS, Table, frame_to_table, top_countries_columns
 from config import Config
 
 covid_routes = Blueprint('covid', __name__)
-data_loader = DataLoader(Config.DATA_FOLDER, Config.CSV_FILE)
+data_loader = DataLoader(
+    Config.DATA_FOLDER,
+    Config.CSV_FILE,
+    csv_cache=CsvCache(Config.CSV_CACHE_FOLDER, Config.CSV_CACHE_FORMAT, Config.CSV_CACHE_LOCK_TIMEOUT) if Config.CSV_CACHE_ENABLED else None,
+    workers=Config.LOAD_WORKERS,
+    start_method=Config.LOAD_START_METHOD
+)
 data_processor = DataProcessor()
+dataset_manager = DatasetManager(
+    data_loader,
+    data_processor,
+    max_age=Config.CACHE_TIMEOUT,
+    check_interval=Config.DATASET_CHECK_INTERVAL,
+    build_timeout=Config.DATASET_BUILD_TIMEOUT,
+    shared_store=SharedDatasetStore(Config.SHARED_DATASET_FOLDER) if Config.SHARED_DATASET_ENABLED else None
+)
+dataset_watcher = DatasetWatcher(
+    dataset_manager,
+    interval=Config.DATASET_WATCH_INTERVAL,
+    use_inotify=Config.DATASET_WATCH_INOTIFY
+)
+query_cache = QueryCache(
+    max_entries=Config.QUERY_CACHE_MAX_ENTRIES if Config.QUERY_CACHE_ENABLED else 0,
+    max_bytes=Config.QUERY_CACHE_MAX_BYTES,
+    ttl=Config.QUERY_CACHE_TTL,
+    current_version=lambda: dataset_manager.current_version
+)
 logger = get_logger(__name__)
 
+def _memoize(dataset, method: str, compute, **args):
+    with timed('query'):
+        return query_cache.get_or_compute(dataset.version, method, args, compute)
+
+def _current_dataset():
+    # Un lot épingle son snapshot dans g pour que toutes ses sous-requêtes lisent la même version
+    dataset = g.get('dataset')
+    if dataset is None:
+        with timed('dataset'):
+            dataset = dataset_manager.get_dataset()
+    return dataset
+
+def collect_metrics():
+    dataset = dataset_manager.current
+    status = dataset_manager.status()
+    cache = query_cache.stats()
+    families = [
+        ('covid_dataset_reloads_total', 'counter', "Rechargements du dataset", [('covid_dataset_reloads_total', {}, status['reloads'])]),
+        ('covid_query_cache_hits_total', 'counter', "Succès du cache de requêtes", [('covid_query_cache_hits_total', {}, cache['hits'])]),
+        ('covid_query_cache_misses_total', 'counter', "Échecs du cache de requêtes", [('covid_query_cache_misses_total', {}, cache['misses'])]),
+        ('covid_query_cache_evictions_total', 'counter', "Évictions du cache de requêtes", [('covid_query_cache_evictions_total', {}, cache['evictions'])]),
+        ('covid_query_cache_entries', 'gauge', "Entrées du cache de requêtes", [('covid_query_cache_entries', {}, cache['entries'])]),
+        ('covid_query_cache_bytes', 'gauge', "Taille estimée du cache de requêtes", [('covid_query_cache_bytes', {}, cache['bytes'])])
+    ]
+    if dataset is not None:
+        families.extend([
+            ('covid_dataset_info', 'gauge', "Version du dataset servi", [
+                ('covid_dataset_info', {'version': dataset.version, 'build_mode': dataset.build_mode}, 1)
+            ]),
+            ('covid_dataset_rows', 'gauge', "Lignes du dataset traité", [('covid_dataset_rows', {}, dataset.row_count)]),
+            ('covid_dataset_memory_bytes', 'gauge', "Mémoire du dataset par composant", [
+                ('covid_dataset_memory_bytes', {'component': component}, size)
+                for component, size in dataset.memory_usage().items()
+            ])
+        ])
+    if status['last_reload_seconds'] is not None:
+        families.append(('covid_dataset_last_reload_seconds', 'gauge', "Durée du dernier rechargement", [
+            ('covid_dataset_last_reload_seconds', {}, status['last_reload_seconds'])
+        ]))
+    return families
+
+# Un client peut garder une réponse aussi longtemps que le serveur garde le dataset
+register_http_cache(covid_routes, _current_dataset, int(Config.CACHE_TIMEOUT.total_seconds()))
+
+def _latest_rows(latest_data: pd.DataFrame) -> Table:
+    return frame_to_table(latest_data, LATEST_COLUMNS)
+
+def _page_request():
+    return parse_page_request(Config.DEFAULT_PAGE_SIZE, Config.MAX_PAGE_SIZE)
+
+def _timeline_payload(country_data: pd.DataFrame) -> dict:
+    data = frame_to_table(country_data, TIMELINE_COLUMNS)
+    return {
+        'country': country_data['location'].iloc[0],
+        'data': data,
+        'days': len(data),
+        'temporal': country_data['date'].nunique() > 1
+    }
+
 @covid_routes.route('/health', methods=['GET'])
 def health_check():
     try:
         return jsonify({
             'status': 'OK',
             'message': 'API COVID-19 opérationnelle',
-            'version': '1.0.0'
+            'version': '1.0.0',
+            'dataset': dataset_manager.status(),
+            'watcher': dataset_watcher.status()
         }), 200
     except Exception as e:
         logger.error(f"Erreur health check: {e}")
@@ -30,27 +129,15 @@ def get_global_stats():
     try:
         logger.info("Requête: statistiques globales")
         
-        raw_df = data_loader.load_data()
-        if raw_df is None or raw_df.empty:
+        dataset = _current_dataset()
+        if dataset is None:
             return jsonify({'error': 'Aucune donnée disponible'}), 404
         
-        processed_df = data_processor.process_raw_data(raw_df)
-        latest_data = processed_df.groupby('location').last().reset_index()
-        
-        global_stats = {
-            'total_cases': int(latest_data['total_cases'].sum()),
-            'total_deaths': int(latest_data['total_deaths'].sum()),
-            'new_cases': int(latest_data['new_cases'].sum()),
-            'new_deaths': int(latest_data['new_deaths'].sum()),
-            'total_recovered': int(latest_data['total_recovered'].sum()) if 'total_recovered' in latest_data.columns else 0,
-            'active_cases': int(latest_data['active_cases'].sum()) if 'active_cases' in latest_data.columns else 0,
-            'countries_count': len(latest_data),
-            'last_update': latest_data['date'].max().isoformat() if not latest_data.empty else None
-        }
+        global_stats = dataset.global_stats.to_dict()
         
         logger.info("Statistiques globales calculées")
-        return jsonify(global_stats)
-        
+        return render(global_stats)
+    
     except Exception as e:
         return jsonify({'error': f'Erreur de calcul des statistiques globales: {str(e)}'}), 500
 
@@ -59,28 +146,29 @@ def get_all_data():
     try:
         logger.info("Requête: toutes les données")
         
-        raw_df = data_loader.load_data()
-        if raw_df is None or raw_df.empty:
-            return jsonify({'error': 'Aucune donnée disponible'}), 404
+        try:
+            page_request = _page_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        processed_df = data_processor.process_raw_data(raw_df)
-        latest_data = processed_df.groupby('location').last().reset_index()
+        dataset = _current_dataset()
+        if dataset is None:
+            return jsonify({'error': 'Aucune donnée disponible'}), 404
         
-        result = []
-        for _, row in latest_data.iterrows():
-            result.append({
-                'country': row['location'],
-                'total_cases': int(row['total_cases']) if pd.notna(row['total_cases']) else 0,
-                'new_cases': int(row['new_cases']) if pd.notna(row['new_cases']) else 0,
-                'total_deaths': int(row['total_deaths']) if pd.notna(row['total_deaths']) else 0,
-                'new_deaths': int(row['new_deaths']) if pd.notna(row['new_deaths']) else 0,
-                'total_recovered': int(row['total_recovered']) if pd.notna(row['total_recovered']) else None,
-                'active_cases': int(row['active_cases']) if pd.notna(row['active_cases']) else None,
-                'last_update': row['date'].isoformat()
-            })
+        latest_data = dataset.latest
+        page_info = None
+        if page_request is not None:
+            latest_data, page_info = paginate(latest_data, page_request)
         
-        return jsonify(result)
+        if wants_ndjson():
+            response = ndjson_response(latest_data, LATEST_COLUMNS)
+        else:
+            response = render(_latest_rows(latest_data))
         
+        if page_info is not None:
+            set_pagination_headers(response, page_info)
+        return response
+    
     except Exception as e:
         return jsonify({'error': f'Erreur de traitement des données: {str(e)}'}), 500
 
@@ -89,16 +177,15 @@ def get_countries():
     try:
         logger.info("Requête: liste des pays")
         
-        raw_df = data_loader.load_data()
-        if raw_df is None or raw_df.empty:
+        dataset = _current_dataset()
+        if dataset is None:
             return jsonify({'error': 'Aucune donnée disponible'}), 404
         
-        processed_df = data_processor.process_raw_data(raw_df)
-        countries = data_processor.get_countries_list(processed_df)
+        countries = data_processor.get_countries_list(dataset.frame, cube=dataset.cube)
         
         logger.info(f"Liste des pays: {len(countries)} pays")
-        return jsonify({'countries': countries})
-        
+        return render({'countries': countries})
+    
     except Exception as e:
         return jsonify({'error': f'Erreur de récupération des pays: {str(e)}'}), 500
 
@@ -108,20 +195,25 @@ def get_country_timeline(country):
         days = request.args.get('days', 30, type=int)
         logger.info(f"Requête countries pour {country} ({days} jours)")
         
-        raw_df = data_loader.load_data()
-        if raw_df is None or raw_df.empty:
+        dataset = _current_dataset()
+        if dataset is None:
             return jsonify({'error': 'Aucune donnée disponible'}), 404
         
-        processed_df = data_processor.process_raw_data(raw_df)
-        timeline = data_processor.get_country_data(processed_df, country, days)
+        country_data = _memoize(
+            dataset, 'get_country_timeline',
+            lambda: data_processor.get_country_timeline(dataset.frame, country, days, index=dataset.index, cube=dataset.cube),
+            country=normalize_location(country), days=days
+        )
         
-        if timeline is None:
+        if country_data is None:
             logger.warning(f"Pays non trouvé: {country}")
             return jsonify({'error': f'Pays "{country}" non trouvé'}), 404
         
-        logger.info(f"Timeline pour {country}: {timeline.days} points de données")
-        return jsonify(timeline.to_dict())
+        timeline = _timeline_payload(country_data)
         
+        logger.info(f"Timeline pour {country}: {timeline['days']} points de données")
+        return render(timeline)
+    
     except Exception as e:
         return jsonify({'error': f'Erreur de récupération des countries: {str(e)}'}), 500
 
@@ -130,33 +222,34 @@ def get_top_countries():
     try:
         limit = request.args.get('limit', 10, type=int)
         metric = request.args.get('metric', 'total_cases', type=str)
+        as_of = request.args.get('as_of')
         logger.info(f"Requête top {limit} pays par {metric}")
         
-        raw_df = data_loader.load_data()
-        if raw_df is None or raw_df.empty:
+        dataset = _current_dataset()
+        if dataset is None:
             return jsonify({'error': 'Aucune donnée disponible'}), 404
         
-        processed_df = data_processor.process_raw_data(raw_df)
-        latest_data = processed_df.groupby('location').last().reset_index()
-        
-        if metric not in latest_data.columns:
+        if metric not in CUBE_METRICS:
             return jsonify({'error': f'Métrique "{metric}" non disponible'}), 400
         
-        top_countries = latest_data.nlargest(limit, metric)
+        as_of_dt = None
+        if as_of:
+            try:
+                as_of_dt = pd.to_datetime(as_of)
+            except:
+                return jsonify({'error': 'Format de date invalide pour as_of (utilisez YYYY-MM-DD)'}), 400
+        
+        top_countries = _memoize(
+            dataset, 'get_top_countries',
+            lambda: data_processor.get_top_countries(dataset.latest, metric, limit, rankings=dataset.rankings, as_of=as_of_dt),
+            metric=metric, limit=limit, as_of=as_of_dt
+        )
         
-        result = []
-        for _, row in top_countries.iterrows():
-            result.append({
-                'country': row['location'],
-                'total_cases': int(row['total_cases']) if pd.notna(row['total_cases']) else 0,
-                'total_deaths': int(row['total_deaths']) if pd.notna(row['total_deaths']) else 0,
-                'value': int(row[metric]) if pd.notna(row[metric]) else 0,
-                'last_update': row['date'].isoformat()
-            })
+        result = frame_to_table(top_countries, top_countries_columns(metric))
         
         logger.info(f"Top {len(result)} pays par {metric}")
-        return jsonify(result)
-        
+        return render(result)
+    
     except Exception as e:
         return jsonify({'error': f'Erreur de récupération du top pays: {str(e)}'}), 500
 
@@ -168,77 +261,165 @@ def get_filtered_data():
         
         logger.info(f"Requête de données filtrées: {start_date} → {end_date}")
         
-        raw_df = data_loader.load_data()
-        if raw_df is None or raw_df.empty:
+        try:
+            page_request = _page_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        dataset = _current_dataset()
+        if dataset is None:
             return jsonify({'error': 'Aucune donnée disponible'}), 404
         
-        processed_df = data_processor.process_raw_data(raw_df)
+        start_dt = None
+        end_dt = None
         
         if start_date:
             try:
                 start_dt = pd.to_datetime(start_date)
-                processed_df = processed_df[processed_df['date'] >= start_dt]
             except:
                 return jsonify({'error': 'Format de date invalide pour start_date (utilisez YYYY-MM-DD)'}), 400
         
         if end_date:
             try:
                 end_dt = pd.to_datetime(end_date)
-                processed_df = processed_df[processed_df['date'] <= end_dt]
             except:
                 return jsonify({'error': 'Format de date invalide pour end_date (utilisez YYYY-MM-DD)'}), 400
         
-        if processed_df.empty:
+        granularity = request.args.get('granularity')
+        if granularity is not None and granularity not in GRANULARITIES:
+            return jsonify({'error': f"Granularité invalide. Valeurs possibles: {', '.join(GRANULARITIES)}"}), 400
+        
+        latest_data = _memoize(
+            dataset, 'get_filtered_data',
+            lambda: data_processor.get_filtered_data(dataset.frame, start_dt, end_dt, cube=dataset.cube),
+            start_date=start_dt, end_date=end_dt
+        )
+        
+        if latest_data.empty:
             return jsonify({'error': 'Aucune donnée trouvée pour cette période'}), 404
         
-        latest_data = processed_df.groupby('location').last().reset_index()
-        
-        result = []
-        for _, row in latest_data.iterrows():
-            result.append({
-                'country': row['location'],
-                'total_cases': int(row['total_cases']) if pd.notna(row['total_cases']) else 0,
-                'new_cases': int(row['new_cases']) if pd.notna(row['new_cases']) else 0,
-                'total_deaths': int(row['total_deaths']) if pd.notna(row['total_deaths']) else 0,
-                'new_deaths': int(row['new_deaths']) if pd.notna(row['new_deaths']) else 0,
-                'total_recovered': int(row['total_recovered']) if pd.notna(row['total_recovered']) else None,
-                'active_cases': int(row['active_cases']) if pd.notna(row['active_cases']) else None,
-                'last_update': row['date'].isoformat()
-            })
-        
-        logger.info(f"Données filtrées: {len(result)} pays pour période {start_date} → {end_date}")
-        return jsonify({
-            'data': result,
+        countries_count = len(latest_data)
+        page_info = None
+        if page_request is not None:
+            latest_data, page_info = paginate(latest_data, page_request)
+        
+        logger.info(f"Données filtrées: {countries_count} pays pour période {start_date} → {end_date}")
+        
+        if wants_ndjson():
+            response = ndjson_response(latest_data, FILTERED_COLUMNS)
+            if page_info is not None:
+                set_pagination_headers(response, page_info)
+            return response
+        
+        payload = {
+            'data': frame_to_table(latest_data, FILTERED_COLUMNS),
             'period': {
                 'start_date': start_date,
                 'end_date': end_date,
-                'countries_count': len(result)
+                'countries_count': countries_count
             }
-        })
-        
+        }
+        if granularity is not None:
+            locations = latest_data['location'].tolist()
+            increments = _memoize(
+                dataset, 'get_period_increments',
+                lambda: data_processor.get_period_increments(
+                    dataset.frame, granularity, start_dt, end_dt, locations=locations, cube=dataset.cube
+                ),
+                granularity=granularity, start_date=start_dt, end_date=end_dt, locations=locations
+            )
+            payload['period']['granularity'] = granularity
+            payload['series'] = frame_to_table(increments, PERIOD_COLUMNS)
+        if page_info is not None:
+            payload['pagination'] = page_info
+        return render(payload)
+    
     except Exception as e:
         return jsonify({'error': f'Erreur de filtrage des données: {str(e)}'}), 500
 
+@covid_routes.route('/compare', methods=['GET'])
+def compare_countries():
+    try:
+        countries = [country.strip() for country in request.args.get('countries', '').split(',') if country.strip()]
+        metric = request.args.get('metric', 'total_cases', type=str)
+        align = request.args.get('align', 'date', type=str)
+        logger.info(f"Requête comparaison de {len(countries)} pays par {metric} ({align})")
+        
+        if not countries:
+            return jsonify({'error': 'Paramètre countries requis (ex: countries=France,Italy)'}), 400
+        if len(countries) > Config.COMPARE_MAX_COUNTRIES:
+            return jsonify({'error': f'Maximum {Config.COMPARE_MAX_COUNTRIES} pays par comparaison'}), 400
+        if metric not in CUBE_METRICS:
+            return jsonify({'error': f'Métrique "{metric}" non disponible'}), 400
+        if align not in COMPARISON_ALIGNMENTS:
+            return jsonify({'error': f"Alignement invalide. Valeurs possibles: {', '.join(COMPARISON_ALIGNMENTS)}"}), 400
+        
+        dataset = _current_dataset()
+        if dataset is None:
+            return jsonify({'error': 'Aucune donnée disponible'}), 404
+        
+        comparison = _memoize(
+            dataset, 'compare_countries',
+            lambda: data_processor.compare_countries(
+                dataset.frame, countries, metric,
+                index=dataset.index,
+                cube=dataset.cube,
+                align=align,
+                outbreak_threshold=Config.COMPARE_OUTBREAK_THRESHOLD
+            ),
+            countries=countries, metric=metric, align=align
+        )
+        
+        if not comparison.comparison_data:
+            return jsonify({'error': 'Aucun des pays demandés n\'a été trouvé'}), 404
+        
+        logger.info(f"Comparaison: {len(comparison.comparison_data)}/{len(countries)} pays trouvés")
+        return render(comparison.to_dict())
+    
+    except Exception as e:
+        return jsonify({'error': f'Erreur de comparaison des pays: {str(e)}'}), 500
+
+@covid_routes.route('/batch', methods=['POST'])
+def run_batch_queries():
+    try:
+        try:
+            queries = parse_batch(request.get_json(silent=True), Config.BATCH_MAX_QUERIES)
+        except BatchError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        logger.info(f"Requête batch: {len(queries)} sous-requêtes")
+        
+        dataset = _current_dataset()
+        if dataset is None:
+            return jsonify({'error': 'Aucune donnée disponible'}), 404
+        
+        results = run_batch(current_app._get_current_object(), dataset, queries, Config.API_PREFIX, Config.BATCH_WORKERS)
+        return jsonify({
+            'version': dataset.version,
+            'results': results
+        })
+    
+    except Exception as e:
+        return jsonify({'error': f'Erreur du traitement batch: {str(e)}'}), 500
+
 @covid_routes.route('/dates/available', methods=['GET'])
 def get_available_dates():
     try:
         logger.info("Requête: dates disponibles")
         
-        raw_df = data_loader.load_data()
-        if raw_df is None or raw_df.empty:
+        dataset = _current_dataset()
+        if dataset is None:
             return jsonify({'error': 'Aucune donnée disponible'}), 404
         
-        processed_df = data_processor.process_raw_data(raw_df)
-        
-        available_dates = sorted(processed_df['date'].dt.strftime('%Y-%m-%d').unique().tolist())
+        available_dates = dataset.cube.date_list()
         
         logger.info(f"Dates disponibles: {len(available_dates)} dates")
-        return jsonify({
+        return render({
             'dates': available_dates,
             'count': len(available_dates),
             'min_date': available_dates[0] if available_dates else None,
             'max_date': available_dates[-1] if available_dates else None
         })
-        
+    
     except Exception as e:
         return jsonify({'error': f'Erreur de récupération des dates: {str(e)}'}), 500
@@ -0,0 +1,74 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from flask import Flask, g
+from werkzeug.test import EnvironBuilder
+from src.api.utils.formats import JSON_MIMETYPE
+
+class BatchError(ValueError):
+    pass
+
+def parse_batch(payload: Any, max_queries: int) -> List[Dict[str, Any]]:
+    queries = payload.get('queries') if isinstance(payload, dict) else payload
+    if not isinstance(queries, list) or not queries:
+        raise BatchError('Corps attendu: {"queries": [{"path": "/global", "params": {...}}, ...]}')
+    if len(queries) > max_queries:
+        raise BatchError(f'Maximum {max_queries} requêtes par lot')
+    return queries
+
+def run_batch(app: Flask, dataset, queries: List[Any], prefix: str, workers: int) -> List[Dict[str, Any]]:
+    # Toutes les sous-requêtes lisent le même snapshot, quelle que soit la reconstruction en cours
+    if len(queries) == 1 or workers <= 1:
+        return [_run_query(app, dataset, query, position, prefix) for position, query in enumerate(queries)]
+    
+    with ThreadPoolExecutor(max_workers=min(workers, len(queries))) as executor:
+        futures = [
+            executor.submit(_run_query, app, dataset, query, position, prefix)
+            for position, query in enumerate(queries)
+        ]
+        return [future.result() for future in futures]
+
+def _run_query(app: Flask, dataset, query: Any, position: int, prefix: str) -> Dict[str, Any]:
+    query_id = query.get('id', position) if isinstance(query, dict) else position
+    path = _query_path(query, prefix)
+    if path is None:
+        return _item(query_id, None, 400, {'error': 'Sous-requête invalide: "path" et "params" attendus'})
+    
+    try:
+        if '?' in path:
+            raise BatchError('Les paramètres doivent être passés dans "params"')
+        environ = EnvironBuilder(
+            path=path, method='GET', query_string=query.get('params') or {}, headers={'Accept': JSON_MIMETYPE}
+        ).get_environ()
+    except ValueError as e:
+        return _item(query_id, path, 400, {'error': str(e)})
+    
+    try:
+        # Contexte d'application neuf : sans lui, la sous-requête partagerait le g de la requête englobante
+        # (chemin série) et ses hooks écraseraient g.request_start, g.server_timings ou g.profiler_session
+        with app.app_context(), app.request_context(environ):
+            g.dataset = dataset
+            response = app.full_dispatch_request()
+            body = response.get_data(as_text=True)
+    except Exception as e:
+        return _item(query_id, path, 500, {'error': f'Erreur de la sous-requête: {str(e)}'})
+    
+    if response.mimetype == JSON_MIMETYPE:
+        return _item(query_id, path, response.status_code, json.loads(body) if body else None)
+    if response.status_code >= 400:
+        return _item(query_id, path, response.status_code, {'error': response.status})
+    return _item(query_id, path, response.status_code, body)
+
+def _query_path(query: Any, prefix: str) -> Optional[str]:
+    if not isinstance(query, dict) or not isinstance(query.get('path'), str):
+        return None
+    if query.get('params') is not None and not isinstance(query['params'], dict):
+        return None
+    
+    path = '/' + query['path'].lstrip('/')
+    if not path.startswith(prefix + '/'):
+        path = prefix + path
+    return path
+
+def _item(query_id: Any, path: Optional[str], status: int, body: Any) -> Dict[str, Any]:
+    return {'id': query_id, 'path': path, 'status': status, 'body': body}
@@ -0,0 +1,47 @@
+import gzip
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def register_compression(app: Flask, min_size: int, level: int = 6):
+    @app.after_request
+    def _compress_response(response: Response) -> Response:
+        if not _is_compressible(response):
+            return response
+        
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        
+        encoding = choose_encoding()
+        if encoding is None:
+            return response
+        
+        if encoding == 'br':
+            body = brotli.compress(body, quality=min(level, 11))
+        else:
+            body = gzip.compress(body, compresslevel=min(level, 9))
+        
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
+
+def choose_encoding():
+    # best_match respecte les q-values (q=0 vaut refus) ; à qualité égale, br est préféré
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(supported)
+
+def _is_compressible(response: Response) -> bool:
+    if response.direct_passthrough or response.is_streamed:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    return 'Content-Encoding' not in response.headers
@@ -0,0 +1,96 @@
+import json
+from typing import Any, Optional, Tuple
+from flask import Response, jsonify, request
+from src.utils.metrics import timed
+from src.utils.serialization import Table
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+SUPPORTED_MIMETYPES = [JSON_MIMETYPE, MSGPACK_MIMETYPE, ARROW_MIMETYPE]
+
+def negotiate_mimetype() -> str:
+    return request.accept_mimetypes.best_match(SUPPORTED_MIMETYPES, default=JSON_MIMETYPE) or JSON_MIMETYPE
+
+def wants_columnar() -> bool:
+    return request.args.get('format', 'json').lower() == 'columnar'
+
+def render(payload: Any) -> Response:
+    mimetype = negotiate_mimetype()
+    
+    with timed('serialize'):
+        if mimetype == ARROW_MIMETYPE:
+            response = _arrow_response(payload)
+        elif mimetype == MSGPACK_MIMETYPE:
+            response = _msgpack_response(payload)
+        else:
+            response = jsonify(materialize(payload, wants_columnar()))
+    
+    response.vary.add('Accept')
+    return response
+
+def materialize(payload: Any, columnar: bool = False) -> Any:
+    if isinstance(payload, Table):
+        return payload.to_columnar() if columnar else payload.to_records()
+    if isinstance(payload, dict):
+        return {key: materialize(value, columnar) for key, value in payload.items()}
+    return payload
+
+def split_table(payload: Any) -> Tuple[Optional[Table], Any]:
+    if isinstance(payload, Table):
+        return payload, None
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            if isinstance(value, Table):
+                envelope = materialize({k: v for k, v in payload.items() if k != key})
+                envelope['table_key'] = key
+                return value, envelope
+    return None, payload
+
+def _msgpack_response(payload: Any) -> Response:
+    if msgpack is None:
+        return _not_acceptable(MSGPACK_MIMETYPE, 'msgpack')
+    
+    body = msgpack.packb(materialize(payload, wants_columnar()), use_bin_type=True)
+    return Response(body, mimetype=MSGPACK_MIMETYPE)
+
+def _arrow_response(payload: Any) -> Response:
+    if pa is None:
+        return _not_acceptable(ARROW_MIMETYPE, 'pyarrow')
+    
+    table, envelope = split_table(payload)
+    if table is None:
+        return _not_acceptable(ARROW_MIMETYPE, None)
+    
+    metadata = {'payload': json.dumps(envelope)} if envelope is not None else None
+    arrow_table = pa.table(
+        {column: pa.array(values) for column, values in zip(table.columns, table.arrays)},
+        metadata=metadata
+    )
+    
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return Response(sink.getvalue().to_pybytes(), mimetype=ARROW_MIMETYPE)
+
+def _not_acceptable(mimetype: str, dependency: Optional[str]) -> Response:
+    if dependency is None:
+        message = f'Format {mimetype} non disponible pour cette ressource'
+    else:
+        message = f'Format {mimetype} non disponible ({dependency} non installé)'
+    
+    response = jsonify({'error': message, 'supported': [JSON_MIMETYPE]})
+    response.status_code = 406
+    return response
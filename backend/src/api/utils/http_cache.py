@@ -0,0 +1,69 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from flask import Blueprint, Response, g, request
+from src.api.utils.formats import negotiate_mimetype
+
+UNCACHED_ENDPOINTS = {'health_check'}
+
+def register_http_cache(blueprint: Blueprint, get_dataset: Callable, max_age: int):
+    @blueprint.before_request
+    def _prepare_conditional_request():
+        if request.method not in ('GET', 'HEAD') or _endpoint_name() in UNCACHED_ENDPOINTS:
+            return
+        
+        dataset = get_dataset()
+        if dataset is not None:
+            g.http_cache = (compute_etag(dataset.version), dataset.last_modified)
+    
+    @blueprint.after_request
+    def _add_cache_headers(response: Response) -> Response:
+        cache_info = g.pop('http_cache', None)
+        # Seules les réponses réussies sont validées : une ressource absente ou une requête invalide garde son statut
+        if cache_info is None or response.status_code != 200:
+            return response
+        
+        etag, last_modified = cache_info
+        if is_not_modified(etag, last_modified):
+            response = Response(status=304)
+        _set_cache_headers(response, etag, last_modified, max_age)
+        return response
+
+def compute_etag(version: str) -> str:
+    digest = hashlib.sha1()
+    digest.update(request.path.encode('utf-8'))
+    for key, value in sorted(request.args.items(multi=True)):
+        digest.update(f"&{key}={value}".encode('utf-8'))
+    digest.update(negotiate_mimetype().encode('utf-8'))
+    return f"{version}-{digest.hexdigest()[:16]}"
+
+def etag_base(tag: str) -> str:
+    # Les variantes compressées portent un suffixe d'encodage (-gzip, -br)
+    for suffix in ('-gzip', '-br'):
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+def is_not_modified(etag: str, last_modified: Optional[datetime]) -> bool:
+    if request.if_none_match:
+        if request.if_none_match.star_tag:
+            return True
+        # Comparaison faible : les proxys et navigateurs peuvent renvoyer W/"..."
+        return any(etag_base(tag) == etag for tag in request.if_none_match.as_set(include_weak=True))
+    
+    if request.if_modified_since is not None and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.astimezone(timezone.utc)
+    
+    return False
+
+def _set_cache_headers(response: Response, etag: str, last_modified: Optional[datetime], max_age: int):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.vary.add('Accept')
+    response.vary.add('Accept-Encoding')
+
+def _endpoint_name() -> str:
+    return (request.endpoint or '').rsplit('.', 1)[-1]
@@ -0,0 +1,93 @@
+import base64
+import binascii
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from flask import Response, current_app, request, stream_with_context
+from src.utils.serialization import ColumnSpec, frame_to_table
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+STREAM_CHUNK_ROWS = 1000
+
+@dataclass(frozen=True)
+class PageRequest:
+    page_size: int
+    page: Optional[int] = None
+    cursor: Optional[str] = None
+
+def parse_page_request(default_size: int, max_size: int) -> Optional[PageRequest]:
+    args = request.args
+    if not any(key in args for key in ('page', 'page_size', 'cursor')):
+        return None
+    
+    page_size = args.get('page_size', default_size, type=int)
+    if page_size is None or not 1 <= page_size <= max_size:
+        raise ValueError(f'page_size doit être compris entre 1 et {max_size}')
+    
+    if 'cursor' in args:
+        return PageRequest(page_size=page_size, cursor=decode_cursor(args['cursor']))
+    
+    page = args.get('page', 1, type=int)
+    if page is None or page < 1:
+        raise ValueError('page doit être un entier supérieur ou égal à 1')
+    return PageRequest(page_size=page_size, page=page)
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return base64.b64decode(padded.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError('Curseur de pagination invalide')
+
+def paginate(df: pd.DataFrame, page_request: PageRequest, key: str = 'location') -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    # Ordre stable sur la clé pour que curseurs et offsets restent valides entre deux appels
+    if not df[key].is_monotonic_increasing:
+        df = df.sort_values(key, kind='mergesort')
+    
+    total = len(df)
+    if page_request.cursor is not None:
+        keys = df[key].to_numpy(dtype=object)
+        start = int(np.searchsorted(keys, page_request.cursor, side='right'))
+    else:
+        start = (page_request.page - 1) * page_request.page_size
+    
+    stop = min(start + page_request.page_size, total)
+    page = df.iloc[start:stop]
+    
+    next_cursor = None
+    if stop < total and stop > start:
+        next_cursor = encode_cursor(str(page[key].iloc[-1]))
+    
+    info = {
+        'total': total,
+        'page_size': page_request.page_size,
+        'count': len(page),
+        'next_cursor': next_cursor
+    }
+    if page_request.page is not None:
+        info['page'] = page_request.page
+        info['pages'] = -(-total // page_request.page_size)
+    return page, info
+
+def set_pagination_headers(response: Response, info: Dict[str, Any]) -> Response:
+    response.headers['X-Total-Count'] = str(info['total'])
+    if info['next_cursor'] is not None:
+        response.headers['X-Next-Cursor'] = info['next_cursor']
+    return response
+
+def wants_ndjson() -> bool:
+    return request.args.get('stream', '').lower() == 'ndjson'
+
+def ndjson_response(df: pd.DataFrame, spec: Sequence[ColumnSpec]) -> Response:
+    return Response(stream_with_context(iter_ndjson(df, spec)), mimetype=NDJSON_MIMETYPE)
+
+def iter_ndjson(df: pd.DataFrame, spec: Sequence[ColumnSpec], chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[str]:
+    # Conversion par tranches : la mémoire reste bornée par chunk_rows quelle que soit la taille du résultat
+    dumps = current_app.json.dumps
+    for start in range(0, len(df), chunk_rows):
+        rows = frame_to_table(df.iloc[start:start + chunk_rows], spec).to_records()
+        yield ''.join(dumps(row) + '\n' for row in rows)
@@ -73,12 +73,18 @@ class CountryComparison:
     countries: List[str]
     metric: str
     comparison_data: dict
+    align: Optional[str] = None
+    axis: Optional[list] = None
     
     def to_dict(self) -> dict:
-        return {
+        result = {
             'countries': self.countries,
             'metric': self.metric,
             'comparison': self.comparison_data,
             'countries_found': len(self.comparison_data),
             'countries_requested': len(self.countries)
-        }
\ No newline at end of file
+        }
+        if self.align is not None:
+            result['align'] = self.align
+            result['axis'] = self.axis
+        return result
\ No newline at end of file
@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+from src.utils.file_lock import FileLock, FileLockTimeout
+from src.utils.logger import get_logger
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+logger = get_logger(__name__)
+
+CACHE_SCHEMA_VERSION = 2
+
+# Âge au-delà duquel un fichier .tmp est considéré comme abandonné par un worker arrêté en cours d'écriture
+TMP_GRACE_SECONDS = 3600
+
+FORMAT_EXTENSIONS = {
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'pickle': '.pkl'
+}
+
+class CsvCache:
+    def __init__(self, cache_folder: Path, file_format: str = 'parquet', lock_timeout: Optional[float] = 60.0):
+        if file_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Format de cache inconnu: {file_format}")
+        
+        if file_format in ('parquet', 'feather') and not HAS_PYARROW:
+            logger.warning(f"pyarrow non installé, cache CSV en format pickle au lieu de {file_format}")
+            file_format = 'pickle'
+        
+        self.cache_folder = Path(cache_folder)
+        self.file_format = file_format
+        self.lock_timeout = lock_timeout
+    
+    def read_csv(self, csv_path: Path, reader: Callable[[Path], pd.DataFrame]) -> pd.DataFrame:
+        cached = self.load(csv_path)
+        if cached is not None:
+            return cached
+        
+        # Un seul processus parse et écrit l'entrée, les autres relisent le cache une fois le verrou libéré
+        try:
+            with self.lock(csv_path):
+                cached = self.load(csv_path)
+                if cached is not None:
+                    return cached
+                
+                df = reader(csv_path)
+                self.store(csv_path, df)
+                return df
+        except (FileLockTimeout, PermissionError) as e:
+            logger.warning(f"Verrou du cache indisponible pour {csv_path.name}: {e}")
+            return reader(csv_path)
+    
+    def lock(self, csv_path: Path) -> FileLock:
+        data_path, _ = self._entry_paths(csv_path)
+        return FileLock(data_path.with_suffix('.lock'), timeout=self.lock_timeout)
+    
+    def load(self, csv_path: Path) -> Optional[pd.DataFrame]:
+        data_path, meta_path = self._entry_paths(csv_path)
+        meta = self._read_meta(meta_path)
+        if meta is None or not data_path.exists():
+            return None
+        
+        try:
+            stat = csv_path.stat()
+        except OSError:
+            return None
+        
+        if not self._is_valid(csv_path, stat, meta):
+            logger.debug(f"Cache obsolète pour {csv_path.name}")
+            self._remove_entry(csv_path)
+            return None
+        
+        try:
+            df = self._read_data(data_path)
+        except Exception as e:
+            logger.warning(f"Cache illisible pour {csv_path.name}: {e}")
+            self._remove_entry(csv_path)
+            return None
+        
+        if meta['mtime_ns'] != stat.st_mtime_ns:
+            meta['mtime_ns'] = stat.st_mtime_ns
+            self._write_meta(meta_path, meta)
+        
+        logger.debug(f"Cache utilisé pour {csv_path.name}")
+        return df
+    
+    def store(self, csv_path: Path, df: pd.DataFrame) -> bool:
+        data_path, meta_path = self._entry_paths(csv_path)
+        
+        try:
+            stat = csv_path.stat()
+            self.cache_folder.mkdir(parents=True, exist_ok=True)
+            
+            tmp_path = data_path.with_name(f"{data_path.name}.{os.getpid()}.tmp")
+            self._write_data(df, tmp_path)
+            os.replace(tmp_path, data_path)
+            
+            self._write_meta(meta_path, {
+                'source': str(csv_path.resolve()),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': self._hash_file(csv_path),
+                'format': self.file_format,
+                'schema': CACHE_SCHEMA_VERSION
+            })
+            return True
+        
+        except Exception as e:
+            logger.warning(f"Impossible de mettre en cache {csv_path.name}: {e}")
+            for path in (data_path.with_name(f"{data_path.name}.{os.getpid()}.tmp"), data_path, meta_path):
+                path.unlink(missing_ok=True)
+            return False
+    
+    def warm(self, csv_files: Iterable[Path], reader: Callable[[Path], pd.DataFrame]) -> Dict[str, int]:
+        stats = {'cached': 0, 'written': 0, 'failed': 0}
+        
+        for csv_file in csv_files:
+            if self.load(csv_file) is not None:
+                stats['cached'] += 1
+                continue
+            
+            try:
+                with self.lock(csv_file):
+                    stats[self._warm_entry(csv_file, reader)] += 1
+            except (FileLockTimeout, PermissionError) as e:
+                logger.warning(f"Verrou du cache indisponible pour {csv_file.name}: {e}")
+                stats['failed'] += 1
+        
+        return stats
+    
+    def _warm_entry(self, csv_file: Path, reader: Callable[[Path], pd.DataFrame]) -> str:
+        # Un worker a pu écrire l'entrée pendant l'attente du verrou
+        if self.load(csv_file) is not None:
+            return 'cached'
+        
+        try:
+            df = reader(csv_file)
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture de {csv_file}: {e}")
+            return 'failed'
+        
+        return 'written' if self.store(csv_file, df) else 'failed'
+    
+    def prune(self) -> int:
+        if not self.cache_folder.exists():
+            return 0
+        
+        removed = 0
+        for meta_path in self.cache_folder.glob("*.json"):
+            meta = self._read_meta(meta_path)
+            source = Path(meta['source']) if meta else None
+            
+            if source is not None and source.exists():
+                data_path, _ = self._entry_paths(source)
+                if data_path.exists() and self._is_valid(source, source.stat(), meta):
+                    continue
+            
+            for path in self.cache_folder.glob(f"{meta_path.stem}.*"):
+                if not _is_lock_file(path):
+                    path.unlink(missing_ok=True)
+            removed += 1
+        
+        for tmp_path in self.cache_folder.glob("*.tmp"):
+            if not _is_recent_tmp(tmp_path):
+                tmp_path.unlink(missing_ok=True)
+        
+        return removed
+    
+    def clear(self) -> int:
+        if not self.cache_folder.exists():
+            return 0
+        
+        removed = 0
+        for path in self.cache_folder.iterdir():
+            if path.is_file() and not _is_lock_file(path) and not _is_recent_tmp(path):
+                path.unlink()
+                removed += 1
+        return removed
+    
+    def _is_valid(self, csv_path: Path, stat: os.stat_result, meta: dict) -> bool:
+        if meta.get('schema') != CACHE_SCHEMA_VERSION or meta.get('format') != self.file_format:
+            return False
+        if meta.get('size') != stat.st_size:
+            return False
+        if meta.get('mtime_ns') == stat.st_mtime_ns:
+            return True
+        return meta.get('sha256') == self._hash_file(csv_path)
+    
+    def _entry_paths(self, csv_path: Path):
+        key = hashlib.sha1(str(Path(csv_path).resolve()).encode('utf-8')).hexdigest()[:20]
+        data_path = self.cache_folder / f"{key}{FORMAT_EXTENSIONS[self.file_format]}"
+        return data_path, self.cache_folder / f"{key}.json"
+    
+    def _remove_entry(self, csv_path: Path):
+        for path in self._entry_paths(csv_path):
+            path.unlink(missing_ok=True)
+    
+    def _read_data(self, data_path: Path) -> pd.DataFrame:
+        if self.file_format == 'pickle':
+            return pd.read_pickle(data_path)
+        
+        if self.file_format == 'parquet':
+            df = pd.read_parquet(data_path)
+        else:
+            df = pd.read_feather(data_path)
+        
+        # Arrow relit les valeurs manquantes des colonnes texte comme None, read_csv produit NaN
+        for column in df.select_dtypes(include='object').columns:
+            df[column] = df[column].where(df[column].notna(), np.nan)
+        return df
+    
+    def _write_data(self, df: pd.DataFrame, data_path: Path):
+        if self.file_format == 'parquet':
+            df.to_parquet(data_path, index=False)
+        elif self.file_format == 'feather':
+            df.reset_index(drop=True).to_feather(data_path)
+        else:
+            df.to_pickle(data_path)
+    
+    @staticmethod
+    def _read_meta(meta_path: Path) -> Optional[dict]:
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def _write_meta(meta_path: Path, meta: dict):
+        tmp_path = meta_path.with_name(f"{meta_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+    
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+def _is_lock_file(path: Path) -> bool:
+    # Supprimer un verrou tenu par un autre worker ferait verrouiller un nouvel inode au suivant : exclusion perdue
+    return path.suffix == '.lock'
+
+def _is_recent_tmp(path: Path) -> bool:
+    # Un .tmp récent peut être en cours d'écriture par store() ou _write_meta(), hors verrou d'entrée pour ce dernier
+    if path.suffix != '.tmp':
+        return False
+    try:
+        return time.time() - path.stat().st_mtime < TMP_GRACE_SECONDS
+    except OSError:
+        return False
+
+def main(argv=None):
+    from config import Config
+    from src.services.data_loader import DataLoader
+    
+    parser = argparse.ArgumentParser(description="Gestion du cache des fichiers CSV parsés")
+    parser.add_argument('command', choices=['warm', 'prune', 'clear'])
+    parser.add_argument('--folder', type=Path, default=Config.CSV_CACHE_FOLDER)
+    parser.add_argument('--format', default=Config.CSV_CACHE_FORMAT, choices=sorted(FORMAT_EXTENSIONS))
+    args = parser.parse_args(argv)
+    
+    cache = CsvCache(args.folder, args.format)
+    
+    if args.command == 'warm':
+        loader = DataLoader(Config.DATA_FOLDER, Config.CSV_FILE, csv_cache=cache)
+        stats = cache.warm(loader.list_source_files(), loader.parse_csv_file)
+        print(f"Cache préchauffé: {stats['written']} écrits, {stats['cached']} déjà à jour, {stats['failed']} en erreur")
+    elif args.command == 'prune':
+        print(f"Entrées obsolètes supprimées: {cache.prune()}")
+    else:
+        print(f"Fichiers supprimés: {cache.clear()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from src.services.schema import apply_processed_schema
+
+CUBE_METRICS = ['total_cases', 'new_cases', 'total_deaths', 'new_deaths', 'total_recovered', 'active_cases']
+CUMULATIVE_METRICS = ['total_cases', 'total_deaths', 'total_recovered']
+FLOW_METRICS = ['new_cases', 'new_deaths']
+
+GRANULARITIES = {'week': 'W', 'month': 'M'}
+
+FRAME_COLUMNS = ['location', 'iso_code', 'date'] + CUBE_METRICS + ['population']
+
+class DataCube:
+    def __init__(self, locations: np.ndarray, dates: np.ndarray, values: np.ndarray,
+                 observed: np.ndarray, iso_codes: np.ndarray, population: np.ndarray,
+                 last_observed: Optional[np.ndarray] = None, last_valid: Optional[np.ndarray] = None,
+                 prefix_sums: Optional[Dict[str, np.ndarray]] = None, observed_counts: Optional[np.ndarray] = None):
+        self.locations = locations
+        self.dates = dates
+        self.values = values
+        self.observed = observed
+        self.iso_codes = iso_codes
+        self.population = population
+        self.metric_positions = {metric: position for position, metric in enumerate(CUBE_METRICS)}
+        self.location_positions = {location: position for position, location in enumerate(locations)}
+        # Les tableaux dérivés peuvent être fournis déjà calculés (vues mémoire partagées en lecture seule)
+        self.last_observed = _last_positions(observed) if last_observed is None else last_observed
+        self.last_valid = _last_positions(~np.isnan(values)) if last_valid is None else last_valid
+        if prefix_sums is None:
+            prefix_sums = {metric: _prefix_sum(np.nan_to_num(self.metric(metric))) for metric in FLOW_METRICS}
+        self.prefix_sums = prefix_sums
+        self.observed_counts = _prefix_sum(observed.astype(np.int32)) if observed_counts is None else observed_counts
+    
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> 'DataCube':
+        locations, location_codes = np.unique(df['location'].to_numpy(dtype=object), return_inverse=True)
+        dates, date_codes = np.unique(df['date'].to_numpy(dtype='datetime64[ns]'), return_inverse=True)
+        
+        shape = (len(locations), len(dates))
+        values = np.full((len(CUBE_METRICS),) + shape, np.nan)
+        for position, metric in enumerate(CUBE_METRICS):
+            values[position, location_codes, date_codes] = df[metric].to_numpy(dtype='float64', na_value=np.nan)
+        
+        observed = np.zeros(shape, dtype=bool)
+        observed[location_codes, date_codes] = True
+        
+        iso_codes = np.empty(len(locations), dtype=object)
+        iso_codes[location_codes] = df['iso_code'].to_numpy(dtype=object)
+        
+        population = np.full(len(locations), np.nan)
+        known = df['population'].notna().to_numpy()
+        population[location_codes[known]] = pd.to_numeric(df['population'][known]).to_numpy(dtype='float64')
+        
+        return cls(locations, dates, values, observed, iso_codes, population)
+    
+    def __contains__(self, location: str) -> bool:
+        return location in self.location_positions
+    
+    def metric(self, metric: str) -> np.ndarray:
+        return self.values[self.metric_positions[metric]]
+    
+    def forward_filled(self, metric: str) -> np.ndarray:
+        # Dernière valeur connue à chaque date (NaN avant la première observation)
+        position = self.metric_positions[metric]
+        last_valid = self.last_valid[position]
+        filled = np.take_along_axis(self.values[position], np.maximum(last_valid, 0), axis=1)
+        filled[last_valid < 0] = np.nan
+        return filled
+    
+    def find(self, name: str) -> Optional[str]:
+        if name in self.location_positions:
+            return name
+        lowered = name.lower()
+        for location in self.locations:
+            if location.lower() == lowered:
+                return location
+        return None
+    
+    def date_bounds(self, start_date: Optional[pd.Timestamp] = None,
+                    end_date: Optional[pd.Timestamp] = None) -> Tuple[int, int]:
+        start = 0 if start_date is None else int(np.searchsorted(self.dates, np.datetime64(start_date, 'ns'), side='left'))
+        stop = len(self.dates) if end_date is None else int(np.searchsorted(self.dates, np.datetime64(end_date, 'ns'), side='right'))
+        return start, stop
+    
+    def observed_positions(self, location: str) -> np.ndarray:
+        return np.flatnonzero(self.observed[self.location_positions[location]])
+    
+    def timeline(self, location: str, days: Optional[int] = None) -> pd.DataFrame:
+        row = self.location_positions[location]
+        positions = self.observed_positions(location)
+        if days is not None:
+            positions = positions[max(len(positions) - days, 0):] if days >= 0 else positions[-days:]
+        
+        columns = {
+            'location': np.full(len(positions), location, dtype=object),
+            'iso_code': np.full(len(positions), self.iso_codes[row], dtype=object),
+            'date': self.dates[positions]
+        }
+        for metric in CUBE_METRICS:
+            columns[metric] = self.metric(metric)[row, positions]
+        columns['population'] = np.full(len(positions), self.population[row])
+        return pd.DataFrame(columns, columns=FRAME_COLUMNS)
+    
+    def to_frame(self) -> pd.DataFrame:
+        # Format long trié par pays puis date, comme le DataFrame traité dont le cube est issu
+        rows, positions = np.nonzero(self.observed)
+        columns = {
+            'location': self.locations[rows],
+            'iso_code': self.iso_codes[rows],
+            'date': self.dates[positions]
+        }
+        for position, metric in enumerate(CUBE_METRICS):
+            columns[metric] = self.values[position, rows, positions]
+        columns['population'] = self.population[rows]
+        return apply_processed_schema(pd.DataFrame(columns, columns=FRAME_COLUMNS))
+    
+    def snapshot(self, start: int = 0, stop: Optional[int] = None,
+                 rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        # Équivalent de groupby('location').last() sur les dates [start, stop)
+        stop = len(self.dates) if stop is None else stop
+        if stop <= start or stop <= 0:
+            return apply_processed_schema(pd.DataFrame({column: [] for column in FRAME_COLUMNS}))
+        
+        column = stop - 1
+        if rows is None:
+            rows = np.flatnonzero(self.last_observed[:, column] >= start)
+        
+        columns = {
+            'location': self.locations[rows],
+            'iso_code': self.iso_codes[rows],
+            'date': self.dates[self.last_observed[rows, column]]
+        }
+        for position, metric in enumerate(CUBE_METRICS):
+            last_valid = self.last_valid[position, rows, column]
+            values = self.values[position, rows, np.maximum(last_valid, 0)]
+            columns[metric] = np.where(last_valid >= start, values, np.nan)
+        columns['population'] = self.population[rows]
+        return apply_processed_schema(pd.DataFrame(columns, columns=FRAME_COLUMNS))
+    
+    def totals(self, stop: Optional[int] = None) -> Dict[str, float]:
+        column = (len(self.dates) if stop is None else stop) - 1
+        rows = np.flatnonzero(self.last_observed[:, column] >= 0)
+        result = {}
+        for position, metric in enumerate(CUBE_METRICS):
+            last_valid = self.last_valid[position, rows, column]
+            values = self.values[position, rows, np.maximum(last_valid, 0)]
+            result[metric] = float(np.sum(values[last_valid >= 0]))
+        result['locations'] = len(rows)
+        return result
+    
+    def location_rows(self, locations) -> np.ndarray:
+        return np.searchsorted(self.locations, np.asarray(locations, dtype=object))
+    
+    def window_sum(self, metric: str, start: int, stop: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        # Somme de la métrique sur les dates [start, stop) : deux lectures par pays
+        prefix = self.prefix_sums[metric] if rows is None else self.prefix_sums[metric][rows]
+        return prefix[:, stop] - prefix[:, start]
+    
+    def bucket_bounds(self, start: int, stop: int, granularity: str) -> np.ndarray:
+        if stop <= start:
+            return np.array([start], dtype=np.int64)
+        periods = pd.DatetimeIndex(self.dates[start:stop]).to_period(GRANULARITIES[granularity]).start_time.to_numpy()
+        changes = np.flatnonzero(periods[1:] != periods[:-1]) + 1 + start
+        return np.concatenate(([start], changes, [stop]))
+    
+    def bucket_sums(self, metric: str, bounds: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        prefix = self.prefix_sums[metric] if rows is None else self.prefix_sums[metric][rows]
+        return prefix[:, bounds[1:]] - prefix[:, bounds[:-1]]
+    
+    def bucket_observations(self, bounds: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        counts = self.observed_counts if rows is None else self.observed_counts[rows]
+        return counts[:, bounds[1:]] - counts[:, bounds[:-1]]
+    
+    def location_list(self) -> List[str]:
+        return self.locations.tolist()
+    
+    def date_list(self) -> List[str]:
+        return np.datetime_as_string(self.dates, unit='D').tolist()
+    
+    def row_count(self) -> int:
+        return int(self.observed.sum())
+    
+    def memory_usage(self) -> int:
+        arrays = [self.values, self.observed, self.last_observed, self.last_valid, self.dates, self.observed_counts]
+        arrays.extend(self.prefix_sums.values())
+        return int(sum(array.nbytes for array in arrays))
+
+def _last_positions(mask: np.ndarray) -> np.ndarray:
+    # Position de la dernière valeur vraie jusqu'à chaque date incluse, -1 avant la première
+    positions = np.where(mask, np.arange(mask.shape[-1], dtype=np.int32), np.int32(-1))
+    return np.maximum.accumulate(positions, axis=-1)
+
+def _prefix_sum(values: np.ndarray) -> np.ndarray:
+    # Colonne de zéros en tête : la somme sur [start, stop) vaut prefix[:, stop] - prefix[:, start]
+    prefix = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,), dtype=np.result_type(values.dtype, np.int32))
+    np.cumsum(values, axis=-1, out=prefix[..., 1:])
+    return prefix
@@ -1,18 +1,49 @@
 import os
 import glob
+import multiprocessing
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List
+from pickle import PicklingError
+from typing import Optional, List, Tuple
+from src.services.csv_cache import CsvCache
+from src.services.schema import apply_raw_schema, format_bytes, is_raw_column, memory_footprint, unify_categories
 from src.utils.logger import get_logger
+from src.utils.metrics import timed
 
 logger = get_logger(__name__)
 
 class DataLoader:
-    def __init__(self, data_folder: Path, single_csv_path: Path):
+    def __init__(self, data_folder: Path, single_csv_path: Path, csv_cache: Optional[CsvCache] = None,
+                 workers: int = 1, start_method: str = 'spawn'):
         self.data_folder = data_folder
         self.single_csv_path = single_csv_path
-        
+        self.csv_cache = csv_cache
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.start_method = start_method
+    
+    def parse_csv_file(self, csv_file: Path) -> pd.DataFrame:
+        df = pd.read_csv(csv_file, usecols=is_raw_column)
+        raw_size = memory_footprint(df)
+        df = apply_raw_schema(df)
+        logger.debug(f"Schéma compact {Path(csv_file).name}: {format_bytes(raw_size)} → {format_bytes(memory_footprint(df))}")
+        return df
+    
+    def read_csv_file(self, csv_file: Path) -> pd.DataFrame:
+        if self.csv_cache is None:
+            return self.parse_csv_file(csv_file)
+        return self.csv_cache.read_csv(csv_file, self.parse_csv_file)
+    
+    def list_source_files(self) -> List[Path]:
+        files = []
+        if self.data_folder.exists():
+            files.extend(sorted(self.data_folder.glob("*.csv")))
+        if self.single_csv_path.exists():
+            files.append(self.single_csv_path)
+        return files
+    
     def load_multiple_csv_files(self) -> Optional[pd.DataFrame]:
         if not self.data_folder.exists():
             logger.warning(f"Dossier de données non trouvé: {self.data_folder}")
@@ -25,29 +56,64 @@ class DataLoader:
             return None
         
         logger.info(f"Fichiers CSV trouvés: {len(csv_files)}")
+        return self.load_csv_files(csv_files)
+    
+    @timed('load_data', logger)
+    def load_csv_files(self, csv_files: List[Path]) -> Optional[pd.DataFrame]:
         combined_data = []
         
-        for csv_file in sorted(csv_files):
-            try:
-                logger.debug(f"Lecture de {csv_file.name}")
-                df = pd.read_csv(csv_file)
-                file_date = self._extract_date_from_filename(csv_file.name)
-                if file_date:
-                    df['file_date'] = file_date
-                    combined_data.append(df)
-                    
-            except Exception as e:
-                logger.error(f"Erreur lors de la lecture de {csv_file}: {e}")
+        for file_name, file_date, df, error in self._read_dated_files(sorted(csv_files)):
+            if error is not None:
+                logger.error(f"Erreur lors de la lecture de {file_name}: {error}")
                 continue
+            if file_date is not None:
+                combined_data.append(df)
         
         if not combined_data:
             return None
         
-        all_data = pd.concat(combined_data, ignore_index=True)
-        logger.info(f"Données combinées: {len(all_data)} lignes")
+        all_data = pd.concat(unify_categories(combined_data), ignore_index=True)
+        logger.info(f"Données combinées: {len(all_data)} lignes, {format_bytes(memory_footprint(all_data))}")
         
         return all_data
     
+    def _read_dated_files(self, csv_files: List[Path]) -> List[Tuple[str, Optional[pd.Timestamp], Optional[pd.DataFrame], Optional[str]]]:
+        results = None
+        workers = min(self.workers, len(csv_files))
+        
+        if workers > 1:
+            try:
+                context = multiprocessing.get_context(self.start_method)
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                    chunksize = max(1, len(csv_files) // (workers * 4))
+                    results = list(executor.map(self._read_dated_file, csv_files, chunksize=chunksize))
+                logger.info(f"Lecture parallèle de {len(csv_files)} fichiers ({workers} processus)")
+            except (BrokenProcessPool, OSError, PicklingError) as e:
+                logger.warning(f"Lecture parallèle impossible, retour au mode séquentiel: {e}")
+                results = None
+        
+        if results is None:
+            results = [self._read_dated_file(csv_file) for csv_file in csv_files]
+        
+        return sorted(results, key=lambda result: (
+            result[1] is None,
+            result[1] if result[1] is not None else pd.Timestamp.min,
+            result[0]
+        ))
+    
+    def _read_dated_file(self, csv_file: Path) -> Tuple[str, Optional[pd.Timestamp], Optional[pd.DataFrame], Optional[str]]:
+        try:
+            logger.debug(f"Lecture de {csv_file.name}")
+            df = self.read_csv_file(csv_file)
+            file_date = extract_date_from_filename(csv_file.name)
+            if file_date is None:
+                return csv_file.name, None, None, None
+            df['file_date'] = file_date
+            return csv_file.name, file_date, df, None
+        except Exception as e:
+            return csv_file.name, None, None, str(e)
+    
+    @timed('load_data', logger)
     def load_single_csv_file(self) -> Optional[pd.DataFrame]:
         if not self.single_csv_path.exists():
             logger.error(f"Fichier CSV unique non trouvé: {self.single_csv_path}")
@@ -55,7 +121,7 @@ class DataLoader:
         
         try:
             logger.info(f"Lecture du fichier unique: {self.single_csv_path}")
-            df = pd.read_csv(self.single_csv_path)
+            df = self.read_csv_file(self.single_csv_path)
             df['file_date'] = pd.to_datetime('2021-01-01')
             return df
             
@@ -81,14 +147,17 @@ class DataLoader:
         return None
     
     def _extract_date_from_filename(self, filename: str) -> Optional[pd.Timestamp]:
+        return extract_date_from_filename(filename)
+
+def extract_date_from_filename(filename: str) -> Optional[pd.Timestamp]:
+    try:
+        if filename.endswith('.csv'):
+            date_str = filename[:-4]
+            return pd.to_datetime(date_str, format='%m-%d-%Y')
+    except:
         try:
-            if filename.endswith('.csv'):
-                date_str = filename[:-4]
-                return pd.to_datetime(date_str, format='%m-%d-%Y')
+            return pd.to_datetime(date_str, format='%Y-%m-%d')
         except:
-            try:
-                return pd.to_datetime(date_str, format='%Y-%m-%d')
-            except:
-                logger.warning(f"Impossible d'extraire la date de {filename}")
-                return None
-        return None
\ No newline at end of file
+            logger.warning(f"Impossible d'extraire la date de {filename}")
+            return None
+    return None
@@ -1,14 +1,40 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+from src.services.data_cube import CUBE_METRICS, FLOW_METRICS, GRANULARITIES, DataCube
+from src.services.location_index import LocationIndex
+from src.services.rankings import RankingTable
+from src.services.schema import apply_processed_schema, format_bytes, memory_footprint
 from src.models.covid_data import CovidCountryData, GlobalStats, CountryTimeline, CountryComparison
 from src.utils.logger import get_logger
+from src.utils.metrics import timed
+from src.utils.serialization import TIMELINE_COLUMNS, frame_to_records
+
+TIMELINE_RECORD_COLUMNS = [
+    (name, source, 'timestamp' if kind == 'isoformat' else kind) for name, source, kind in TIMELINE_COLUMNS
+]
+
+COMPARISON_ALIGNMENTS = ['date', 'outbreak_day']
 
 logger = get_logger(__name__)
 
 class DataProcessor:
     def process_raw_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.finalize_country_data(self.build_country_data(df))
+    
+    @timed('process_raw_data', logger)
+    def build_country_data(self, df: pd.DataFrame) -> pd.DataFrame:
         logger.info(f"Traitement de {len(df)} lignes de données brutes")
+        country_data = self.aggregate_raw_data(df)
+        return self._calculate_new_values(country_data)
+    
+    def aggregate_raw_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Les rapports du début 2020 n'ont pas de colonne Active (ni parfois Recovered)
+        missing = [column for column in ('Recovered', 'Active') if column not in df.columns]
+        if missing:
+            df = df.assign(**{column: np.nan for column in missing})
+        
         groupby_cols = ['Country_Region']
         
         if 'file_date' in df.columns:
@@ -16,7 +42,7 @@ class DataProcessor:
             logger.info("Données multi-temporelles détectées")
         
         if 'Province_State' in df.columns:
-            country_data = df.groupby(groupby_cols).agg({
+            country_data = df.groupby(groupby_cols, observed=True).agg({
                 'Confirmed': 'sum',
                 'Deaths': 'sum',
                 'Recovered': 'sum',
@@ -41,12 +67,20 @@ class DataProcessor:
         
         country_data = country_data.rename(columns=rename_dict)
         
+        country_data['location'] = country_data['location'].astype(object)
+        for column in ('total_cases', 'total_deaths', 'total_recovered', 'active_cases'):
+            if column in country_data.columns:
+                country_data[column] = country_data[column].astype('float64')
+        
         country_data['date'] = pd.to_datetime(country_data['date'])
         country_data['iso_code'] = country_data['location'].apply(
             lambda x: x.replace(' ', '').upper()[:3] if pd.notna(x) else 'UNK'
         )
-        country_data = self._calculate_new_values(country_data)
         country_data['population'] = None
+        return country_data
+    
+    @timed('finalize_data', logger)
+    def finalize_country_data(self, country_data: pd.DataFrame) -> pd.DataFrame:
         columns_to_keep = [
             'location', 'iso_code', 'date', 'total_cases', 'new_cases', 
             'total_deaths', 'new_deaths', 'total_recovered', 'active_cases', 'population'
@@ -56,15 +90,56 @@ class DataProcessor:
         country_data = country_data[
             country_data['total_cases'].notna() & (country_data['total_cases'] > 0)
         ]
+        country_data = apply_processed_schema(country_data)
         
         logger.info(
             f"Données traitées: {len(country_data)} entrées, "
             f"{len(country_data['location'].unique())} pays, "
-            f"{len(country_data['date'].unique())} dates"
+            f"{len(country_data['date'].unique())} dates, "
+            f"{format_bytes(memory_footprint(country_data))}"
         )
         
         return country_data
     
+    @timed('merge_data', logger)
+    def merge_country_data(self, country_data: pd.DataFrame, new_data: pd.DataFrame,
+                           replaced_dates: List[pd.Timestamp]) -> pd.DataFrame:
+        kept = country_data[~country_data['date'].isin(replaced_dates)]
+        merged = pd.concat([kept, new_data], ignore_index=True)
+        merged = merged.sort_values(['location', 'date']).reset_index(drop=True)
+        
+        if kept['date'].nunique() <= 1 or merged['date'].nunique() <= 1:
+            return self._calculate_new_values(merged.drop(columns=['new_cases', 'new_deaths']))
+        
+        locations = merged['location'].to_numpy()
+        dates = merged['date'].to_numpy()
+        replaced = np.sort(pd.to_datetime(pd.Index(replaced_dates)).to_numpy())
+        
+        same_as_previous = np.zeros(len(merged), dtype=bool)
+        same_as_previous[1:] = locations[1:] == locations[:-1]
+        
+        # Une ligne change de diff si une date remplacée tombe entre la date précédente du pays et la sienne
+        replaced_up_to_date = np.searchsorted(replaced, dates, side='right')
+        replaced_before_previous = np.zeros(len(merged), dtype=replaced_up_to_date.dtype)
+        previous_rows = np.flatnonzero(same_as_previous)
+        replaced_before_previous[previous_rows] = np.searchsorted(replaced, dates[previous_rows - 1], side='left')
+        
+        rows = np.flatnonzero(replaced_up_to_date > replaced_before_previous)
+        has_previous = same_as_previous[rows]
+        
+        logger.info(f"Recalcul incrémental des nouveaux cas sur {len(rows)} lignes")
+        for total_col, new_col in (('total_cases', 'new_cases'), ('total_deaths', 'new_deaths')):
+            totals = merged[total_col].to_numpy(dtype='float64')
+            previous = np.full(len(rows), np.nan)
+            previous[has_previous] = totals[rows[has_previous] - 1]
+            
+            diff = totals[rows] - previous
+            new_values = merged[new_col].to_numpy(dtype='float64', copy=True)
+            new_values[rows] = np.clip(np.nan_to_num(diff, nan=0.0), 0, None)
+            merged[new_col] = new_values
+        
+        return merged
+    
     def _calculate_new_values(self, df: pd.DataFrame) -> pd.DataFrame:
         if len(df['date'].unique()) > 1:
             logger.info("Calcul des nouveaux cas et décès")
@@ -80,7 +155,21 @@ class DataProcessor:
         
         return df
     
-    def get_country_data(self, df: pd.DataFrame, country_name: str, days: int = 30) -> Optional[CountryTimeline]:
+    def get_country_timeline(self, df: Optional[pd.DataFrame], country_name: str, days: int = 30,
+                             index: Optional[LocationIndex] = None,
+                             cube: Optional[DataCube] = None) -> Optional[pd.DataFrame]:
+        if cube is not None and index is not None:
+            location = index.resolve(country_name)
+            if location is None or location not in cube:
+                return None
+            return cube.timeline(location, days)
+        
+        if index is not None:
+            match = index.locate(country_name)
+            if match is None:
+                return None
+            return df.iloc[slice(*match[1])].tail(days)
+        
         country_data = df[df['location'].str.lower() == country_name.lower()]
         
         if country_data.empty:
@@ -89,22 +178,17 @@ class DataProcessor:
         if country_data.empty:
             return None
         
-        country_data = country_data.sort_values('date').tail(days)
-        
-        data_list = []
-        for _, row in country_data.iterrows():
-            data_list.append(CovidCountryData(
-                location=row['location'],
-                iso_code=row['iso_code'],
-                date=row['date'],
-                total_cases=int(row['total_cases']) if pd.notna(row['total_cases']) else 0,
-                new_cases=int(row['new_cases']) if pd.notna(row['new_cases']) else 0,
-                total_deaths=int(row['total_deaths']) if pd.notna(row['total_deaths']) else 0,
-                new_deaths=int(row['new_deaths']) if pd.notna(row['new_deaths']) else 0,
-                total_recovered=int(row['total_recovered']) if pd.notna(row['total_recovered']) else None,
-                active_cases=int(row['active_cases']) if pd.notna(row['active_cases']) else None,
-                population=row['population'] if pd.notna(row['population']) else None
-            ))
+        return country_data.sort_values('date').tail(days)
+    
+    def get_country_data(self, df: pd.DataFrame, country_name: str, days: int = 30,
+                         index: Optional[LocationIndex] = None,
+                         cube: Optional[DataCube] = None) -> Optional[CountryTimeline]:
+        country_data = self.get_country_timeline(df, country_name, days, index=index, cube=cube)
+        if country_data is None:
+            return None
+        
+        records = frame_to_records(country_data, TIMELINE_RECORD_COLUMNS)
+        data_list = [CovidCountryData(**record) for record in records]
         
         is_temporal = len(country_data['date'].unique()) > 1
         
@@ -115,8 +199,98 @@ class DataProcessor:
             temporal=is_temporal
         )
     
-    def get_global_stats(self, df: pd.DataFrame) -> GlobalStats:
-        latest_data = df.groupby('location').last().reset_index()
+    def get_latest_data(self, df: pd.DataFrame, cube: Optional[DataCube] = None) -> pd.DataFrame:
+        if cube is not None:
+            return cube.snapshot()
+        return df.groupby('location').last().reset_index()
+    
+    def get_top_countries(self, latest_data: pd.DataFrame, metric: str, limit: int = 10,
+                          rankings: Optional[RankingTable] = None,
+                          as_of: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        if rankings is not None and metric in rankings:
+            return rankings.top(metric, limit, as_of)
+        return latest_data.nlargest(limit, metric)
+    
+    def get_filtered_data(self, df: Optional[pd.DataFrame], start_date: Optional[pd.Timestamp] = None,
+                          end_date: Optional[pd.Timestamp] = None,
+                          cube: Optional[DataCube] = None) -> pd.DataFrame:
+        if cube is not None:
+            start, stop = cube.date_bounds(start_date, end_date)
+            latest_data = cube.snapshot(start, stop)
+            rows = cube.location_rows(latest_data['location'])
+            for metric in FLOW_METRICS:
+                latest_data[f'period_{metric}'] = cube.window_sum(metric, start, stop, rows)
+            return latest_data
+        
+        window = df[self._date_mask(df, start_date, end_date)]
+        latest_data = self.get_latest_data(window)
+        increments = window.groupby('location', observed=True)[FLOW_METRICS].sum()
+        for metric in FLOW_METRICS:
+            latest_data[f'period_{metric}'] = increments[metric].reindex(latest_data['location']).to_numpy(dtype='float64')
+        return latest_data
+    
+    def get_period_increments(self, df: Optional[pd.DataFrame], granularity: str,
+                              start_date: Optional[pd.Timestamp] = None,
+                              end_date: Optional[pd.Timestamp] = None,
+                              locations: Optional[List[str]] = None,
+                              cube: Optional[DataCube] = None) -> pd.DataFrame:
+        if cube is not None:
+            return self._period_increments_cube(cube, granularity, start_date, end_date, locations)
+        
+        window = df[self._date_mask(df, start_date, end_date)]
+        if locations is not None:
+            window = window[window['location'].isin(locations)]
+        
+        period = window['date'].dt.to_period(GRANULARITIES[granularity]).dt.start_time.rename('period')
+        buckets = window.groupby([window['location'].astype(object), period])[FLOW_METRICS].sum()
+        return buckets.reset_index().astype({metric: 'float64' for metric in FLOW_METRICS})
+    
+    def _period_increments_cube(self, cube: DataCube, granularity: str,
+                                start_date: Optional[pd.Timestamp], end_date: Optional[pd.Timestamp],
+                                locations: Optional[List[str]]) -> pd.DataFrame:
+        start, stop = cube.date_bounds(start_date, end_date)
+        bounds = cube.bucket_bounds(start, stop, granularity)
+        rows = np.arange(len(cube.locations)) if locations is None else np.sort(cube.location_rows(locations))
+        
+        # Seuls les couples pays × période avec au moins une observation sont renvoyés
+        present = cube.bucket_observations(bounds, rows) > 0
+        row_positions, bucket_positions = np.nonzero(present)
+        periods = pd.DatetimeIndex(cube.dates[bounds[:-1]]).to_period(GRANULARITIES[granularity]).start_time
+        
+        result = pd.DataFrame({
+            'location': cube.locations[rows][row_positions],
+            'period': periods.to_numpy()[bucket_positions]
+        })
+        for metric in FLOW_METRICS:
+            result[metric] = cube.bucket_sums(metric, bounds, rows)[row_positions, bucket_positions]
+        return result
+    
+    def _date_mask(self, df: pd.DataFrame, start_date: Optional[pd.Timestamp],
+                   end_date: Optional[pd.Timestamp]) -> pd.Series:
+        mask = pd.Series(True, index=df.index)
+        if start_date is not None:
+            mask &= df['date'] >= start_date
+        if end_date is not None:
+            mask &= df['date'] <= end_date
+        return mask
+    
+    def get_global_stats(self, df: pd.DataFrame, latest_data: Optional[pd.DataFrame] = None,
+                         cube: Optional[DataCube] = None) -> GlobalStats:
+        if cube is not None:
+            totals = cube.totals()
+            return GlobalStats(
+                total_cases=int(totals['total_cases']),
+                total_deaths=int(totals['total_deaths']),
+                total_recovered=int(totals['total_recovered']),
+                active_cases=int(totals['active_cases']),
+                new_cases=int(totals['new_cases']),
+                new_deaths=int(totals['new_deaths']),
+                countries_count=totals['locations'],
+                last_update=pd.Timestamp(cube.dates[-1])
+            )
+        
+        if latest_data is None:
+            latest_data = self.get_latest_data(df)
         
         total_cases = int(latest_data['total_cases'].sum())
         total_deaths = int(latest_data['total_deaths'].sum())
@@ -140,11 +314,124 @@ class DataProcessor:
             last_update=last_update
         )
     
-    def compare_countries(self, df: pd.DataFrame, countries: List[str], metric: str) -> CountryComparison:
+    def compare_countries(self, df: Optional[pd.DataFrame], countries: List[str], metric: str,
+                          index: Optional[LocationIndex] = None,
+                          cube: Optional[DataCube] = None,
+                          align: Optional[str] = None,
+                          outbreak_threshold: int = 100) -> CountryComparison:
+        if metric not in CUBE_METRICS and df is not None and metric in df.columns:
+            return self._compare_countries_frame(df, countries, metric, index)
+        
+        locations = self._resolve_locations(df, countries, index, cube)
+        if cube is None:
+            # Un seul pivot sur les pays demandés plutôt qu'un balayage par pays
+            cube = DataCube.build(df[df['location'].isin(set(locations.values()))])
+        
+        found = [country for country in countries if locations.get(country) in cube]
+        if not found:
+            return CountryComparison(countries=countries, metric=metric, comparison_data={},
+                                     align=align, axis=None if align is None else [])
+        
+        rows = cube.location_rows([locations[country] for country in found])
+        observed = cube.observed[rows]
+        values = cube.metric(metric)[rows] if metric in cube.metric_positions else None
+        last = cube.last_observed[rows, -1]
+        
+        totals = {}
+        for column in ('total_cases', 'total_deaths', 'total_recovered', 'active_cases'):
+            totals[column] = np.nan_to_num(cube.metric(column)[rows, last]).astype(int).tolist()
+        
+        if align is None:
+            comparison_data = self._comparison_series(cube, found, observed, values)
+            axis = None
+        else:
+            axis, comparison_data = self._aligned_series(cube, found, rows, observed, values, align, outbreak_threshold)
+        
+        for position, country in enumerate(found):
+            for column, column_totals in totals.items():
+                comparison_data[country][column] = column_totals[position]
+        
+        return CountryComparison(
+            countries=countries,
+            metric=metric,
+            comparison_data=comparison_data,
+            align=align,
+            axis=axis
+        )
+    
+    def _resolve_locations(self, df: Optional[pd.DataFrame], countries: List[str],
+                           index: Optional[LocationIndex], cube: Optional[DataCube]) -> Dict[str, str]:
+        if index is not None:
+            resolved = {country: index.resolve(country, fuzzy=False) for country in countries}
+        elif cube is not None:
+            resolved = {country: cube.find(country) for country in countries}
+        else:
+            lookup = {str(location).lower(): location for location in df['location'].unique()}
+            resolved = {country: lookup.get(country.lower()) for country in countries}
+        return {country: location for country, location in resolved.items() if location is not None}
+    
+    def _comparison_series(self, cube: DataCube, found: List[str], observed: np.ndarray,
+                           values: Optional[np.ndarray]) -> Dict[str, Dict[str, Any]]:
+        date_labels = np.datetime_as_string(cube.dates, unit='D')
+        comparison_data = {}
+        for position, country in enumerate(found):
+            positions = np.flatnonzero(observed[position])
+            comparison_data[country] = {
+                'dates': date_labels[positions].tolist(),
+                'values': np.nan_to_num(values[position, positions]).astype(int).tolist() if values is not None else [0]
+            }
+        return comparison_data
+    
+    def _aligned_series(self, cube: DataCube, found: List[str], rows: np.ndarray, observed: np.ndarray,
+                        values: Optional[np.ndarray], align: str,
+                        outbreak_threshold: int) -> Tuple[list, Dict[str, Dict[str, Any]]]:
+        if values is None:
+            values = np.zeros(observed.shape)
+        
+        if align == 'date':
+            columns = np.flatnonzero(observed.any(axis=0))
+            matrix = np.where(observed[:, columns], values[:, columns], np.nan)
+            axis = np.datetime_as_string(cube.dates[columns], unit='D').tolist()
+            outbreaks = None
+        else:
+            # Jour 0 = première date où total_cases atteint le seuil, décalages en jours calendaires
+            reached = observed & (np.nan_to_num(cube.metric('total_cases')[rows]) >= outbreak_threshold)
+            has_outbreak = reached.any(axis=1)
+            first = reached.argmax(axis=1)
+            day_numbers = cube.dates.astype('datetime64[D]').astype(np.int64)
+            offsets = day_numbers[None, :] - day_numbers[first][:, None]
+            
+            keep = observed & has_outbreak[:, None] & (offsets >= 0)
+            days = np.unique(offsets[keep])
+            matrix = np.full((len(found), len(days)), np.nan)
+            row_positions, date_positions = np.nonzero(keep)
+            matrix[row_positions, np.searchsorted(days, offsets[keep])] = values[row_positions, date_positions]
+            axis = days.tolist()
+            outbreak_labels = np.datetime_as_string(cube.dates[first], unit='D')
+            outbreaks = np.where(has_outbreak, outbreak_labels, None).tolist()
+        
+        missing = np.isnan(matrix)
+        integers = np.where(missing, 0, matrix).astype(np.int64).tolist()
+        comparison_data = {}
+        for position, country in enumerate(found):
+            series = integers[position]
+            for column in np.flatnonzero(missing[position]):
+                series[column] = None
+            comparison_data[country] = {'values': series}
+            if outbreaks is not None:
+                comparison_data[country]['outbreak_date'] = outbreaks[position]
+        return axis, comparison_data
+    
+    def _compare_countries_frame(self, df: pd.DataFrame, countries: List[str], metric: str,
+                                 index: Optional[LocationIndex] = None) -> CountryComparison:
         comparison_data = {}
         
         for country in countries:
-            country_data = df[df['location'].str.lower() == country.lower()]
+            if index is not None:
+                match = index.locate(country, fuzzy=False)
+                country_data = df.iloc[slice(*match[1])] if match else df.iloc[0:0]
+            else:
+                country_data = df[df['location'].str.lower() == country.lower()]
             if not country_data.empty:
                 country_data = country_data.sort_values('date')
                 
@@ -163,5 +450,7 @@ class DataProcessor:
             comparison_data=comparison_data
         )
     
-    def get_countries_list(self, df: pd.DataFrame) -> List[str]:
+    def get_countries_list(self, df: Optional[pd.DataFrame], cube: Optional[DataCube] = None) -> List[str]:
+        if cube is not None:
+            return cube.location_list()
         return sorted(df['location'].unique().tolist())
\ No newline at end of file
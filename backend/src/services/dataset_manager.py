@@ -0,0 +1,357 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+import pandas as pd
+from src.services.data_loader import DataLoader, extract_date_from_filename
+from src.models.covid_data import GlobalStats
+from src.services.data_cube import DataCube
+from src.services.data_processor import DataProcessor
+from src.services.location_index import LocationIndex, sort_for_index
+from src.services.rankings import RankingTable
+from src.services.schema import memory_footprint
+from src.services.shared_store import SharedDatasetStore
+from src.utils.logger import get_logger
+from src.utils.metrics import registry, timed
+from src.utils.single_flight import SingleFlight, SingleFlightTimeout
+
+logger = get_logger(__name__)
+
+dataset_build_duration = registry.histogram(
+    'covid_dataset_build_duration_seconds', "Durée de construction du dataset",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+
+FileSignature = Tuple[Tuple[str, int, int], ...]
+
+@dataclass(frozen=True)
+class Dataset:
+    version: str
+    # None pour un dataset attaché en mémoire partagée : seules les vues mmap du cube sont chargées
+    frame: Optional[pd.DataFrame]
+    latest: pd.DataFrame
+    global_stats: GlobalStats
+    index: LocationIndex
+    cube: DataCube
+    rankings: RankingTable
+    signature: FileSignature
+    built_at: datetime
+    last_modified: Optional[datetime]
+    build_mode: str = 'full'
+    _frame_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    
+    @property
+    def data(self) -> pd.DataFrame:
+        # DataFrame long reconstruit depuis le cube à la première demande (chemins sans équivalent cube)
+        if self.frame is None:
+            with self._frame_lock:
+                if self.frame is None:
+                    logger.info(f"Matérialisation du DataFrame long du dataset {self.version}")
+                    object.__setattr__(self, 'frame', self.cube.to_frame())
+        return self.frame
+    
+    @property
+    def row_count(self) -> int:
+        return len(self.frame) if self.frame is not None else self.cube.row_count()
+    
+    def memory_usage(self) -> dict:
+        return {
+            'data': memory_footprint(self.frame) if self.frame is not None else 0,
+            'latest': memory_footprint(self.latest),
+            'cube': self.cube.memory_usage(),
+            'rankings': self.rankings.memory_usage()
+        }
+
+@dataclass
+class _IncrementalState:
+    signature: FileSignature
+    country_data: pd.DataFrame
+
+class DatasetManager:
+    def __init__(self, loader: DataLoader, processor: DataProcessor,
+                 max_age: Optional[timedelta] = None, check_interval: float = 0.0,
+                 build_timeout: Optional[float] = None, shared_store: Optional[SharedDatasetStore] = None):
+        self.loader = loader
+        self.processor = processor
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self.build_timeout = build_timeout
+        self.shared_store = shared_store
+        self._dataset: Optional[Dataset] = None
+        self._incremental_state: Optional[_IncrementalState] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.watched = False
+        self.reload_count = 0
+        self.last_reload_seconds: Optional[float] = None
+        self.last_reload_at: Optional[datetime] = None
+    
+    def get_dataset(self) -> Optional[Dataset]:
+        dataset = self._dataset
+        if dataset is not None and (self.watched or (
+                not self._is_expired(dataset) and time.monotonic() - self._last_check < self.check_interval)):
+            # Sous surveillance, le watcher publie les nouvelles versions : les requêtes ne touchent jamais le disque
+            return dataset
+        
+        try:
+            return self._flight.do('dataset', self._refresh, timeout=self.build_timeout)
+        except SingleFlightTimeout:
+            if self._dataset is None:
+                raise
+            logger.warning("Reconstruction du dataset trop longue, version précédente servie")
+            return self._dataset
+    
+    @property
+    def current(self) -> Optional[Dataset]:
+        return self._dataset
+    
+    @property
+    def current_version(self) -> Optional[str]:
+        dataset = self._dataset
+        return dataset.version if dataset is not None else None
+    
+    def reload(self) -> Optional[Dataset]:
+        return self._flight.do('dataset', self._refresh)
+    
+    def status(self) -> dict:
+        dataset = self._dataset
+        return {
+            'loaded': dataset is not None,
+            'version': dataset.version if dataset is not None else None,
+            'build_mode': dataset.build_mode if dataset is not None else None,
+            'built_at': dataset.built_at.isoformat() if dataset is not None else None,
+            'last_modified': dataset.last_modified.isoformat() if dataset is not None and dataset.last_modified else None,
+            'reloads': self.reload_count,
+            'last_reload_seconds': round(self.last_reload_seconds, 3) if self.last_reload_seconds is not None else None,
+            'last_reload_at': self.last_reload_at.isoformat() if self.last_reload_at is not None else None,
+            'shared_role': self._shared_role()
+        }
+    
+    def _shared_role(self) -> Optional[str]:
+        if self.shared_store is None:
+            return None
+        return 'leader' if self.shared_store.is_leader else 'follower'
+    
+    def _refresh(self) -> Optional[Dataset]:
+        with self._lock:
+            if self.shared_store is not None and not self.shared_store.try_lead():
+                dataset = self._follow()
+                if dataset is not None:
+                    return dataset
+            
+            signature = self.compute_signature()
+            self._last_check = time.monotonic()
+            dataset = self._dataset
+            
+            if dataset is not None and dataset.signature == signature and not self._is_expired(dataset):
+                return dataset
+            
+            if dataset is not None:
+                reason = "expiration" if dataset.signature == signature else "fichiers modifiés"
+                logger.info(f"Reconstruction du dataset ({reason})")
+            
+            start = time.perf_counter()
+            # Le snapshot précédent reste intact : les requêtes en cours terminent sur l'ancienne version
+            self._dataset = self._build(signature, allow_incremental=dataset is not None and not self._is_expired(dataset))
+            if self._dataset is not None and self.shared_store is not None and self.shared_store.is_leader:
+                self._publish(self._dataset)
+            self._record_reload(start)
+            return self._dataset
+    
+    def _record_reload(self, start: float):
+        self.last_reload_seconds = time.perf_counter() - start
+        self.last_reload_at = datetime.now()
+        self.reload_count += 1
+    
+    def _follow(self) -> Optional[Dataset]:
+        self._last_check = time.monotonic()
+        manifest = self.shared_store.read_manifest()
+        if manifest is None and self._dataset is None:
+            # Démarrage à froid : attendre la première publication plutôt que de construire dans chaque worker
+            manifest = self.shared_store.wait_for_manifest(self.build_timeout)
+        if manifest is None:
+            if self._dataset is None:
+                logger.warning("Aucun dataset partagé publié, construction locale")
+            return self._dataset
+        
+        dataset = self._dataset
+        if dataset is not None and dataset.version == manifest['version']:
+            return dataset
+        
+        start = time.perf_counter()
+        try:
+            self._dataset = self._attach(manifest['version'])
+        except (OSError, KeyError, ValueError) as e:
+            logger.error(f"Impossible d'attacher le dataset partagé {manifest['version']}: {e}")
+            return dataset
+        self._record_reload(start)
+        logger.info(f"Dataset partagé {self._dataset.version} attaché en {self.last_reload_seconds:.2f}s")
+        return self._dataset
+    
+    def _publish(self, dataset: Dataset):
+        meta = {
+            'signature': dataset.signature,
+            'built_at': dataset.built_at.isoformat(),
+            'last_modified': dataset.last_modified.isoformat() if dataset.last_modified else None,
+            'build_mode': dataset.build_mode
+        }
+        try:
+            self.shared_store.publish(dataset.version, dataset.cube, dataset.rankings, meta)
+        except OSError as e:
+            logger.error(f"Publication du dataset partagé impossible: {e}")
+    
+    def _attach(self, version: str) -> Dataset:
+        cube, rankings, meta = self.shared_store.attach(version)
+        last_modified = meta.get('last_modified')
+        return self._assemble(
+            None, cube, rankings,
+            version=meta['version'],
+            signature=tuple(tuple(entry) for entry in meta['signature']),
+            built_at=datetime.fromisoformat(meta['built_at']),
+            last_modified=datetime.fromisoformat(last_modified) if last_modified else None,
+            build_mode='shared'
+        )
+    
+    def invalidate(self):
+        with self._lock:
+            self._dataset = None
+            self._incremental_state = None
+            self._last_check = 0.0
+    
+    def compute_signature(self) -> FileSignature:
+        signature = []
+        for path in self.loader.list_source_files():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            signature.append((str(path), stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
+    
+    def _is_expired(self, dataset: Dataset) -> bool:
+        # Un dataset attaché n'expire pas : le processus publicateur gère l'expiration
+        if self.max_age is None or dataset.build_mode == 'shared':
+            return False
+        return datetime.now() - dataset.built_at > self.max_age
+    
+    def _build(self, signature: FileSignature, allow_incremental: bool = False) -> Optional[Dataset]:
+        start = time.perf_counter()
+        country_data = self._build_incremental(signature) if allow_incremental else None
+        build_mode = 'incremental'
+        
+        if country_data is None:
+            build_mode = 'full'
+            country_data = self._build_full(signature)
+            if country_data is None:
+                return None
+        
+        processed_df = sort_for_index(self.processor.finalize_country_data(country_data))
+        with timed('build_cube'):
+            cube = DataCube.build(processed_df)
+        with timed('build_rankings'):
+            rankings = RankingTable.build(cube)
+        dataset = self._assemble(
+            processed_df, cube, rankings,
+            version=self._make_version(signature),
+            signature=signature,
+            built_at=datetime.now(),
+            last_modified=self._last_modified(signature),
+            build_mode=build_mode
+        )
+        
+        duration = time.perf_counter() - start
+        dataset_build_duration.observe(duration, mode=build_mode)
+        logger.info(f"Dataset {dataset.version} construit en {duration:.2f}s ({build_mode})")
+        return dataset
+    
+    def _assemble(self, processed_df: Optional[pd.DataFrame], cube: DataCube, rankings: RankingTable, version: str,
+                  signature: FileSignature, built_at: datetime, last_modified: Optional[datetime],
+                  build_mode: str) -> Dataset:
+        latest_data = self.processor.get_latest_data(processed_df, cube=cube)
+        return Dataset(
+            version=version,
+            frame=processed_df,
+            latest=latest_data,
+            global_stats=self.processor.get_global_stats(processed_df, latest_data, cube=cube),
+            index=LocationIndex.build(processed_df) if processed_df is not None else LocationIndex.from_cube(cube),
+            cube=cube,
+            rankings=rankings,
+            signature=signature,
+            built_at=built_at,
+            last_modified=last_modified,
+            build_mode=build_mode
+        )
+    
+    def _build_full(self, signature: FileSignature) -> Optional[pd.DataFrame]:
+        self._incremental_state = None
+        raw_df = self.loader.load_multiple_csv_files()
+        from_data_folder = raw_df is not None
+        
+        if raw_df is None:
+            logger.info("Fallback vers le fichier unique")
+            raw_df = self.loader.load_single_csv_file()
+        if raw_df is None or raw_df.empty:
+            return None
+        
+        country_data = self.processor.build_country_data(raw_df)
+        
+        if from_data_folder:
+            self._incremental_state = _IncrementalState(signature, country_data)
+        return country_data
+    
+    def _build_incremental(self, signature: FileSignature) -> Optional[pd.DataFrame]:
+        state = self._incremental_state
+        if state is None:
+            return None
+        
+        previous = {path: (size, mtime_ns) for path, size, mtime_ns in state.signature}
+        current = {path: (size, mtime_ns) for path, size, mtime_ns in signature}
+        data_folder = Path(self.loader.data_folder)
+        
+        if any(path not in current for path in previous):
+            logger.info("Fichiers supprimés, reconstruction complète")
+            return None
+        
+        changed = [Path(path) for path, stat in current.items() if previous.get(path) != stat]
+        if any(path.parent != data_folder for path in changed):
+            return None
+        
+        replaced_dates = {extract_date_from_filename(path.name) for path in changed}
+        replaced_dates.discard(None)
+        if not replaced_dates:
+            self._incremental_state = _IncrementalState(signature, state.country_data)
+            return state.country_data
+        
+        files_to_load = [
+            Path(path) for path in current
+            if Path(path).parent == data_folder and extract_date_from_filename(Path(path).name) in replaced_dates
+        ]
+        logger.info(f"Ingestion incrémentale de {len(files_to_load)} fichier(s)")
+        
+        raw_df = self.loader.load_csv_files(files_to_load)
+        if raw_df is None:
+            new_data = state.country_data.iloc[0:0].drop(columns=['new_cases', 'new_deaths'])
+        else:
+            new_data = self.processor.aggregate_raw_data(raw_df)
+        
+        country_data = self.processor.merge_country_data(state.country_data, new_data, sorted(replaced_dates))
+        self._incremental_state = _IncrementalState(signature, country_data)
+        return country_data
+    
+    @staticmethod
+    def _make_version(signature: FileSignature) -> str:
+        digest = hashlib.sha1()
+        for path, size, mtime_ns in signature:
+            digest.update(f"{Path(path).name}:{size}:{mtime_ns};".encode('utf-8'))
+        return digest.hexdigest()[:12]
+    
+    @staticmethod
+    def _last_modified(signature: FileSignature) -> Optional[datetime]:
+        mtimes: List[int] = [mtime_ns for _, _, mtime_ns in signature]
+        if not mtimes:
+            return None
+        return datetime.fromtimestamp(max(mtimes) / 1e9, tz=timezone.utc)
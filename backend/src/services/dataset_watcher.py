@@ -0,0 +1,114 @@
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from src.services.dataset_manager import DatasetManager
+from src.utils.logger import get_logger
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+logger = get_logger(__name__)
+
+class DatasetWatcher:
+    def __init__(self, manager: DatasetManager, interval: float = 5.0, use_inotify: bool = True, debounce: float = 0.5):
+        self.manager = manager
+        self.interval = interval
+        self.debounce = debounce
+        self.mode = 'inotify' if use_inotify and INotify is not None else 'polling'
+        self.last_check: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._pid: Optional[int] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+    
+    def start(self):
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self.manager.watched = True
+            self._thread = threading.Thread(target=self._run, name='dataset-watcher', daemon=True)
+            self._thread.start()
+            logger.info(f"Surveillance de {self.manager.loader.data_folder} démarrée ({self.mode}, {self.interval}s)")
+    
+    def ensure_started(self):
+        # Démarrage paresseux : après un fork (workers gunicorn), le thread du parent n'existe plus
+        if not self.running and not self._stop.is_set():
+            self.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self.manager.watched = False
+    
+    def check(self) -> bool:
+        previous = self.manager.status()['version']
+        try:
+            dataset = self.manager.reload()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Erreur de rechargement du dataset: {e}")
+            return False
+        finally:
+            self.last_check = datetime.now()
+        
+        self.last_error = None
+        version = dataset.version if dataset is not None else None
+        if version == previous:
+            return False
+        
+        logger.info(f"Dataset {version} publié (rechargement en {self.manager.last_reload_seconds:.2f}s)")
+        return True
+    
+    def status(self) -> dict:
+        return {
+            'running': self.running,
+            'mode': self.mode,
+            'interval': self.interval,
+            'last_check': self.last_check.isoformat() if self.last_check is not None else None,
+            'last_error': self.last_error
+        }
+    
+    def _run(self):
+        inotify = self._open_inotify() if self.mode == 'inotify' else None
+        try:
+            while not self._stop.is_set():
+                self.check()
+                self._wait(inotify)
+        finally:
+            if inotify is not None:
+                inotify.close()
+    
+    def _wait(self, inotify):
+        if inotify is None:
+            self._stop.wait(self.interval)
+            return
+        
+        # Sans événement, le délai sert de vérification périodique (expiration, dossier remplacé)
+        if inotify.read(timeout=int(self.interval * 1000)):
+            # Regrouper les écritures successives d'une même copie de fichiers
+            while inotify.read(timeout=int(self.debounce * 1000)):
+                pass
+    
+    def _open_inotify(self):
+        folder = Path(self.manager.loader.data_folder)
+        try:
+            inotify = INotify()
+            inotify.add_watch(folder, flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE | flags.CREATE)
+            return inotify
+        except OSError as e:
+            logger.warning(f"inotify indisponible pour {folder} ({e}), bascule en scrutation")
+            self.mode = 'polling'
+            return None
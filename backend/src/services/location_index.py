@@ -0,0 +1,185 @@
+import bisect
+import unicodedata
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+COUNTRY_ALIASES = {
+    'usa': 'US',
+    'u.s.': 'US',
+    'u.s.a.': 'US',
+    'united states': 'US',
+    'united states of america': 'US',
+    'etats-unis': 'US',
+    'uk': 'United Kingdom',
+    'gbr': 'United Kingdom',
+    'great britain': 'United Kingdom',
+    'royaume-uni': 'United Kingdom',
+    'england': 'United Kingdom',
+    'south korea': 'Korea, South',
+    'korea': 'Korea, South',
+    'republic of korea': 'Korea, South',
+    'coree du sud': 'Korea, South',
+    'kor': 'Korea, South',
+    'north korea': 'Korea, North',
+    'prk': 'Korea, North',
+    'deu': 'Germany',
+    'allemagne': 'Germany',
+    'esp': 'Spain',
+    'espagne': 'Spain',
+    'italie': 'Italy',
+    'chn': 'China',
+    'chine': 'China',
+    'jpn': 'Japan',
+    'japon': 'Japan',
+    'bresil': 'Brazil',
+    'rus': 'Russia',
+    'russian federation': 'Russia',
+    'russie': 'Russia',
+    'che': 'Switzerland',
+    'suisse': 'Switzerland',
+    'belgique': 'Belgium',
+    'zaf': 'South Africa',
+    'czech republic': 'Czechia',
+    'ivory coast': "Cote d'Ivoire",
+    'myanmar': 'Burma',
+    'vatican': 'Holy See',
+    'uae': 'United Arab Emirates',
+    'drc': 'Congo (Kinshasa)',
+    'democratic republic of the congo': 'Congo (Kinshasa)',
+    'republic of the congo': 'Congo (Brazzaville)',
+    'cape verde': 'Cabo Verde',
+    'swaziland': 'Eswatini',
+    'macedonia': 'North Macedonia',
+    'east timor': 'Timor-Leste',
+    'palestine': 'West Bank and Gaza',
+    'viet nam': 'Vietnam',
+}
+
+def normalize_location(name: str) -> str:
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().replace('*', ' ').split())
+
+def is_sorted_for_index(df: pd.DataFrame) -> bool:
+    if len(df) < 2:
+        return True
+    locations = df['location'].to_numpy(dtype=object)
+    dates = df['date'].to_numpy()
+    next_location = locations[1:] > locations[:-1]
+    same_location = locations[1:] == locations[:-1]
+    return bool(np.all(next_location | (same_location & (dates[1:] >= dates[:-1]))))
+
+def sort_for_index(df: pd.DataFrame) -> pd.DataFrame:
+    if is_sorted_for_index(df):
+        return df
+    return df.sort_values(['location', 'date'], kind='stable')
+
+class LocationIndex:
+    def __init__(self, ranges: Dict[str, Tuple[int, int]], lookup: Dict[str, str]):
+        self.ranges = ranges
+        self.locations = list(ranges)
+        self.lookup = lookup
+        self._positions = {location: position for position, location in enumerate(self.locations)}
+        self._sorted_keys = sorted((normalize_location(location), location) for location in self.locations)
+        self._prefix_keys = [key for key, _ in self._sorted_keys]
+    
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> 'LocationIndex':
+        if not is_sorted_for_index(df):
+            raise ValueError("Le DataFrame doit être trié par location puis date")
+        
+        locations = df['location'].to_numpy(dtype=object)
+        ranges: Dict[str, Tuple[int, int]] = {}
+        if len(locations):
+            starts = np.concatenate(([0], np.flatnonzero(locations[1:] != locations[:-1]) + 1))
+            stops = np.concatenate((starts[1:], [len(locations)]))
+            for start, stop in zip(starts, stops):
+                ranges[locations[start]] = (int(start), int(stop))
+        
+        iso_pairs = []
+        if 'iso_code' in df.columns and len(locations):
+            iso_pairs = zip(locations[starts], df['iso_code'].to_numpy(dtype=object)[starts])
+        return cls._with_lookup(ranges, iso_pairs)
+    
+    @classmethod
+    def from_cube(cls, cube) -> 'LocationIndex':
+        # Mêmes plages que build() sur cube.to_frame(), sans matérialiser le DataFrame long
+        counts = cube.observed.sum(axis=1)
+        stops = np.cumsum(counts)
+        ranges = {
+            location: (int(stop - count), int(stop))
+            for location, count, stop in zip(cube.locations, counts, stops) if count > 0
+        }
+        return cls._with_lookup(ranges, zip(cube.locations, cube.iso_codes))
+    
+    @classmethod
+    def _with_lookup(cls, ranges: Dict[str, Tuple[int, int]], iso_pairs) -> 'LocationIndex':
+        lookup: Dict[str, str] = {}
+        iso_codes: Dict[str, List[str]] = {}
+        for location, iso_code in iso_pairs:
+            if location in ranges and isinstance(iso_code, str):
+                iso_codes.setdefault(iso_code.lower(), []).append(location)
+        
+        for alias, location in COUNTRY_ALIASES.items():
+            if location in ranges:
+                lookup[alias] = location
+        for iso_code, matches in iso_codes.items():
+            if len(matches) == 1:
+                lookup.setdefault(iso_code, matches[0])
+        for location in ranges:
+            lookup[normalize_location(location)] = location
+            lookup[str(location).lower()] = location
+        
+        return cls(ranges, lookup)
+    
+    def __len__(self) -> int:
+        return len(self.locations)
+    
+    def __contains__(self, location: str) -> bool:
+        return location in self.ranges
+    
+    def resolve(self, query: str, fuzzy: bool = True) -> Optional[str]:
+        if query is None:
+            return None
+        
+        location = self.lookup.get(str(query).lower())
+        if location is None:
+            location = self.lookup.get(normalize_location(query))
+        if location is None and fuzzy:
+            matches = self.search(query, limit=1)
+            location = matches[0] if matches else None
+        return location
+    
+    def search(self, text: str, limit: Optional[int] = None) -> List[str]:
+        key = normalize_location(text)
+        if not key:
+            return []
+        
+        matches = []
+        position = bisect.bisect_left(self._prefix_keys, key)
+        while position < len(self._sorted_keys) and self._prefix_keys[position].startswith(key):
+            matches.append(self._sorted_keys[position][1])
+            position += 1
+        
+        if limit is not None and len(matches) >= limit:
+            return matches[:limit]
+        
+        prefixed = set(matches)
+        matches.extend(
+            location for normalized, location in self._sorted_keys
+            if key in normalized and location not in prefixed
+        )
+        return matches[:limit] if limit is not None else matches
+    
+    def get_range(self, location: str) -> Optional[Tuple[int, int]]:
+        return self.ranges.get(location)
+    
+    def locate(self, query: str, fuzzy: bool = True) -> Optional[Tuple[str, Tuple[int, int]]]:
+        location = self.resolve(query, fuzzy=fuzzy)
+        if location is None:
+            return None
+        return location, self.ranges[location]
+    
+    def position(self, location: str) -> Optional[int]:
+        return self._positions.get(location)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+from src.services.data_cube import CUBE_METRICS, DataCube
+
+class RankingTable:
+    def __init__(self, cube: DataCube, orders: np.ndarray, counts: np.ndarray):
+        self.cube = cube
+        self.orders = orders
+        self.counts = counts
+        self.metric_positions = {metric: position for position, metric in enumerate(CUBE_METRICS)}
+    
+    @classmethod
+    def build(cls, cube: DataCube) -> 'RankingTable':
+        observed_by_date = (cube.last_observed >= 0).T
+        orders = np.empty((len(CUBE_METRICS), len(cube.dates), len(cube.locations)), dtype=np.int32)
+        
+        for position, metric in enumerate(CUBE_METRICS):
+            values = cube.forward_filled(metric).T
+            # Même ordre que nlargest : décroissant, égalités dans l'ordre des pays,
+            # valeurs nulles ensuite, pays encore jamais observés en dernier (exclus par counts)
+            keys = np.where(observed_by_date, np.where(np.isnan(values), np.inf, -values), np.nan)
+            orders[position] = np.argsort(keys, axis=1, kind='stable')
+        
+        return cls(cube, orders, observed_by_date.sum(axis=1))
+    
+    def __contains__(self, metric: str) -> bool:
+        return metric in self.metric_positions
+    
+    def date_position(self, as_of: Optional[pd.Timestamp] = None) -> int:
+        if as_of is None:
+            return len(self.cube.dates) - 1
+        return self.cube.date_bounds(end_date=as_of)[1] - 1
+    
+    def top_rows(self, metric: str, limit: int, as_of: Optional[pd.Timestamp] = None) -> np.ndarray:
+        column = self.date_position(as_of)
+        if column < 0:
+            return self.orders[0, 0, :0]
+        count = min(max(limit, 0), int(self.counts[column]))
+        return self.orders[self.metric_positions[metric], column, :count]
+    
+    def top(self, metric: str, limit: int, as_of: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        rows = self.top_rows(metric, limit, as_of)
+        return self.cube.snapshot(stop=self.date_position(as_of) + 1, rows=rows)
+    
+    def memory_usage(self) -> int:
+        return int(self.orders.nbytes + self.counts.nbytes)
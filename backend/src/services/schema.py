@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+LEGACY_COLUMN_NAMES = {
+    'Province/State': 'Province_State',
+    'Country/Region': 'Country_Region',
+    'Last Update': 'Last_Update'
+}
+
+RAW_COLUMNS = ['Province_State', 'Country_Region', 'Last_Update', 'Confirmed', 'Deaths', 'Recovered', 'Active']
+RAW_CATEGORY_COLUMNS = ['Province_State', 'Country_Region', 'Last_Update']
+RAW_COUNT_COLUMNS = ['Confirmed', 'Deaths']
+RAW_NULLABLE_COUNT_COLUMNS = ['Recovered', 'Active']
+
+PROCESSED_CATEGORY_COLUMNS = ['iso_code']
+PROCESSED_COUNT_COLUMNS = ['total_cases', 'new_cases', 'total_deaths', 'new_deaths']
+PROCESSED_NULLABLE_COUNT_COLUMNS = ['total_recovered', 'active_cases']
+
+INTEGER_TYPES = [
+    (np.int8, 'Int8'),
+    (np.int16, 'Int16'),
+    (np.int32, 'Int32'),
+    (np.int64, 'Int64')
+]
+
+def is_raw_column(column: str) -> bool:
+    return column in RAW_COLUMNS or column in LEGACY_COLUMN_NAMES
+
+def apply_raw_schema(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.rename(columns=LEGACY_COLUMN_NAMES)
+    
+    for column in RAW_CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    
+    for column in RAW_COUNT_COLUMNS:
+        if column in df.columns:
+            df[column] = compact_counts(df[column])
+    
+    for column in RAW_NULLABLE_COUNT_COLUMNS:
+        if column in df.columns:
+            df[column] = compact_counts(df[column], nullable=True)
+    
+    return df
+
+def apply_processed_schema(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    
+    for column in PROCESSED_CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+    
+    for column in PROCESSED_COUNT_COLUMNS:
+        df[column] = compact_counts(df[column])
+    
+    for column in PROCESSED_NULLABLE_COUNT_COLUMNS:
+        df[column] = compact_counts(df[column], nullable=True)
+    
+    return df
+
+def compact_counts(series: pd.Series, nullable: bool = False) -> pd.Series:
+    values = pd.to_numeric(series, errors='coerce')
+    present = values.dropna()
+    
+    if not present.empty and not np.array_equal(present.to_numpy(dtype='float64'), np.floor(present.to_numpy(dtype='float64'))):
+        return values.astype('float64')
+    
+    low = present.min() if not present.empty else 0
+    high = present.max() if not present.empty else 0
+    has_missing = len(present) != len(values)
+    
+    for numpy_type, nullable_type in INTEGER_TYPES:
+        bounds = np.iinfo(numpy_type)
+        if bounds.min <= low and high <= bounds.max:
+            if nullable or has_missing:
+                return values.astype(nullable_type)
+            return values.astype(numpy_type)
+    
+    return values.astype('float64')
+
+def unify_categories(frames: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    categories: Dict[str, pd.Index] = {}
+    
+    for df in frames:
+        for column in df.select_dtypes(include='category').columns:
+            known = categories.get(column)
+            current = df[column].cat.categories
+            categories[column] = current if known is None else known.union(current)
+    
+    unified = []
+    for df in frames:
+        df = df.copy(deep=False)
+        for column, values in categories.items():
+            if column in df.columns:
+                if isinstance(df[column].dtype, pd.CategoricalDtype):
+                    df[column] = df[column].cat.set_categories(values)
+                else:
+                    df[column] = pd.Categorical(df[column], categories=values)
+        unified.append(df)
+    
+    return unified
+
+def memory_footprint(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+def format_bytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} Mo"
@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from src.services.data_cube import FLOW_METRICS, DataCube
+from src.services.rankings import RankingTable
+from src.utils.file_lock import FileLock, FileLockTimeout
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+LEADER_LOCK_NAME = 'leader.lock'
+META_NAME = 'meta.json'
+
+class SharedDatasetStore:
+    def __init__(self, folder: Path, keep_versions: int = 2, poll_interval: float = 0.1):
+        self.folder = Path(folder)
+        self.keep_versions = keep_versions
+        self.poll_interval = poll_interval
+        self._leader_lock: Optional[FileLock] = None
+    
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_lock is not None
+    
+    def try_lead(self) -> bool:
+        # Un seul processus construit et publie ; si son verrou tombe (worker arrêté), un autre prend le relais
+        if self._leader_lock is not None:
+            return True
+        
+        lock = FileLock(self.folder / LEADER_LOCK_NAME, timeout=0)
+        try:
+            lock.acquire()
+        except FileLockTimeout:
+            return False
+        self._leader_lock = lock
+        logger.info(f"Processus {os.getpid()} responsable de la publication du dataset partagé")
+        return True
+    
+    def release_leadership(self):
+        if self._leader_lock is not None:
+            self._leader_lock.release()
+            self._leader_lock = None
+    
+    def publish(self, version: str, cube: DataCube, rankings: RankingTable, meta: Dict[str, Any]) -> Path:
+        version_dir = self.folder / version
+        if not (version_dir / META_NAME).exists():
+            tmp_dir = self.folder / f".{version}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir(parents=True)
+            for name, array in _cube_arrays(cube, rankings).items():
+                np.save(tmp_dir / f"{name}.npy", array, allow_pickle=False)
+            
+            meta = dict(meta, version=version, locations=cube.locations.tolist(), iso_codes=[_json_value(code) for code in cube.iso_codes])
+            (tmp_dir / META_NAME).write_text(json.dumps(meta), encoding='utf-8')
+            shutil.rmtree(version_dir, ignore_errors=True)
+            os.replace(tmp_dir, version_dir)
+        
+        # Le manifeste est remplacé d'un bloc : un worker lit soit l'ancienne version, soit la nouvelle
+        manifest_tmp = self.folder / f".{MANIFEST_NAME}.{os.getpid()}.tmp"
+        manifest_tmp.write_text(json.dumps({'version': version, 'published_at': time.time()}), encoding='utf-8')
+        os.replace(manifest_tmp, self.folder / MANIFEST_NAME)
+        
+        logger.info(f"Dataset {version} publié dans {version_dir}")
+        self.prune(keep=version)
+        return version_dir
+    
+    def read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self.folder / MANIFEST_NAME).read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifeste du dataset partagé illisible: {e}")
+            return None
+    
+    def wait_for_manifest(self, timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            manifest = self.read_manifest()
+            if manifest is not None or (deadline is not None and time.monotonic() >= deadline):
+                return manifest
+            time.sleep(self.poll_interval)
+    
+    def attach(self, version: str) -> Tuple[DataCube, RankingTable, Dict[str, Any]]:
+        version_dir = self.folder / version
+        meta = json.loads((version_dir / META_NAME).read_text(encoding='utf-8'))
+        # Vues en lecture seule : les pages restent partagées entre tous les workers via le cache du noyau
+        arrays = {path.stem: np.load(path, mmap_mode='r') for path in version_dir.glob('*.npy')}
+        
+        cube = DataCube(
+            np.array(meta['locations'], dtype=object),
+            arrays['dates'],
+            arrays['values'],
+            arrays['observed'],
+            np.array([np.nan if code is None else code for code in meta['iso_codes']], dtype=object),
+            arrays['population'],
+            last_observed=arrays['last_observed'],
+            last_valid=arrays['last_valid'],
+            prefix_sums={metric: arrays[f"prefix_{metric}"] for metric in FLOW_METRICS},
+            observed_counts=arrays['observed_counts']
+        )
+        return cube, RankingTable(cube, arrays['ranking_orders'], arrays['ranking_counts']), meta
+    
+    def prune(self, keep: str) -> int:
+        # La version précédente est conservée pour les workers qui ne l'ont pas encore quittée
+        versions = sorted(
+            (path for path in self.folder.iterdir() if path.is_dir() and not path.name.startswith('.') and path.name != keep),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True
+        )
+        removed = 0
+        for path in versions[max(self.keep_versions - 1, 0):]:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        return removed
+
+def _cube_arrays(cube: DataCube, rankings: RankingTable) -> Dict[str, np.ndarray]:
+    arrays = {
+        'dates': cube.dates,
+        'values': cube.values,
+        'observed': cube.observed,
+        'population': cube.population,
+        'last_observed': cube.last_observed,
+        'last_valid': cube.last_valid,
+        'observed_counts': cube.observed_counts,
+        'ranking_orders': rankings.orders,
+        'ranking_counts': rankings.counts
+    }
+    for metric in FLOW_METRICS:
+        arrays[f"prefix_{metric}"] = cube.prefix_sums[metric]
+    return arrays
+
+def _json_value(value: Any) -> Any:
+    return None if value is None or (isinstance(value, float) and np.isnan(value)) else value
@@ -0,0 +1,203 @@
+import functools
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+from flask import Flask, Response, g, has_request_context, request
+from src.utils.logger import log_performance
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, Any], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+    
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, dict(key), value) for key, value in self._values.items()]
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            # Compteurs par borne (non cumulés), puis somme et nombre d'observations
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[position] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+    
+    def count(self, **labels) -> int:
+        series = self._series.get(_label_key(labels))
+        return int(series[-1]) if series else 0
+    
+    def samples(self) -> List[Sample]:
+        result = []
+        with self._lock:
+            for key, series in self._series.items():
+                labels = dict(key)
+                cumulative = 0.0
+                for position, bound in enumerate(self.buckets):
+                    cumulative += series[position]
+                    result.append((f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative))
+                result.append((f"{self.name}_bucket", dict(labels, le='+Inf'), series[-1]))
+                result.append((f"{self.name}_sum", labels, series[-2]))
+                result.append((f"{self.name}_count", labels, series[-1]))
+        return result
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: 'OrderedDict[str, Any]' = OrderedDict()
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+    
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(name, lambda: Counter(name, help_text))
+    
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help_text, buckets))
+    
+    def add_collector(self, collector: Collector):
+        # Valeurs lues au moment de la collecte (taille du dataset, compteurs de cache)
+        self._collectors.append(collector)
+    
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            kind = 'counter' if isinstance(metric, Counter) else 'histogram'
+            lines.extend(_format_family(metric.name, kind, metric.help_text, metric.samples()))
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.extend(_format_family(name, kind, help_text, samples))
+        return '\n'.join(lines) + '\n'
+    
+    def _register(self, name: str, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+registry = MetricsRegistry()
+
+stage_duration = registry.histogram('covid_stage_duration_seconds', "Durée des étapes de chargement, traitement et requête")
+rows_processed = registry.counter('covid_rows_processed_total', "Lignes produites par étape")
+request_duration = registry.histogram('covid_http_request_duration_seconds', "Latence des requêtes HTTP par route")
+
+class Timer:
+    def __init__(self, stage: str, logger: Optional[logging.Logger] = None):
+        self.stage = stage
+        self.logger = logger
+        self.rows: Optional[int] = None
+        self.duration = 0.0
+        self._start = 0.0
+    
+    def __enter__(self) -> 'Timer':
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.duration = time.perf_counter() - self._start
+        stage_duration.observe(self.duration, stage=self.stage)
+        if self.rows is not None:
+            rows_processed.inc(self.rows, stage=self.stage)
+        if has_request_context():
+            timings = g.setdefault('server_timings', OrderedDict())
+            timings[self.stage] = timings.get(self.stage, 0.0) + self.duration
+        if self.logger is not None:
+            details = f"{self.rows} lignes" if self.rows is not None else None
+            log_performance(self.logger, self.stage, self.duration, details)
+    
+    def __call__(self, function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Timer(self.stage, self.logger) as timer:
+                result = function(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    timer.rows = len(result)
+                return result
+        return wrapper
+
+def timed(stage: str, logger: Optional[logging.Logger] = None) -> Timer:
+    return Timer(stage, logger)
+
+def register_metrics(app: Flask, slow_logger: Optional[logging.Logger] = None):
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+    
+    @app.after_request
+    def _record_request(response: Response) -> Response:
+        start = g.pop('request_start', None)
+        if start is None:
+            return response
+        
+        duration = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'
+        request_duration.observe(duration, endpoint=endpoint, method=request.method, status=str(response.status_code))
+        
+        timings = g.get('server_timings') or {}
+        entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+        entries.append(f"total;dur={duration * 1000:.2f}")
+        response.headers['Server-Timing'] = ', '.join(entries)
+        
+        if slow_logger is not None and duration > 1.0:
+            log_performance(slow_logger, f"{request.method} {request.path}", duration)
+        return response
+
+def metrics_response() -> Response:
+    return Response(registry.render(), content_type=PROMETHEUS_MIMETYPE)
+
+def _label_key(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_family(name: str, kind: str, help_text: str, samples: List[Sample]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for sample_name, labels, value in samples:
+        lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+    return lines
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + '}'
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
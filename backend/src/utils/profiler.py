@@ -0,0 +1,166 @@
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+from flask import Flask, Response, g, request
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_FILE_HEADER = 'X-Profile-File'
+PROFILING_MODES = ['cprofile', 'sampling']
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+    
+    def collapsed(self) -> str:
+        # Format « pile repliée » lu par flamegraph.pl et speedscope : frames séparées par « ; » puis le nombre d'échantillons
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+class RequestProfiler:
+    def __init__(self, folder: Path, sample_rate: float = 0.0, mode: str = 'cprofile', token: Optional[str] = None,
+                 max_files: int = 200, interval: float = 0.005, max_concurrent: int = 1):
+        if mode not in PROFILING_MODES:
+            raise ValueError(f"Mode de profilage inconnu: {mode} ({', '.join(PROFILING_MODES)})")
+        self.folder = Path(folder)
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.token = token or None
+        self.max_files = max_files
+        self.interval = interval
+        # Un seul profileur actif à la fois limite le surcoût et évite les conflits de hooks entre threads
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._rotation_lock = threading.Lock()
+        self._sequence = 0
+    
+    @property
+    def active(self) -> bool:
+        return self.sample_rate > 0 or self.token is not None
+    
+    def register(self, app: Flask):
+        if not self.active:
+            # Désactivé : aucun hook enregistré, donc aucun surcoût par requête
+            return
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abort)
+        logger.info(f"Profilage des requêtes actif ({self.mode}, taux {self.sample_rate}, dossier {self.folder})")
+    
+    def should_profile(self) -> bool:
+        header = request.headers.get(PROFILE_HEADER)
+        if header is not None and self.token is not None and hmac.compare_digest(header, self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+    
+    def _start(self):
+        if not self.should_profile() or not self._slots.acquire(blocking=False):
+            return
+        
+        if self.mode == 'sampling':
+            session = StackSampler(threading.get_ident(), self.interval)
+            session.start()
+        else:
+            session = cProfile.Profile()
+            session.enable()
+        g.profiler_session = session
+        g.profiler_start = time.perf_counter()
+    
+    def _finish(self, response: Response) -> Response:
+        session = self._stop_session()
+        if session is None:
+            return response
+        
+        duration = time.perf_counter() - g.pop('profiler_start')
+        try:
+            path = self._write(session, request.endpoint or 'unmatched', duration)
+            response.headers[PROFILE_FILE_HEADER] = path.name
+        except OSError as e:
+            logger.error(f"Écriture du profil impossible: {e}")
+        return response
+    
+    def _abort(self, error: Optional[BaseException] = None):
+        # Requête interrompue par une exception : arrêter le profileur sans écrire de fichier
+        self._stop_session()
+    
+    def _stop_session(self):
+        session = g.pop('profiler_session', None)
+        if session is None:
+            return None
+        try:
+            if isinstance(session, StackSampler):
+                session.stop()
+            else:
+                session.disable()
+        finally:
+            self._slots.release()
+        return session
+    
+    def _write(self, session, endpoint: str, duration: float) -> Path:
+        route_folder = self.folder / _safe_name(endpoint)
+        route_folder.mkdir(parents=True, exist_ok=True)
+        with self._rotation_lock:
+            self._sequence += 1
+            sequence = self._sequence
+        
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(duration * 1000)}ms-{os.getpid()}-{sequence}"
+        if isinstance(session, StackSampler):
+            path = route_folder / f"{stem}.collapsed"
+            path.write_text(session.collapsed(), encoding='utf-8')
+        else:
+            path = route_folder / f"{stem}.prof"
+            session.dump_stats(str(path))
+        
+        logger.info(f"Profil {endpoint} écrit: {path} ({duration * 1000:.0f} ms)")
+        self._rotate(route_folder)
+        return path
+    
+    def _rotate(self, route_folder: Path):
+        with self._rotation_lock:
+            files: List[Path] = sorted(route_folder.iterdir(), key=_mtime)
+            for path in files[:max(len(files) - self.max_files, 0)]:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+def _mtime(path: Path) -> float:
+    # Un autre worker peut supprimer le fichier pendant la rotation
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+def _safe_name(endpoint: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint)
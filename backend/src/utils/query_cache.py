@@ -0,0 +1,161 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+_MISSING = object()
+
+RETIRED_VERSIONS = 16
+
+class QueryCache:
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = None,
+                 current_version: Optional[Callable[[], Optional[str]]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl if ttl else None
+        self._entries: 'OrderedDict[Tuple, Tuple[Any, int, float]]' = OrderedDict()
+        self._bytes = 0
+        self._version: Optional[str] = None
+        # Les versions sont des empreintes sans ordre : la version servie vient du gestionnaire de dataset
+        self.current_version = current_version
+        self._retired: 'OrderedDict[str, None]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_puts = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+    
+    def get_or_compute(self, version: str, method: str, args: Dict[str, Hashable], compute: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return compute()
+        
+        key = make_key(version, method, args)
+        value = self.get(key)
+        if value is not _MISSING:
+            return value
+        
+        value = compute()
+        self.put(key, value)
+        return value
+    
+    def get(self, key: Tuple) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            
+            value, size, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Tuple, value: Any):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            # Requête terminée après un changement de dataset : son résultat ne doit pas évincer la version servie
+            if not self._accepts(key[0]):
+                self.stale_puts += 1
+                return
+            # Une nouvelle version du dataset rend les entrées précédentes inutiles
+            if key[0] != self._version:
+                self._drop_other_versions(key[0])
+            
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'stale_puts': self.stale_puts,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+    
+    def _accepts(self, version: str) -> bool:
+        if version in self._retired:
+            return False
+        if version == self._version or self.current_version is None:
+            return True
+        current = self.current_version()
+        return current is None or current == version
+    
+    def _drop_other_versions(self, version: str):
+        for key in [key for key in self._entries if key[0] != version]:
+            self._remove(key)
+        if self._version is not None:
+            self._retired[self._version] = None
+            while len(self._retired) > RETIRED_VERSIONS:
+                self._retired.popitem(last=False)
+        self._version = version
+    
+    def _remove(self, key: Tuple):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+def make_key(version: str, method: str, args: Dict[str, Hashable]) -> Tuple:
+    return (version, method, tuple(sorted((name, _normalize(value)) for name, value in args.items())))
+
+def _normalize(value: Any) -> Hashable:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(item) for item in value)
+    return value
+
+def estimate_size(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if hasattr(value, 'memory_usage') and callable(value.memory_usage):
+        return int(value.memory_usage())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + estimate_size(vars(value))
+    return sys.getsizeof(value)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Sequence, Tuple
+
+ColumnSpec = Tuple[str, str, str]
+
+LATEST_COLUMNS: List[ColumnSpec] = [
+    ('country', 'location', 'str'),
+    ('total_cases', 'total_cases', 'int'),
+    ('new_cases', 'new_cases', 'int'),
+    ('total_deaths', 'total_deaths', 'int'),
+    ('new_deaths', 'new_deaths', 'int'),
+    ('total_recovered', 'total_recovered', 'nullable_int'),
+    ('active_cases', 'active_cases', 'nullable_int'),
+    ('last_update', 'date', 'isoformat')
+]
+
+FILTERED_COLUMNS: List[ColumnSpec] = LATEST_COLUMNS + [
+    ('period_new_cases', 'period_new_cases', 'int'),
+    ('period_new_deaths', 'period_new_deaths', 'int')
+]
+
+PERIOD_COLUMNS: List[ColumnSpec] = [
+    ('country', 'location', 'str'),
+    ('period', 'period', 'isoformat'),
+    ('new_cases', 'new_cases', 'int'),
+    ('new_deaths', 'new_deaths', 'int')
+]
+
+TIMELINE_COLUMNS: List[ColumnSpec] = [
+    ('location', 'location', 'str'),
+    ('iso_code', 'iso_code', 'str'),
+    ('date', 'date', 'isoformat'),
+    ('total_cases', 'total_cases', 'int'),
+    ('new_cases', 'new_cases', 'int'),
+    ('total_deaths', 'total_deaths', 'int'),
+    ('new_deaths', 'new_deaths', 'int'),
+    ('total_recovered', 'total_recovered', 'nullable_int'),
+    ('active_cases', 'active_cases', 'nullable_int'),
+    ('population', 'population', 'nullable_int')
+]
+
+def top_countries_columns(metric: str) -> List[ColumnSpec]:
+    return [
+        ('country', 'location', 'str'),
+        ('total_cases', 'total_cases', 'int'),
+        ('total_deaths', 'total_deaths', 'int'),
+        ('value', metric, 'int'),
+        ('last_update', 'date', 'isoformat')
+    ]
+
+class Table:
+    def __init__(self, columns: List[str], arrays: List[list]):
+        self.columns = columns
+        self.arrays = arrays
+    
+    def __len__(self) -> int:
+        return len(self.arrays[0]) if self.arrays else 0
+    
+    def to_records(self) -> List[Dict[str, Any]]:
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in zip(*self.arrays)]
+    
+    def to_columnar(self) -> Dict[str, Any]:
+        return {
+            'columns': self.columns,
+            'values': self.arrays,
+            'count': len(self)
+        }
+
+def frame_to_table(df: pd.DataFrame, spec: Sequence[ColumnSpec]) -> Table:
+    columns = []
+    arrays = []
+    for name, source, kind in spec:
+        columns.append(name)
+        arrays.append(column_values(df[source], kind))
+    return Table(columns, arrays)
+
+def frame_to_records(df: pd.DataFrame, spec: Sequence[ColumnSpec]) -> List[Dict[str, Any]]:
+    return frame_to_table(df, spec).to_records()
+
+def column_values(series: pd.Series, kind: str) -> list:
+    if kind == 'int':
+        if pd.api.types.is_integer_dtype(series.dtype) and not series.hasnans:
+            return series.to_numpy(dtype='int64').tolist()
+        return _numeric_values(series).astype('int64').tolist()
+    
+    if kind == 'nullable_int':
+        values = _numeric_values(series, fill=None)
+        missing = np.isnan(values)
+        result = np.where(missing, 0, values).astype('int64').tolist()
+        for position in np.flatnonzero(missing):
+            result[position] = None
+        return result
+    
+    if kind == 'isoformat':
+        values = series.to_numpy(dtype='datetime64[ns]')
+        result = np.datetime_as_string(values, unit='s').tolist()
+        for position in np.flatnonzero(np.isnat(values)):
+            result[position] = None
+        return result
+    
+    if kind == 'timestamp':
+        return [value if pd.notna(value) else None for value in series.tolist()]
+    
+    values = series.to_numpy(dtype=object)
+    return np.where(pd.isna(values), None, values).tolist()
+
+def _numeric_values(series: pd.Series, fill: Any = 0) -> np.ndarray:
+    if series.dtype == object:
+        series = pd.to_numeric(series, errors='coerce')
+    values = series.to_numpy(dtype='float64', na_value=np.nan)
+    if fill is not None:
+        values = np.where(np.isnan(values), fill, values)
+    return values
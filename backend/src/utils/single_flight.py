@@ -0,0 +1,54 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class SingleFlightTimeout(TimeoutError):
+    pass
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.shared = 0
+    
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+        
+        if not leader:
+            # Les appelants concurrents attendent le résultat du premier au lieu de relancer le calcul
+            if not call.done.wait(timeout):
+                raise SingleFlightTimeout(f"Délai dépassé en attendant {key!r} ({timeout}s)")
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+    
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
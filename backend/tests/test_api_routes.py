@@ -6,7 +6,17 @@ import os
 # Ajouter le chemin du backend au Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import pstats
+import shutil
+import tempfile
+import time
+from pathlib import Path
 from app import app
+from config import Config
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from src.api.utils import formats
+from src.utils.profiler import RequestProfiler
 
 class TestCovidRoutes(unittest.TestCase):
     """Tests des routes de l'API COVID-19"""
@@ -26,6 +36,8 @@ class TestCovidRoutes(unittest.TestCase):
         self.assertEqual(data['status'], 'OK')
         self.assertIn('message', data)
         self.assertIn('version', data)
+        self.assertIn('reloads', data['dataset'])
+        self.assertIn('mode', data['watcher'])
         print("✅ Health endpoint OK")
     
     def test_global_stats_endpoint(self):
@@ -147,6 +159,458 @@ class TestCovidRoutes(unittest.TestCase):
         self.assertIn(response.status_code, [200, 400])
         
         print("✅ Error handling OK")
+    
+    def test_filtered_period_increments(self):
+        """Test des cumuls sur la période et des séries par semaine"""
+        dates = json.loads(self.client.get(f'{self.base_url}/dates/available').data)['dates']
+        start_date, end_date = dates[1][:10], dates[-1][:10]
+        
+        response = self.client.get(f'{self.base_url}/data/filtered?start_date={start_date}&end_date={end_date}&granularity=week')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        
+        france = next(row for row in data['data'] if row['country'] == 'France')
+        timeline = json.loads(self.client.get(f'{self.base_url}/countries/France?days=1000').data)['data']
+        in_window = [day for day in timeline if start_date <= day['date'][:10] <= end_date]
+        self.assertEqual(france['period_new_cases'], sum(day['new_cases'] for day in in_window))
+        
+        series = [row for row in data['series'] if row['country'] == 'France']
+        self.assertEqual(sum(row['new_cases'] for row in series), france['period_new_cases'])
+        self.assertEqual(data['period']['granularity'], 'week')
+        
+        response = self.client.get(f'{self.base_url}/data/filtered?granularity=year')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_top_countries_as_of(self):
+        """Test du classement à une date passée"""
+        dates = json.loads(self.client.get(f'{self.base_url}/dates/available').data)['dates']
+        
+        response = self.client.get(f'{self.base_url}/top-countries?limit=5&as_of={dates[0]}')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(len(data), 5)
+        self.assertTrue(all(row['last_update'][:10] <= dates[0] for row in data))
+        self.assertEqual([row['value'] for row in data], sorted((row['value'] for row in data), reverse=True))
+        
+        latest = json.loads(self.client.get(f'{self.base_url}/top-countries?limit=5').data)
+        self.assertEqual(json.loads(self.client.get(f'{self.base_url}/top-countries?limit=5&as_of=2100-01-01').data), latest)
+        
+        response = self.client.get(f'{self.base_url}/top-countries?as_of=pas-une-date')
+        self.assertEqual(response.status_code, 400)
+        
+        for query in ('metric=population', 'metric=population&as_of=2021-01-01', 'metric=location'):
+            response = self.client.get(f'{self.base_url}/top-countries?{query}')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('non disponible', json.loads(response.data)['error'])
+    
+    def test_compare_endpoint(self):
+        """Test de la comparaison de pays sur un axe commun"""
+        response = self.client.get(f'{self.base_url}/compare?countries=France,Italy,Atlantis&metric=new_cases')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        
+        self.assertEqual(data['align'], 'date')
+        self.assertEqual(data['countries_found'], 2)
+        for country in ('France', 'Italy'):
+            self.assertEqual(len(data['comparison'][country]['values']), len(data['axis']))
+        
+        response = self.client.get(f'{self.base_url}/compare?countries=France,Italy&align=outbreak_day')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['axis'][0], 0)
+        
+        self.assertEqual(self.client.get(f'{self.base_url}/compare').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.base_url}/compare?countries=France&align=week').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.base_url}/compare?countries=France&metric=population').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.base_url}/compare?countries=Atlantis').status_code, 404)
+        
+        too_many = ','.join(f'Pays{number}' for number in range(51))
+        self.assertEqual(self.client.get(f'{self.base_url}/compare?countries={too_many}').status_code, 400)
+    
+    def test_query_cache_stats(self):
+        """Test de la mémoïsation des requêtes paramétrées"""
+        before = json.loads(self.client.get('/admin/cache/stats').data)['query_cache']
+        first = self.client.get(f'{self.base_url}/countries/France?days=7')
+        second = self.client.get(f'{self.base_url}/countries/ france?days=7')
+        after = json.loads(self.client.get('/admin/cache/stats').data)['query_cache']
+        
+        self.assertEqual(json.loads(first.data), json.loads(second.data))
+        self.assertGreaterEqual(after['hits'], before['hits'] + 1)
+        self.assertIn('evictions', after)
+
+class TestResponseFormats(unittest.TestCase):
+    """Tests de la négociation de format des réponses"""
+    
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.base_url = '/api'
+    
+    def test_columnar_format(self):
+        """Test du format colonnes parallèles"""
+        rows = json.loads(self.client.get(f'{self.base_url}/cases').data)
+        response = self.client.get(f'{self.base_url}/cases?format=columnar')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['count'], len(rows))
+        self.assertEqual(len(data['columns']), len(data['values']))
+        rebuilt = [dict(zip(data['columns'], row)) for row in zip(*data['values'])]
+        self.assertEqual(rebuilt, rows)
+    
+    def test_default_format_is_json(self):
+        """Test du format JSON par défaut avec un Accept de navigateur"""
+        response = self.client.get(f'{self.base_url}/global', headers={'Accept': 'text/html,*/*;q=0.8'})
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertIn('Accept', response.headers.get('Vary', ''))
+    
+    @unittest.skipIf(formats.msgpack is None, "msgpack non installé")
+    def test_msgpack_format(self):
+        """Test du format MessagePack"""
+        response = self.client.get(f'{self.base_url}/top-countries?limit=3', headers={'Accept': formats.MSGPACK_MIMETYPE})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, formats.MSGPACK_MIMETYPE)
+        
+        expected = json.loads(self.client.get(f'{self.base_url}/top-countries?limit=3').data)
+        self.assertEqual(formats.msgpack.unpackb(response.data), expected)
+    
+    @unittest.skipIf(formats.pa is None, "pyarrow non installé")
+    def test_arrow_format(self):
+        """Test du format Arrow IPC"""
+        response = self.client.get(f'{self.base_url}/countries/France', headers={'Accept': formats.ARROW_MIMETYPE})
+        self.assertEqual(response.status_code, 200)
+        
+        table = formats.pa.ipc.open_stream(response.data).read_all()
+        envelope = json.loads(table.schema.metadata[b'payload'])
+        self.assertEqual(envelope['country'], 'France')
+        self.assertEqual(table.num_rows, envelope['days'])
+        
+        response = self.client.get(f'{self.base_url}/global', headers={'Accept': formats.ARROW_MIMETYPE})
+        self.assertEqual(response.status_code, 406)
+
+class TestJSONProvider(unittest.TestCase):
+    """Tests du fournisseur JSON rapide"""
+    
+    def test_fast_and_stdlib_outputs_match(self):
+        """Test de l'équivalence orjson / json standard"""
+        payload = {'b': [1, 2, None], 'a': {'country': 'Côte', 'value': 1.5}}
+        
+        with app.app_context():
+            fast = json.loads(app.json.dumps(payload))
+            standard = json.loads(DefaultJSONProvider(app).dumps(payload))
+            response = app.json.response(payload)
+        
+        self.assertEqual(fast, standard)
+        self.assertEqual(json.loads(response.data), payload)
+        self.assertEqual(response.mimetype, 'application/json')
+
+class TestHTTPCaching(unittest.TestCase):
+    """Tests des requêtes conditionnelles et de la compression"""
+    
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.base_url = '/api'
+    
+    def test_etag_not_modified(self):
+        """Test du 304 avec If-None-Match"""
+        response = self.client.get(f'{self.base_url}/global')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers.get('ETag')
+        self.assertIsNotNone(etag)
+        self.assertIn(f'max-age={int(Config.CACHE_TIMEOUT.total_seconds())}', response.headers.get('Cache-Control', ''))
+        
+        response = self.client.get(f'{self.base_url}/global', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers.get('ETag'), etag)
+        
+        response = self.client.get(f'{self.base_url}/top-countries?limit=3', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+    
+    def test_last_modified_not_modified(self):
+        """Test du 304 avec If-Modified-Since"""
+        response = self.client.get(f'{self.base_url}/countries')
+        last_modified = response.headers.get('Last-Modified')
+        self.assertIsNotNone(last_modified)
+        
+        response = self.client.get(f'{self.base_url}/countries', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+        
+        response = self.client.get(f'{self.base_url}/countries', headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+    
+    def test_errors_are_not_revalidated(self):
+        """Test de l'absence de 304 sur une ressource absente ou une requête invalide"""
+        response = self.client.get(f'{self.base_url}/countries/Nowhere', headers={'If-None-Match': '*'})
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(response.headers.get('ETag'))
+        
+        recent = 'Fri, 01 Jan 2100 00:00:00 GMT'
+        response = self.client.get(f'{self.base_url}/countries/Nowhere', headers={'If-Modified-Since': recent})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(f'{self.base_url}/top-countries?as_of=pas-une-date', headers={'If-Modified-Since': recent})
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.get(f'{self.base_url}/countries/France', headers={'If-None-Match': '*'})
+        self.assertEqual(response.status_code, 304)
+    
+    def test_weak_etag_not_modified(self):
+        """Test du 304 avec un validateur faible W/"..." renvoyé par un proxy"""
+        etag = self.client.get(f'{self.base_url}/global').headers.get('ETag')
+        response = self.client.get(f'{self.base_url}/global', headers={'If-None-Match': f'W/{etag}'})
+        self.assertEqual(response.status_code, 304)
+        
+        etag = self.client.get(f'{self.base_url}/cases', headers={'Accept-Encoding': 'gzip'}).headers.get('ETag')
+        response = self.client.get(f'{self.base_url}/cases', headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'W/{etag}'})
+        self.assertEqual(response.status_code, 304)
+    
+    def test_gzip_compression(self):
+        """Test de la compression gzip des grosses réponses"""
+        import gzip
+        plain = self.client.get(f'{self.base_url}/cases')
+        response = self.client.get(f'{self.base_url}/cases', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get('Content-Encoding'), 'gzip')
+        self.assertIn('Accept-Encoding', response.headers.get('Vary', ''))
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertLess(len(response.data), len(plain.data))
+        
+        etag = response.headers.get('ETag')
+        response = self.client.get(f'{self.base_url}/cases', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+    
+    def test_encoding_honors_quality_values(self):
+        """Test du choix de l'encodage selon les q-values d'Accept-Encoding"""
+        for accept_encoding, expected in [('gzip;q=1, br;q=0.1', 'gzip'), ('br;q=0, gzip', 'gzip'), ('br;q=0, gzip;q=0', None), ('identity', None)]:
+            response = self.client.get(f'{self.base_url}/cases', headers={'Accept-Encoding': accept_encoding})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers.get('Content-Encoding'), expected, accept_encoding)
+    
+    def test_small_response_not_compressed(self):
+        """Test de l'absence de compression des petites réponses"""
+        response = self.client.get(f'{self.base_url}/health', headers={'Accept-Encoding': 'gzip'})
+        self.assertIsNone(response.headers.get('Content-Encoding'))
+        self.assertIsNone(response.headers.get('ETag'))
+
+class TestPagination(unittest.TestCase):
+    """Tests de la pagination et du streaming NDJSON"""
+    
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.base_url = '/api'
+    
+    def test_offset_pagination(self):
+        """Test de la pagination par numéro de page"""
+        rows = json.loads(self.client.get(f'{self.base_url}/cases').data)
+        response = self.client.get(f'{self.base_url}/cases?page=2&page_size=5')
+        self.assertEqual(response.status_code, 200)
+        
+        page = json.loads(response.data)
+        expected = sorted(rows, key=lambda row: row['country'])[5:10]
+        self.assertEqual(page, expected)
+        self.assertEqual(response.headers.get('X-Total-Count'), str(len(rows)))
+    
+    def test_cursor_pagination(self):
+        """Test du parcours complet par curseur"""
+        rows = json.loads(self.client.get(f'{self.base_url}/data/filtered').data)['data']
+        collected = []
+        url = f'{self.base_url}/data/filtered?page_size=7'
+        while True:
+            data = json.loads(self.client.get(url).data)
+            collected.extend(data['data'])
+            self.assertEqual(data['period']['countries_count'], len(rows))
+            cursor = data['pagination']['next_cursor']
+            if cursor is None:
+                break
+            url = f'{self.base_url}/data/filtered?page_size=7&cursor={cursor}'
+        
+        self.assertEqual(collected, sorted(rows, key=lambda row: row['country']))
+    
+    def test_invalid_pagination(self):
+        """Test des paramètres de pagination invalides"""
+        self.assertEqual(self.client.get(f'{self.base_url}/cases?page_size=0').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.base_url}/cases?page=-1').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.base_url}/cases?cursor=%%%').status_code, 400)
+    
+    def test_ndjson_stream(self):
+        """Test du streaming NDJSON"""
+        rows = json.loads(self.client.get(f'{self.base_url}/cases').data)
+        response = self.client.get(f'{self.base_url}/cases?stream=ndjson', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertIsNone(response.headers.get('Content-Encoding'))
+        
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], rows)
+
+class TestBatchEndpoint(unittest.TestCase):
+    """Tests de l'endpoint batch"""
+    
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.base_url = '/api'
+    
+    def test_batch_matches_individual_requests(self):
+        """Test de l'équivalence entre sous-requêtes et requêtes individuelles"""
+        queries = [
+            {'id': 'global', 'path': '/global'},
+            {'id': 'top', 'path': '/top-countries', 'params': {'limit': 5, 'metric': 'total_deaths'}},
+            {'id': 'france', 'path': '/api/countries/France', 'params': {'days': 2}},
+            {'id': 'dates', 'path': 'dates/available'}
+        ]
+        response = self.client.post(f'{self.base_url}/batch', json={'queries': queries})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        
+        self.assertIn('version', data)
+        self.assertEqual([item['id'] for item in data['results']], ['global', 'top', 'france', 'dates'])
+        for item in data['results']:
+            self.assertEqual(item['status'], 200)
+        
+        expected = json.loads(self.client.get(f'{self.base_url}/top-countries?limit=5&metric=total_deaths').data)
+        self.assertEqual(data['results'][1]['body'], expected)
+        self.assertEqual(data['results'][2]['body']['country'], 'France')
+    
+    def test_batch_pins_one_snapshot(self):
+        """Test de la lecture d'un seul snapshot pour tout le lot"""
+        from unittest import mock
+        from src.api.routes import covid_routes
+        
+        manager = covid_routes.dataset_manager
+        queries = [{'path': '/global'}, {'path': '/cases'}, {'path': '/countries'}]
+        with mock.patch.object(manager, 'get_dataset', wraps=manager.get_dataset) as get_dataset:
+            response = self.client.post(f'{self.base_url}/batch', json=queries)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_dataset.call_count, 1)
+    
+    def test_batch_per_item_status(self):
+        """Test des statuts individuels des sous-requêtes"""
+        queries = [
+            {'path': '/countries/Atlantis'},
+            {'path': '/inconnue'},
+            {'path': '/top-countries', 'params': {'metric': 'bogus'}},
+            {'params': {}},
+            {'path': '/global'}
+        ]
+        data = json.loads(self.client.post(f'{self.base_url}/batch', json=queries).data)
+        
+        self.assertEqual([item['status'] for item in data['results']], [404, 404, 400, 400, 200])
+        self.assertIn('error', data['results'][1]['body'])
+    
+    def test_single_query_batch_keeps_outer_request_state(self):
+        """Test d'un lot à une seule sous-requête, exécutée dans le thread de la requête"""
+        from src.utils.metrics import request_duration
+        
+        labels = {'endpoint': 'covid.run_batch_queries', 'method': 'POST', 'status': '200'}
+        before = request_duration.count(**labels)
+        response = self.client.post(f'{self.base_url}/batch', json=[{'path': '/global'}])
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['results'][0]['status'], 200)
+        self.assertIn('Server-Timing', response.headers)
+        self.assertEqual(request_duration.count(**labels), before + 1)
+    
+    def test_invalid_batch(self):
+        """Test des corps de requête batch invalides"""
+        self.assertEqual(self.client.post(f'{self.base_url}/batch', json={}).status_code, 400)
+        self.assertEqual(self.client.post(f'{self.base_url}/batch', data='pas du json').status_code, 400)
+        
+        too_many = [{'path': '/global'}] * 21
+        self.assertEqual(self.client.post(f'{self.base_url}/batch', json=too_many).status_code, 400)
+
+class TestMetrics(unittest.TestCase):
+    """Tests de l'instrumentation des requêtes"""
+    
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.base_url = '/api'
+    
+    def test_server_timing_header(self):
+        """Test du détail des étapes dans l'en-tête Server-Timing"""
+        response = self.client.get(f'{self.base_url}/top-countries?limit=3')
+        self.assertEqual(response.status_code, 200)
+        
+        stages = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+        self.assertEqual(stages[-1], 'total')
+        for stage in ['dataset', 'query', 'serialize']:
+            self.assertIn(stage, stages)
+    
+    def test_prometheus_endpoint(self):
+        """Test de l'exposition des métriques au format Prometheus"""
+        self.client.get(f'{self.base_url}/global')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        
+        text = response.get_data(as_text=True)
+        self.assertIn('# TYPE covid_http_request_duration_seconds histogram', text)
+        self.assertIn('covid_http_request_duration_seconds_count{endpoint="covid.get_global_stats",method="GET",status="200"}', text)
+        self.assertIn('covid_stage_duration_seconds_bucket{stage="load_data",le="+Inf"}', text)
+        self.assertIn('covid_rows_processed_total{stage="finalize_data"}', text)
+        self.assertIn('covid_dataset_memory_bytes{component="cube"}', text)
+        self.assertIn('covid_query_cache_hits_total', text)
+
+class TestRequestProfiler(unittest.TestCase):
+    """Tests du profilage opt-in des requêtes"""
+    
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def _client(self, **options):
+        test_app = Flask(__name__)
+        
+        @test_app.route('/lent')
+        def slow():
+            deadline = time.perf_counter() + 0.05
+            iterations = 0
+            while time.perf_counter() < deadline:
+                iterations += 1
+            return {'iterations': iterations}
+        
+        RequestProfiler(self.tmp_dir, **options).register(test_app)
+        return test_app, test_app.test_client()
+    
+    def test_disabled_profiler_registers_nothing(self):
+        """Test de l'absence de hook quand le profilage est désactivé"""
+        test_app, client = self._client()
+        
+        self.assertEqual(test_app.before_request_funcs, {})
+        self.assertNotIn('X-Profile-File', client.get('/lent', headers={'X-Profile': 'secret'}).headers)
+    
+    def test_admin_header_writes_pstats(self):
+        """Test du profil cProfile déclenché par l'en-tête d'administration"""
+        _, client = self._client(token='secret')
+        
+        self.assertNotIn('X-Profile-File', client.get('/lent', headers={'X-Profile': 'mauvais'}).headers)
+        response = client.get('/lent', headers={'X-Profile': 'secret'})
+        
+        path = self.tmp_dir / 'slow' / response.headers['X-Profile-File']
+        stats = pstats.Stats(str(path))
+        self.assertGreater(stats.total_calls, 0)
+    
+    def test_sampling_mode_writes_collapsed_stacks(self):
+        """Test des piles repliées du mode échantillonnage"""
+        _, client = self._client(sample_rate=1.0, mode='sampling', interval=0.001)
+        response = client.get('/lent')
+        
+        lines = (self.tmp_dir / 'slow' / response.headers['X-Profile-File']).read_text(encoding='utf-8').splitlines()
+        stacks = dict(line.rsplit(' ', 1) for line in lines)
+        self.assertTrue(any('slow (' in stack for stack in stacks))
+        self.assertTrue(all(int(count) > 0 for count in stacks.values()))
+    
+    def test_rotation_keeps_latest_files(self):
+        """Test de la rotation du dossier de profils"""
+        _, client = self._client(sample_rate=1.0, max_files=2)
+        names = [client.get('/lent').headers['X-Profile-File'] for _ in range(4)]
+        
+        self.assertEqual(sorted(path.name for path in (self.tmp_dir / 'slow').iterdir()), sorted(names[-2:]))
 
 class TestAPIPerformance(unittest.TestCase):
     """Tests de performance de l'API"""
@@ -0,0 +1,281 @@
+import unittest
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.baseline import find_regressions, load_baseline, save_baseline
+from bench.generator import GeneratorSpec, generate_reports
+from bench.load_test import ClientTarget, HIGHER_IS_BETTER, HttpTarget, REGRESSION_METRICS as LOAD_METRICS, discover, parse_mix, plan_requests, run_load, summarize
+from bench.memory_report import DEFAULT_BUDGET_PER_1000_FILES, MemoryTracker, check_budget, memory_report
+from bench.micro import REGRESSION_METRICS, run_tier
+from src.services.data_loader import DataLoader
+from src.services.data_processor import DataProcessor
+from src.services.schema import memory_footprint
+
+class TestGenerator(unittest.TestCase):
+    def setUp(self):
+        self.folder = Path(tempfile.mkdtemp())
+        logging.disable(logging.WARNING)
+    
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.folder, ignore_errors=True)
+    
+    def _process(self, folder: Path):
+        raw = DataLoader(folder, folder / "cache.csv").load_multiple_csv_files()
+        return DataProcessor().process_raw_data(raw)
+    
+    def test_same_seed_same_files(self):
+        spec = GeneratorSpec(days=3, countries=4, provinces=2, province_countries=1, missing_rate=0.2)
+        first = generate_reports(self.folder / "a", spec)
+        second = generate_reports(self.folder / "b", spec)
+        
+        self.assertEqual(len(first), 3)
+        for left, right in zip(first, second):
+            self.assertEqual(left.read_bytes(), right.read_bytes())
+    
+    def test_schemas_give_same_totals(self):
+        totals = {}
+        for schema in ('modern', 'legacy', 'mixed'):
+            folder = self.folder / schema
+            generate_reports(folder, GeneratorSpec(days=6, countries=5, provinces=3, province_countries=2, schema=schema))
+            processed = self._process(folder)
+            self.assertEqual(processed['location'].nunique(), 5)
+            totals[schema] = processed.groupby('location')['total_cases'].max().sort_index().tolist()
+        
+        self.assertEqual(totals['modern'], totals['legacy'])
+        self.assertEqual(totals['modern'], totals['mixed'])
+    
+    def test_admin2_rows_aggregate_to_country(self):
+        generate_reports(self.folder, GeneratorSpec(days=2, countries=3, admin2=20))
+        
+        processed = self._process(self.folder)
+        
+        self.assertEqual(sorted(processed['location'].unique()), ['Country 001', 'Country 002', 'Country 003'])
+    
+    def test_unknown_schema(self):
+        with self.assertRaises(ValueError):
+            generate_reports(self.folder, GeneratorSpec(schema='other'))
+
+class TestMicroBenchmarks(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.WARNING)
+    
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+    
+    def test_run_tier(self):
+        results = run_tier(GeneratorSpec(days=5, countries=6), repeats=1,
+                           operations=['process_raw_data', 'compare_countries_cube'])
+        
+        self.assertEqual(list(results), ['process_raw_data', 'compare_countries_cube'])
+        self.assertEqual(results['process_raw_data']['rows'], 30)
+        self.assertGreater(results['process_raw_data']['peak_bytes'], 0)
+        self.assertLessEqual(results['process_raw_data']['min_seconds'], results['process_raw_data']['seconds'])
+    
+    def test_unknown_operation(self):
+        with self.assertRaises(ValueError):
+            run_tier(GeneratorSpec(days=2, countries=2), repeats=1, operations=['missing'])
+
+def _fake_api() -> Flask:
+    app = Flask(__name__)
+    
+    @app.route('/api/countries')
+    def countries():
+        return jsonify({'countries': ['France', "Côte d'Ivoire"]})
+    
+    @app.route('/api/dates/available')
+    def dates():
+        return jsonify({'dates': ['2021-01-01', '2021-01-02', '2021-01-03']})
+    
+    @app.route('/api/global')
+    def global_stats():
+        return jsonify({'total_cases': 1})
+    
+    @app.route('/api/countries/<country>')
+    def country(country):
+        if country == 'France':
+            return jsonify({'country': country})
+        return jsonify({'error': 'absent'}), 404
+    
+    return app
+
+class TestLoadTest(unittest.TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('global=2,country'), {'global': 2.0, 'country': 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix('unknown=1')
+        with self.assertRaises(ValueError):
+            parse_mix('global=0')
+    
+    def test_plan_is_deterministic(self):
+        mix = parse_mix('global=1,top-countries=1,country=1,filtered=1')
+        dates = ['2021-01-01', '2021-01-02', '2021-01-03']
+        plan = plan_requests(mix, ['France', "Côte d'Ivoire"], dates, 200, seed=7)
+        
+        self.assertEqual(plan, plan_requests(mix, ['France', "Côte d'Ivoire"], dates, 200, seed=7))
+        self.assertEqual({name for name, _ in plan}, {'global', 'top-countries', 'country', 'filtered'})
+        for name, path in plan:
+            if name == 'filtered':
+                start = path.split('start_date=')[1].split('&')[0]
+                end = path.split('end_date=')[1]
+                self.assertLess(start, end)
+            if name == 'country':
+                self.assertNotIn(' ', path)
+    
+    def test_summarize(self):
+        samples = [('global', 0.001 * position, 200) for position in range(1, 101)]
+        samples += [('country', 0.5, 404), ('country', 0.5, 0)]
+        
+        summary = summarize(samples, wall_seconds=2.0)
+        
+        self.assertEqual(summary['all']['requests'], 102)
+        self.assertEqual(summary['all']['errors'], 2)
+        self.assertEqual(summary['global']['error_rate'], 0.0)
+        self.assertEqual(summary['country']['error_rate'], 1.0)
+        self.assertEqual(summary['global']['requests_per_second'], 50.0)
+        self.assertAlmostEqual(summary['global']['p50_ms'], 50.5)
+        self.assertAlmostEqual(summary['global']['p99_ms'], 99.01)
+    
+    def test_run_load_with_client(self):
+        target = ClientTarget(_fake_api())
+        countries, dates = discover(target.session())
+        plan = plan_requests(parse_mix('global=1,country=1'), countries, dates, 60)
+        
+        samples, wall_seconds = run_load(target, plan, concurrency=4)
+        summary = summarize(samples, wall_seconds)
+        
+        self.assertEqual(len(samples), 60)
+        self.assertEqual(summary['global']['errors'], 0)
+        # « Côte d'Ivoire » n'existe pas dans la fausse API : ses requêtes sont des erreurs
+        self.assertGreater(summary['country']['errors'], 0)
+    
+    def test_run_load_over_http(self):
+        server = make_server('127.0.0.1', 0, _fake_api(), threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            target = HttpTarget(f"http://127.0.0.1:{server.server_port}")
+            countries, dates = discover(target.session())
+            
+            samples, _ = run_load(target, plan_requests(parse_mix('global=1,country=1'), countries, dates, 20), concurrency=2)
+            
+            self.assertEqual(countries, ['France', "Côte d'Ivoire"])
+            self.assertEqual(len(samples), 20)
+            self.assertEqual({status for name, _, status in samples if name == 'global'}, {200})
+        finally:
+            server.shutdown()
+            thread.join()
+    
+    def test_throughput_drop_is_a_regression(self):
+        baseline = {'client': {'all': {'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0, 'requests_per_second': 500.0}}}
+        results = {'client': {'all': {'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0, 'requests_per_second': 300.0}}}
+        
+        regressions = find_regressions(results, baseline, LOAD_METRICS, 0.25, HIGHER_IS_BETTER)
+        
+        self.assertEqual([item['metric'] for item in regressions], ['requests_per_second'])
+        self.assertEqual(find_regressions(baseline, results, LOAD_METRICS, 0.25, HIGHER_IS_BETTER), [])
+
+BUDGET_SPEC = GeneratorSpec(days=10, countries=190, provinces=20, province_countries=10, admin2=3000)
+
+class TestMemoryReport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.WARNING)
+        cls.folder = Path(tempfile.mkdtemp())
+        generate_reports(cls.folder, GeneratorSpec(days=20, countries=40, provinces=5, province_countries=4))
+        cls.report = memory_report(cls.folder)
+    
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(cls.folder, ignore_errors=True)
+    
+    def test_stages(self):
+        self.assertEqual(list(self.report), [
+            'read_csv_files', 'concat', 'aggregate_raw_data', '_calculate_new_values',
+            'finalize_country_data', 'aggregate_copy_fallback', 'total'
+        ])
+        self.assertEqual(self.report['read_csv_files']['rows'], 20 * (36 + 4 * 5))
+        self.assertEqual(self.report['total']['rows'], 20 * 40)
+        for name, entry in self.report.items():
+            self.assertGreater(entry['peak_bytes'], 0, name)
+            self.assertGreater(entry['frame_bytes'], 0, name)
+    
+    def test_total_matches_processed_frame(self):
+        processed = DataProcessor().process_raw_data(DataLoader(self.folder, self.folder / "cache.csv").load_multiple_csv_files())
+        total = self.report['total']
+        
+        self.assertEqual(total['frame_bytes'], memory_footprint(processed))
+        self.assertEqual(total['files'], 20)
+        # Le chemin df.copy() est mesuré à part et n'entre pas dans le total
+        pipeline = [entry for name, entry in self.report.items() if name not in ('total', 'aggregate_copy_fallback')]
+        self.assertGreaterEqual(total['peak_bytes'], max(entry['peak_bytes'] for entry in pipeline))
+        self.assertLess(total['retained_bytes'], total['peak_bytes'])
+    
+    def test_budget_exceeded(self):
+        self.assertIn('budget', check_budget(self.report, 1024))
+    
+    def test_memory_budget_per_1000_files(self):
+        # Rapports générés de taille réaliste (~3 400 lignes par fichier, environ 300 Mo pour 1 000 fichiers) :
+        # mesure déterministe, contrairement aux rapports de data/ qui approchent le budget
+        folder = self.folder / "budget"
+        generate_reports(folder, BUDGET_SPEC)
+        report = memory_report(folder)
+        
+        self.assertEqual(report['total']['files'], BUDGET_SPEC.days)
+        self.assertGreater(report['read_csv_files']['rows'] / report['total']['files'], 3000)
+        self.assertIsNone(check_budget(report, DEFAULT_BUDGET_PER_1000_FILES))
+    
+    def test_top_allocations(self):
+        with MemoryTracker(top=3) as tracker:
+            tracker.stage('allocate', lambda: bytearray(4 * 1024 * 1024))
+        
+        entry = tracker.stages['allocate']
+        self.assertGreaterEqual(entry['retained_bytes'], 4 * 1024 * 1024)
+        self.assertEqual(len(entry['top']), 3)
+        self.assertIn('test_bench.py', entry['top'][0])
+
+class TestBaseline(unittest.TestCase):
+    def test_find_regressions(self):
+        baseline = {'small': {
+            'fast': {'min_seconds': 0.001, 'peak_bytes': 1000},
+            'slow': {'min_seconds': 0.5, 'peak_bytes': 10 * 1024 * 1024}
+        }}
+        results = {'small': {
+            'fast': {'min_seconds': 0.003, 'peak_bytes': 1000},
+            'slow': {'min_seconds': 0.8, 'peak_bytes': 10 * 1024 * 1024},
+            'new': {'min_seconds': 1.0, 'peak_bytes': 0}
+        }}
+        
+        regressions = find_regressions(results, baseline, REGRESSION_METRICS, 0.25)
+        
+        # « fast » triple mais reste sous l'écart absolu minimal ; « new » n'a pas de référence
+        self.assertEqual([(item['name'], item['metric']) for item in regressions], [('slow', 'min_seconds')])
+        self.assertEqual(find_regressions(results, baseline, REGRESSION_METRICS, 1.0), [])
+    
+    def test_save_and_load(self):
+        folder = Path(tempfile.mkdtemp())
+        try:
+            path = folder / "nested" / "micro.json"
+            save_baseline(path, {'small': {'op': {'seconds': 0.1}}}, {'repeats': 3})
+            
+            payload = load_baseline(path)
+            
+            self.assertEqual(payload['results'], {'small': {'op': {'seconds': 0.1}}})
+            self.assertEqual(payload['meta']['repeats'], 3)
+            self.assertIn('pandas', payload['meta'])
+            self.assertIsNone(load_baseline(folder / "absent.json"))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
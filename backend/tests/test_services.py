@@ -1,13 +1,33 @@
 import unittest
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
+import shutil
 import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.services.csv_cache import TMP_GRACE_SECONDS, CsvCache
+from src.services.data_cube import DataCube
 from src.services.data_loader import DataLoader
 from src.services.data_processor import DataProcessor
+from src.services.dataset_manager import DatasetManager
+from src.services.dataset_watcher import DatasetWatcher
+from src.services.location_index import LocationIndex, sort_for_index
+from src.services.rankings import RankingTable
+from src.services.shared_store import SharedDatasetStore
+from src.services.schema import compact_counts, memory_footprint
+from src.utils.file_lock import FileLock, FileLockTimeout
+from src.utils.metrics import MetricsRegistry, rows_processed, stage_duration, timed
+from src.utils.query_cache import QueryCache, estimate_size
+from src.utils.single_flight import SingleFlight, SingleFlightTimeout
+from src.utils.serialization import FILTERED_COLUMNS, LATEST_COLUMNS, PERIOD_COLUMNS, TIMELINE_COLUMNS, frame_to_records, top_countries_columns
 from src.models.covid_data import CovidCountryData, GlobalStats
 from config import Config
 
@@ -28,6 +48,164 @@ class TestDataLoader(unittest.TestCase):
             if df is not None:
                 self.assertFalse(df.empty)
                 self.assertIn('file_date', df.columns)
+    
+    def test_parallel_load_matches_serial_load(self):
+        serial = DataLoader(Config.DATA_FOLDER, Config.CSV_FILE).load_multiple_csv_files()
+        parallel = DataLoader(Config.DATA_FOLDER, Config.CSV_FILE, workers=2).load_multiple_csv_files()
+        
+        pd.testing.assert_frame_equal(serial, parallel)
+        self.assertTrue(serial['file_date'].is_monotonic_increasing)
+    
+    def test_unreadable_file_is_skipped(self):
+        tmp_dir = Path(tempfile.mkdtemp())
+        try:
+            shutil.copy(Config.DATA_FOLDER / "01-01-2021.csv", tmp_dir / "01-01-2021.csv")
+            (tmp_dir / "01-02-2021.csv").mkdir()
+            
+            df = DataLoader(tmp_dir, tmp_dir / "missing.csv", workers=2).load_multiple_csv_files()
+            
+            self.assertIsNotNone(df)
+            self.assertEqual(df['file_date'].nunique(), 1)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    def test_compact_schema(self):
+        csv_file = Config.DATA_FOLDER / "01-01-2021.csv"
+        full = pd.read_csv(csv_file)
+        df = self.loader.parse_csv_file(csv_file)
+        
+        self.assertNotIn('Combined_Key', df.columns)
+        self.assertIsInstance(df['Country_Region'].dtype, pd.CategoricalDtype)
+        self.assertEqual(df['Confirmed'].dtype.kind, 'i')
+        self.assertLessEqual(df['Deaths'].dtype.itemsize, 4)
+        self.assertIn(str(df['Recovered'].dtype), ['Int8', 'Int16', 'Int32', 'Int64'])
+        self.assertEqual(int(df['Confirmed'].sum()), int(full['Confirmed'].sum()))
+        self.assertLess(memory_footprint(df) * 4, memory_footprint(full))
+    
+    def test_compact_counts_picks_smallest_safe_type(self):
+        self.assertEqual(compact_counts(pd.Series([1.0, 120.0])).dtype, 'int8')
+        self.assertEqual(compact_counts(pd.Series([1.0, 40000.0])).dtype, 'int32')
+        self.assertEqual(str(compact_counts(pd.Series([1.0, None])).dtype), 'Int8')
+        self.assertEqual(compact_counts(pd.Series([1.5, 2.0])).dtype, 'float64')
+
+class TestCsvCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.csv_path = self.tmp_dir / "01-01-2021.csv"
+        shutil.copy(Config.DATA_FOLDER / "01-01-2021.csv", self.csv_path)
+        self.cache = CsvCache(self.tmp_dir / "cache")
+        self.reads = 0
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def _reader(self, path):
+        self.reads += 1
+        return pd.read_csv(path)
+    
+    def test_second_read_uses_cache(self):
+        first = self.cache.read_csv(self.csv_path, self._reader)
+        second = self.cache.read_csv(self.csv_path, self._reader)
+        
+        self.assertEqual(self.reads, 1)
+        pd.testing.assert_frame_equal(first, second)
+    
+    def test_touched_file_with_same_content_stays_cached(self):
+        self.cache.read_csv(self.csv_path, self._reader)
+        stat = self.csv_path.stat()
+        os.utime(self.csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        
+        self.cache.read_csv(self.csv_path, self._reader)
+        
+        self.assertEqual(self.reads, 1)
+    
+    def test_modified_file_invalidates_entry(self):
+        self.cache.read_csv(self.csv_path, self._reader)
+        with open(self.csv_path, 'a', encoding='utf-8') as f:
+            f.write(",,,Atlantis,2021-01-02 05:22:33,0,0,10,1,,,Atlantis,,\n")
+        
+        df = self.cache.read_csv(self.csv_path, self._reader)
+        
+        self.assertEqual(self.reads, 2)
+        self.assertIn('Atlantis', df['Country_Region'].tolist())
+    
+    def test_prune_removes_entries_of_deleted_files(self):
+        self.cache.read_csv(self.csv_path, self._reader)
+        self.csv_path.unlink()
+        
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertEqual([path.suffix for path in (self.tmp_dir / "cache").iterdir()], ['.lock'])
+    
+    def test_prune_keeps_temporary_files_being_written(self):
+        self.cache.read_csv(self.csv_path, self._reader)
+        data_path, _ = self.cache._entry_paths(self.csv_path)
+        writing = data_path.with_name(f"{data_path.name}.1.tmp")
+        abandoned = data_path.with_name(f"{data_path.name}.2.tmp")
+        writing.write_bytes(b"partial")
+        abandoned.write_bytes(b"partial")
+        old = time.time() - TMP_GRACE_SECONDS - 60
+        os.utime(abandoned, (old, old))
+        
+        self.assertEqual(self.cache.prune(), 0)
+        self.assertTrue(writing.exists())
+        self.assertFalse(abandoned.exists())
+        
+        self.cache.clear()
+        self.assertEqual(sorted(path.suffix for path in (self.tmp_dir / "cache").iterdir()), ['.lock', '.tmp'])
+    
+    def test_prune_and_clear_keep_held_locks(self):
+        self.cache.read_csv(self.csv_path, self._reader)
+        self.cache.lock_timeout = 0.05
+        with self.cache.lock(self.csv_path):
+            with open(self.csv_path, 'a') as f:
+                f.write("\n")
+            self.assertEqual(self.cache.prune(), 1)
+            self.assertEqual(self.cache.clear(), 0)
+            
+            with self.assertRaises(FileLockTimeout):
+                self.cache.lock(self.csv_path).acquire()
+    
+    def test_warm_writes_under_entry_lock(self):
+        self.cache.lock_timeout = 0.05
+        with self.cache.lock(self.csv_path):
+            stats = self.cache.warm([self.csv_path], self._reader)
+        
+        self.assertEqual(stats, {'cached': 0, 'written': 0, 'failed': 1})
+        self.assertEqual(self.reads, 0)
+        
+        self.assertEqual(self.cache.warm([self.csv_path], self._reader)['written'], 1)
+        self.assertIsNotNone(self.cache.load(self.csv_path))
+    
+    def test_loader_with_cache_matches_plain_loader(self):
+        plain = DataLoader(Config.DATA_FOLDER, Config.CSV_FILE).load_multiple_csv_files()
+        cached_loader = DataLoader(Config.DATA_FOLDER, Config.CSV_FILE, csv_cache=self.cache)
+        cached_loader.load_multiple_csv_files()
+        
+        pd.testing.assert_frame_equal(plain, cached_loader.load_multiple_csv_files())
+    
+    def test_read_waits_for_entry_written_by_lock_holder(self):
+        lock = self.cache.lock(self.csv_path)
+        lock.acquire()
+        results = []
+        reader = threading.Thread(target=lambda: results.append(self.cache.read_csv(self.csv_path, self._reader)))
+        reader.start()
+        
+        time.sleep(0.1)
+        self.cache.store(self.csv_path, pd.read_csv(self.csv_path))
+        lock.release()
+        reader.join()
+        
+        self.assertEqual(self.reads, 0)
+        self.assertEqual(len(results), 1)
+    
+    def test_lock_timeout_falls_back_to_direct_read(self):
+        self.cache.lock_timeout = 0.05
+        with self.cache.lock(self.csv_path):
+            df = self.cache.read_csv(self.csv_path, self._reader)
+        
+        self.assertEqual(self.reads, 1)
+        self.assertIsNone(self.cache.load(self.csv_path))
+        self.assertFalse(df.empty)
 
 class TestDataProcessor(unittest.TestCase):
     def setUp(self):
@@ -78,6 +256,654 @@ class TestDataProcessor(unittest.TestCase):
         self.assertEqual(country_timeline.country, 'France')
         self.assertEqual(len(country_timeline.data), 1)
         self.assertIsInstance(country_timeline.data[0], CovidCountryData)
+    
+    def test_get_filtered_data_keeps_last_values_in_window(self):
+        processed_data = DataLoader(Config.DATA_FOLDER, Config.CSV_FILE).load_data()
+        processed_data = self.processor.process_raw_data(processed_data)
+        
+        filtered = self.processor.get_filtered_data(processed_data, end_date=pd.Timestamp('2022-01-05'))
+        france = filtered[filtered['location'] == 'France'].iloc[0]
+        
+        self.assertEqual(france['date'], pd.Timestamp('2022-01-05'))
+        self.assertTrue((filtered['date'] <= pd.Timestamp('2022-01-05')).all())
+    
+    def test_get_top_countries(self):
+        processed_data = self.processor.process_raw_data(self.test_data)
+        latest = self.processor.get_latest_data(processed_data)
+        
+        top = self.processor.get_top_countries(latest, 'total_cases', 2)
+        
+        self.assertEqual(top['location'].tolist(), ['Italy', 'France'])
+
+class TestLocationIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.processor = DataProcessor()
+        raw_data = DataLoader(Config.DATA_FOLDER, Config.CSV_FILE).load_data()
+        cls.data = sort_for_index(cls.processor.process_raw_data(raw_data))
+        cls.index = LocationIndex.build(cls.data)
+    
+    def test_index_matches_full_scan(self):
+        for country in ['France', 'germany', 'US', 'Taiwan*']:
+            indexed = self.processor.get_country_data(self.data, country, 3, index=self.index)
+            scanned = self.processor.get_country_data(self.data, country, 3)
+            self.assertEqual(indexed.to_dict(), scanned.to_dict())
+    
+    def test_ranges_are_contiguous(self):
+        start, stop = self.index.get_range('France')
+        
+        self.assertTrue((self.data['location'].iloc[start:stop] == 'France').all())
+        self.assertEqual(stop - start, (self.data['location'] == 'France').sum())
+    
+    def test_aliases_and_codes(self):
+        self.assertEqual(self.index.resolve('USA'), 'US')
+        self.assertEqual(self.index.resolve('south korea'), 'Korea, South')
+        self.assertEqual(self.index.resolve('taiwan'), 'Taiwan*')
+        self.assertEqual(self.index.resolve('FRA'), 'France')
+    
+    def test_prefix_and_substring_fallback(self):
+        self.assertEqual(self.index.resolve('germ'), 'Germany')
+        self.assertEqual(self.index.search('united'), ['United Arab Emirates', 'United Kingdom'])
+        self.assertIn('Papua New Guinea', self.index.search('guinea'))
+        self.assertIsNone(self.index.resolve('Atlantis'))
+        self.assertIsNone(self.index.resolve('germ', fuzzy=False))
+
+class TestDataCube(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.processor = DataProcessor()
+        raw_data = DataLoader(Config.DATA_FOLDER, Config.CSV_FILE).load_data()
+        # Trous de dates et valeurs manquantes pour exercer les masques
+        raw_data = raw_data[~((raw_data['Country_Region'] == 'France') & (raw_data['file_date'] == raw_data['file_date'].max()))]
+        raw_data = raw_data[~((raw_data['Country_Region'] == 'Italy') & (raw_data['file_date'] == raw_data['file_date'].min()))]
+        cls.data = sort_for_index(cls.processor.process_raw_data(raw_data))
+        cls.data.loc[cls.data['location'] == 'Germany', 'active_cases'] = pd.NA
+        cls.index = LocationIndex.build(cls.data)
+        cls.cube = DataCube.build(cls.data)
+    
+    def test_timeline_matches_pandas(self):
+        for country, days in [('France', 3), ('Italy', 30), ('germany', 2), ('US', -1)]:
+            expected = self.processor.get_country_timeline(self.data, country, days, index=self.index)
+            actual = self.processor.get_country_timeline(self.data, country, days, index=self.index, cube=self.cube)
+            self.assertEqual(frame_to_records(actual, TIMELINE_COLUMNS), frame_to_records(expected, TIMELINE_COLUMNS))
+        
+        self.assertIsNone(self.processor.get_country_timeline(self.data, 'Atlantis', index=self.index, cube=self.cube))
+    
+    def test_snapshots_match_pandas(self):
+        dates = sorted(self.data['date'].unique())
+        windows = [(None, None), (dates[1], None), (None, dates[-2]), (dates[1], dates[1]), (dates[-1] + pd.Timedelta(days=1), None)]
+        for start, end in windows:
+            expected = self.processor.get_filtered_data(self.data, start, end)
+            actual = self.processor.get_filtered_data(self.data, start, end, cube=self.cube)
+            self.assertEqual(frame_to_records(actual, FILTERED_COLUMNS), frame_to_records(expected, FILTERED_COLUMNS))
+        
+        latest = self.processor.get_latest_data(self.data)
+        self.assertEqual(
+            frame_to_records(self.processor.get_latest_data(self.data, cube=self.cube), LATEST_COLUMNS),
+            frame_to_records(latest, LATEST_COLUMNS)
+        )
+    
+    def test_period_increments_match_pandas(self):
+        dates = sorted(self.data['date'].unique())
+        for granularity in ['week', 'month']:
+            for start, end, locations in [(None, None, None), (dates[1], dates[-1], ['France', 'Italy']), (dates[-1], dates[0], None)]:
+                expected = self.processor.get_period_increments(self.data, granularity, start, end, locations)
+                actual = self.processor.get_period_increments(self.data, granularity, start, end, locations, cube=self.cube)
+                self.assertEqual(frame_to_records(actual, PERIOD_COLUMNS), frame_to_records(expected, PERIOD_COLUMNS))
+    
+    def test_window_sum_uses_prefix_sums(self):
+        start, stop = 1, len(self.cube.dates)
+        france = self.cube.location_positions['France']
+        expected = np.nansum(self.cube.metric('new_cases')[france, start:stop])
+        self.assertEqual(self.cube.window_sum('new_cases', start, stop)[france], expected)
+    
+    def test_rankings_match_nlargest(self):
+        rankings = RankingTable.build(self.cube)
+        dates = sorted(self.data['date'].unique())
+        as_of_dates = [None, dates[0], dates[1] + pd.Timedelta(days=1), dates[0] - pd.Timedelta(days=1)]
+        for metric in ['total_cases', 'new_deaths', 'active_cases']:
+            for as_of in as_of_dates:
+                snapshot = self.processor.get_filtered_data(self.data, end_date=as_of)
+                spec = top_countries_columns(metric)
+                for limit in [5, -1]:
+                    expected = self.processor.get_top_countries(snapshot, metric, limit)
+                    actual = self.processor.get_top_countries(snapshot, metric, limit, rankings=rankings, as_of=as_of)
+                    self.assertEqual(frame_to_records(actual, spec), frame_to_records(expected, spec))
+                
+                # Au-delà du nombre de pays, nlargest trie sans garantir l'ordre des égalités
+                expected = frame_to_records(self.processor.get_top_countries(snapshot, metric, 1000), spec)
+                actual = frame_to_records(self.processor.get_top_countries(snapshot, metric, 1000, rankings=rankings, as_of=as_of), spec)
+                self.assertEqual([row['value'] for row in actual], [row['value'] for row in expected])
+                self.assertEqual(sorted(row['country'] for row in actual), sorted(row['country'] for row in expected))
+    
+    def test_global_stats_match_pandas(self):
+        expected = self.processor.get_global_stats(self.data)
+        actual = self.processor.get_global_stats(self.data, cube=self.cube)
+        self.assertEqual(actual.to_dict(), expected.to_dict())
+    
+    def test_comparison_matches_pandas(self):
+        countries = ['France', 'italy', 'Germany', 'Atlantis']
+        for metric in ['total_cases', 'new_deaths', 'active_cases', 'unknown']:
+            expected = self.processor._compare_countries_frame(self.data, countries, metric, index=self.index)
+            pivoted = self.processor.compare_countries(self.data, countries, metric)
+            actual = self.processor.compare_countries(self.data, countries, metric, index=self.index, cube=self.cube)
+            self.assertEqual(actual.to_dict(), expected.to_dict())
+            self.assertEqual(pivoted.to_dict(), expected.to_dict())
+    
+    def test_aligned_comparison(self):
+        countries = ['France', 'Italy', 'Atlantis']
+        by_date = self.processor.compare_countries(self.data, countries, 'total_cases', index=self.index, cube=self.cube, align='date')
+        result = by_date.to_dict()
+        
+        self.assertEqual(result['axis'], [str(date)[:10] for date in sorted(self.data['date'].unique())])
+        self.assertEqual(result['countries_found'], 2)
+        france = result['comparison']['France']['values']
+        self.assertEqual(len(france), len(result['axis']))
+        self.assertIsNone(france[-1])
+        self.assertIsNone(result['comparison']['Italy']['values'][0])
+        
+        by_day = self.processor.compare_countries(self.data, countries, 'total_cases', index=self.index, cube=self.cube,
+                                                  align='outbreak_day', outbreak_threshold=1)
+        result = by_day.to_dict()
+        self.assertEqual(result['axis'][0], 0)
+        for country in ('France', 'Italy'):
+            series = result['comparison'][country]
+            self.assertEqual(series['values'][0], self.processor.get_country_timeline(self.data, country, 1000, index=self.index)['total_cases'].iloc[0])
+            self.assertIsNotNone(series['outbreak_date'])
+    
+    def test_countries_list_matches_pandas(self):
+        self.assertEqual(
+            self.processor.get_countries_list(self.data, cube=self.cube),
+            self.processor.get_countries_list(self.data)
+        )
+    
+    def test_forward_fill_and_mask(self):
+        france = self.cube.location_positions['France']
+        self.assertFalse(self.cube.observed[france, -1])
+        
+        filled = self.cube.forward_filled('total_cases')
+        self.assertEqual(filled[france, -1], self.cube.metric('total_cases')[france, -2])
+        self.assertTrue(np.isnan(self.cube.metric('total_cases')[france, -1]))
+        
+        italy = self.cube.location_positions['Italy']
+        self.assertTrue(np.isnan(filled[italy, 0]))
+    
+    def test_to_frame_rebuilds_processed_data(self):
+        frame = self.cube.to_frame()
+        expected = self.data.reset_index(drop=True)
+        
+        pd.testing.assert_frame_equal(frame.drop(columns='population'), expected.drop(columns='population'))
+
+class TestDatasetManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        for csv_file in sorted(Config.DATA_FOLDER.glob("*.csv"))[:2]:
+            shutil.copy(csv_file, self.tmp_dir / csv_file.name)
+        self.loader = DataLoader(self.tmp_dir, self.tmp_dir / "missing.csv")
+        self.manager = DatasetManager(self.loader, DataProcessor(), max_age=timedelta(hours=1))
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_dataset_is_reused_when_files_unchanged(self):
+        first = self.manager.get_dataset()
+        second = self.manager.get_dataset()
+        
+        self.assertIsNotNone(first)
+        self.assertIs(first, second)
+        self.assertEqual(first.data['date'].nunique(), 2)
+        self.assertEqual(len(first.latest), first.global_stats.countries_count)
+        self.assertEqual(first.global_stats.total_cases, int(first.latest['total_cases'].sum()))
+    
+    def test_dataset_is_rebuilt_when_file_added(self):
+        first = self.manager.get_dataset()
+        extra = sorted(Config.DATA_FOLDER.glob("*.csv"))[2]
+        shutil.copy(extra, self.tmp_dir / extra.name)
+        
+        second = self.manager.get_dataset()
+        
+        self.assertNotEqual(first.version, second.version)
+        self.assertEqual(second.data['date'].nunique(), 3)
+    
+    def test_dataset_is_rebuilt_when_expired(self):
+        first = self.manager.get_dataset()
+        self.manager.max_age = timedelta(seconds=-1)
+        
+        second = self.manager.get_dataset()
+        
+        self.assertIsNot(first, second)
+        self.assertEqual(first.version, second.version)
+    
+    def _copy(self, file_name):
+        shutil.copy(Config.DATA_FOLDER / file_name, self.tmp_dir / file_name)
+    
+    def _full_rebuild(self):
+        return DatasetManager(self.loader, DataProcessor()).get_dataset().data
+    
+    def test_incremental_ingestion_matches_full_rebuild(self):
+        for csv_file in self.tmp_dir.glob("*.csv"):
+            csv_file.unlink()
+        self._copy("01-01-2021.csv")
+        self._copy("01-01-2023.csv")
+        self.manager.get_dataset()
+        
+        self._copy("01-05-2022.csv")
+        self._copy("01-16-2023.csv")
+        dataset = self.manager.get_dataset()
+        
+        self.assertEqual(dataset.build_mode, 'incremental')
+        pd.testing.assert_frame_equal(dataset.data, self._full_rebuild())
+    
+    def test_incremental_ingestion_of_changed_file_matches_full_rebuild(self):
+        self._copy("01-05-2022.csv")
+        self._copy("01-16-2023.csv")
+        self.manager.get_dataset()
+        changed = self.tmp_dir / "01-05-2022.csv"
+        df = pd.read_csv(changed)
+        df.loc[df['Country_Region'] == 'France', 'Confirmed'] += 1000
+        df = df[df['Country_Region'] != 'Germany']
+        df.to_csv(changed, index=False)
+        
+        dataset = self.manager.get_dataset()
+        
+        self.assertEqual(dataset.build_mode, 'incremental')
+        pd.testing.assert_frame_equal(dataset.data, self._full_rebuild())
+    
+    def test_removed_file_triggers_full_rebuild(self):
+        self.manager.get_dataset()
+        sorted(self.tmp_dir.glob("*.csv"))[0].unlink()
+        
+        dataset = self.manager.get_dataset()
+        
+        self.assertEqual(dataset.build_mode, 'full')
+        pd.testing.assert_frame_equal(dataset.data, self._full_rebuild())
+    
+    def test_no_data_returns_none(self):
+        empty_dir = self.tmp_dir / "empty"
+        empty_dir.mkdir()
+        manager = DatasetManager(DataLoader(empty_dir, empty_dir / "missing.csv"), DataProcessor())
+        
+        self.assertIsNone(manager.get_dataset())
+    
+    def test_concurrent_cold_requests_build_once(self):
+        builds = []
+        build = self.manager._build
+        self.manager._build = lambda *args, **kwargs: builds.append(1) or build(*args, **kwargs)
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.manager.get_dataset())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(len({id(dataset) for dataset in results}), 1)
+    
+    def test_slow_rebuild_serves_previous_dataset(self):
+        first = self.manager.get_dataset()
+        self.manager.max_age = timedelta(seconds=-1)
+        self.manager.build_timeout = 0.05
+        started = threading.Event()
+        release = threading.Event()
+        build = self.manager._build
+        
+        def slow_build(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return build(*args, **kwargs)
+        
+        self.manager._build = slow_build
+        leader = threading.Thread(target=self.manager.get_dataset)
+        leader.start()
+        started.wait(5)
+        
+        self.assertIs(self.manager.get_dataset(), first)
+        release.set()
+        leader.join()
+
+class TestDatasetWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        for csv_file in sorted(Config.DATA_FOLDER.glob("*.csv"))[:2]:
+            shutil.copy(csv_file, self.tmp_dir / csv_file.name)
+        self.manager = DatasetManager(DataLoader(self.tmp_dir, self.tmp_dir / "missing.csv"), DataProcessor())
+        self.watcher = DatasetWatcher(self.manager, interval=0.05, use_inotify=False)
+    
+    def tearDown(self):
+        self.watcher.stop(timeout=5)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def _add_file(self):
+        extra = sorted(Config.DATA_FOLDER.glob("*.csv"))[2]
+        shutil.copy(extra, self.tmp_dir / extra.name)
+    
+    def test_watched_requests_never_rebuild(self):
+        self.assertTrue(self.watcher.check())
+        self.manager.watched = True
+        first = self.manager.get_dataset()
+        self._add_file()
+        
+        self.assertIs(self.manager.get_dataset(), first)
+        self.assertTrue(self.watcher.check())
+        
+        second = self.manager.get_dataset()
+        self.assertNotEqual(first.version, second.version)
+        self.assertEqual(first.data['date'].nunique(), 2)
+        self.assertEqual(second.data['date'].nunique(), 3)
+        self.assertFalse(self.watcher.check())
+    
+    def test_background_thread_publishes_new_version(self):
+        self.watcher.start()
+        deadline = time.monotonic() + 10
+        while self.manager.status()['version'] is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        first = self.manager.status()
+        self._add_file()
+        
+        while self.manager.status()['version'] == first['version'] and time.monotonic() < deadline:
+            time.sleep(0.02)
+        
+        status = self.manager.status()
+        self.assertTrue(self.watcher.status()['running'])
+        self.assertNotEqual(status['version'], first['version'])
+        self.assertGreaterEqual(status['reloads'], 2)
+        self.assertIsNotNone(status['last_reload_seconds'])
+    
+    def test_stop_releases_manager(self):
+        self.watcher.start()
+        self.watcher.stop(timeout=5)
+        
+        self.assertFalse(self.watcher.status()['running'])
+        self.assertFalse(self.manager.watched)
+
+class TestSharedDatasetStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.data_dir = self.tmp_dir / "data"
+        self.data_dir.mkdir()
+        for csv_file in sorted(Config.DATA_FOLDER.glob("*.csv"))[:2]:
+            shutil.copy(csv_file, self.data_dir / csv_file.name)
+        self.leader = self._manager()
+        self.follower = self._manager()
+    
+    def tearDown(self):
+        self.leader.shared_store.release_leadership()
+        self.follower.shared_store.release_leadership()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def _manager(self):
+        loader = DataLoader(self.data_dir, self.data_dir / "missing.csv")
+        return DatasetManager(loader, DataProcessor(), build_timeout=5, shared_store=SharedDatasetStore(self.tmp_dir / "shared"))
+    
+    def _add_file(self):
+        extra = sorted(Config.DATA_FOLDER.glob("*.csv"))[2]
+        shutil.copy(extra, self.data_dir / extra.name)
+    
+    def test_follower_attaches_read_only_views(self):
+        built = self.leader.get_dataset()
+        attached = self.follower.get_dataset()
+        
+        self.assertEqual(self.leader.status()['shared_role'], 'leader')
+        self.assertEqual(self.follower.status()['shared_role'], 'follower')
+        self.assertEqual(attached.build_mode, 'shared')
+        self.assertEqual(attached.version, built.version)
+        self.assertIsInstance(attached.cube.values, np.memmap)
+        self.assertFalse(attached.cube.values.flags.writeable)
+        pd.testing.assert_frame_equal(attached.latest, built.latest)
+        pd.testing.assert_frame_equal(attached.rankings.top('total_cases', 10), built.rankings.top('total_cases', 10))
+        self.assertEqual(attached.global_stats.to_dict(), built.global_stats.to_dict())
+    
+    def test_follower_serves_from_views_without_long_frame(self):
+        built = self.leader.get_dataset()
+        attached = self.follower.get_dataset()
+        processor = DataProcessor()
+        
+        self.assertIsNone(attached.frame)
+        self.assertEqual(attached.memory_usage()['data'], 0)
+        self.assertEqual(attached.row_count, len(built.data))
+        self.assertEqual(attached.cube.date_list(), sorted(built.data['date'].dt.strftime('%Y-%m-%d').unique().tolist()))
+        self.assertEqual(attached.index.ranges, LocationIndex.build(built.data).ranges)
+        self.assertEqual(attached.index.lookup, LocationIndex.build(built.data).lookup)
+        processor.get_country_timeline(attached.frame, 'France', index=attached.index, cube=attached.cube)
+        processor.get_filtered_data(attached.frame, cube=attached.cube)
+        processor.get_period_increments(attached.frame, 'week', cube=attached.cube)
+        processor.compare_countries(attached.frame, ['France', 'Italy'], 'total_cases', index=attached.index, cube=attached.cube)
+        self.assertIsNone(attached.frame)
+        
+        pd.testing.assert_frame_equal(attached.data, built.data.reset_index(drop=True).astype({'population': float}))
+        self.assertIs(attached.data, attached.frame)
+    
+    def test_new_version_is_swapped_without_restart(self):
+        self.leader.get_dataset()
+        first = self.follower.get_dataset()
+        self._add_file()
+        
+        second = self.leader.reload()
+        self.assertIs(self.follower.reload(), self.follower.get_dataset())
+        
+        self.assertEqual(self.follower.get_dataset().version, second.version)
+        self.assertEqual(first.data['date'].nunique(), 2)
+        self.assertEqual(self.follower.get_dataset().data['date'].nunique(), 3)
+        self.assertEqual(sorted(path.name for path in (self.tmp_dir / "shared").iterdir() if path.is_dir()),
+                         sorted([first.version, second.version]))
+    
+    def test_follower_takes_over_when_leader_stops(self):
+        self.leader.get_dataset()
+        self.follower.get_dataset()
+        self.leader.shared_store.release_leadership()
+        
+        self._add_file()
+        dataset = self.follower.reload()
+        
+        self.assertEqual(self.follower.status()['shared_role'], 'leader')
+        self.assertEqual(dataset.data['date'].nunique(), 3)
+        self.assertEqual(self.follower.shared_store.read_manifest()['version'], dataset.version)
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return 42
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('key', compute))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while flight.shared < 4:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [42] * 5)
+        self.assertFalse(flight.in_flight('key'))
+    
+    def test_errors_are_shared_and_not_cached(self):
+        flight = SingleFlight()
+        
+        def fail():
+            raise ValueError('boom')
+        
+        with self.assertRaises(ValueError):
+            flight.do('key', fail)
+        self.assertEqual(flight.do('key', lambda: 'ok'), 'ok')
+    
+    def test_follower_times_out(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        leader = threading.Thread(target=lambda: flight.do('key', lambda: release.wait(5)))
+        leader.start()
+        while not flight.in_flight('key'):
+            time.sleep(0.01)
+        
+        with self.assertRaises(SingleFlightTimeout):
+            flight.do('key', lambda: None, timeout=0.05)
+        release.set()
+        leader.join()
+
+class TestFileLock(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_second_lock_times_out_while_held(self):
+        path = self.tmp_dir / "entry.lock"
+        with FileLock(path):
+            with self.assertRaises(FileLockTimeout):
+                FileLock(path, timeout=0.05).acquire()
+        
+        with FileLock(path, timeout=0.05):
+            self.assertTrue(path.exists())
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('latency_seconds', "Latence", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value, route='a')
+        
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE latency_seconds histogram', lines)
+        self.assertIn('latency_seconds_bucket{route="a",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{route="a",le="1"} 3', lines)
+        self.assertIn('latency_seconds_bucket{route="a",le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_sum{route="a"} 4.25', lines)
+        self.assertIn('latency_seconds_count{route="a"} 4', lines)
+    
+    def test_labels_are_escaped_and_collectors_rendered(self):
+        registry = MetricsRegistry()
+        registry.counter('events_total', "Événements").inc(2, name='a"b\\c')
+        registry.add_collector(lambda: [('size_bytes', 'gauge', "Taille", [('size_bytes', {}, 12)])])
+        
+        text = registry.render()
+        self.assertIn('events_total{name="a\\"b\\\\c"} 2', text)
+        self.assertIn('# TYPE size_bytes gauge\nsize_bytes 12', text)
+    
+    def test_timed_decorator_counts_rows(self):
+        before_count = stage_duration.count(stage='test_stage')
+        before_rows = rows_processed.value(stage='test_stage')
+        
+        @timed('test_stage')
+        def produce():
+            return pd.DataFrame({'value': range(5)})
+        
+        produce()
+        with timed('test_stage') as timer:
+            timer.rows = 3
+        
+        self.assertEqual(stage_duration.count(stage='test_stage'), before_count + 2)
+        self.assertEqual(rows_processed.value(stage='test_stage'), before_rows + 8)
+
+class TestQueryCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = QueryCache(max_entries=10)
+        calls = []
+        compute = lambda: calls.append(1) or len(calls)
+        
+        self.assertEqual(cache.get_or_compute('v1', 'top', {'metric': 'total_cases', 'limit': 5}, compute), 1)
+        self.assertEqual(cache.get_or_compute('v1', 'top', {'limit': 5, 'metric': ' total_cases '}, compute), 1)
+        self.assertEqual(cache.get_or_compute('v1', 'top', {'metric': 'total_cases', 'limit': 10}, compute), 2)
+        
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 2, 2))
+        self.assertEqual(stats['hit_rate'], 0.3333)
+    
+    def test_cached_none_and_version_change(self):
+        cache = QueryCache(max_entries=10)
+        calls = []
+        
+        for _ in range(2):
+            cache.get_or_compute('v1', 'timeline', {'country': 'atlantis'}, lambda: calls.append(1))
+        self.assertEqual(len(calls), 1)
+        
+        cache.get_or_compute('v2', 'timeline', {'country': 'atlantis'}, lambda: calls.append(1))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.stats()['entries'], 1)
+    
+    def test_stale_put_after_swap(self):
+        served = {'version': 'v1'}
+        cache = QueryCache(max_entries=10, current_version=lambda: served['version'])
+        cache.get_or_compute('v1', 'm', {'key': 'a'}, lambda: 'v1-a')
+        
+        # Le dataset passe en v2 pendant qu'une requête épinglée sur v1 calcule encore
+        served['version'] = 'v2'
+        cache.get_or_compute('v2', 'm', {'key': 'a'}, lambda: 'v2-a')
+        cache.get_or_compute('v1', 'm', {'key': 'b'}, lambda: 'v1-b')
+        
+        stats = cache.stats()
+        self.assertEqual((stats['version'], stats['entries'], stats['stale_puts']), ('v2', 1, 1))
+        self.assertEqual(cache.get_or_compute('v2', 'm', {'key': 'a'}, lambda: 'recomputed'), 'v2-a')
+    
+    def test_stale_put_without_version_source(self):
+        cache = QueryCache(max_entries=10)
+        cache.get_or_compute('v1', 'm', {}, lambda: 1)
+        cache.get_or_compute('v2', 'm', {}, lambda: 2)
+        cache.get_or_compute('v1', 'm', {}, lambda: 3)
+        
+        self.assertEqual(cache.stats()['version'], 'v2')
+        self.assertEqual(cache.get_or_compute('v2', 'm', {}, lambda: 4), 2)
+    
+    def test_lru_eviction_by_entries_and_bytes(self):
+        cache = QueryCache(max_entries=2)
+        for key in ['a', 'b']:
+            cache.get_or_compute('v1', 'm', {'key': key}, lambda: key)
+        cache.get_or_compute('v1', 'm', {'key': 'a'}, lambda: 'recomputed')
+        cache.get_or_compute('v1', 'm', {'key': 'c'}, lambda: 'c')
+        
+        self.assertEqual(cache.get_or_compute('v1', 'm', {'key': 'a'}, lambda: 'recomputed'), 'a')
+        self.assertEqual(cache.get_or_compute('v1', 'm', {'key': 'b'}, lambda: 'recomputed'), 'recomputed')
+        self.assertEqual(cache.stats()['evictions'], 2)
+        
+        frame = pd.DataFrame({'value': np.arange(1000)})
+        cache = QueryCache(max_entries=10, max_bytes=estimate_size(frame) + 100)
+        cache.get_or_compute('v1', 'm', {'key': 1}, lambda: frame)
+        cache.get_or_compute('v1', 'm', {'key': 2}, lambda: frame)
+        self.assertEqual(cache.stats()['entries'], 1)
+        self.assertLessEqual(cache.stats()['bytes'], cache.max_bytes)
+    
+    def test_ttl_and_disabled(self):
+        cache = QueryCache(max_entries=10, ttl=0.01)
+        cache.get_or_compute('v1', 'm', {}, lambda: 1)
+        time.sleep(0.02)
+        self.assertEqual(cache.get_or_compute('v1', 'm', {}, lambda: 2), 2)
+        self.assertEqual(cache.stats()['expirations'], 1)
+        
+        disabled = QueryCache(max_entries=0)
+        self.assertEqual(disabled.get_or_compute('v1', 'm', {}, lambda: 3), 3)
+        self.assertEqual(disabled.stats()['misses'], 0)
+
+class TestSerialization(unittest.TestCase):
+    def test_frame_to_records_handles_missing_values(self):
+        df = pd.DataFrame({
+            'location': ['France', 'Italy'],
+            'total_cases': pd.array([10, 20], dtype='Int32'),
+            'new_cases': [1.0, np.nan],
+            'total_deaths': [1, 2],
+            'new_deaths': [0, 1],
+            'total_recovered': pd.array([5, None], dtype='Int32'),
+            'active_cases': [np.nan, 3.0],
+            'date': pd.to_datetime(['2021-01-01', None])
+        })
+        
+        records = frame_to_records(df, LATEST_COLUMNS)
+        
+        self.assertEqual(records[0], {
+            'country': 'France', 'total_cases': 10, 'new_cases': 1, 'total_deaths': 1, 'new_deaths': 0,
+            'total_recovered': 5, 'active_cases': None, 'last_update': '2021-01-01T00:00:00'
+        })
+        self.assertEqual(records[1]['new_cases'], 0)
+        self.assertIsNone(records[1]['total_recovered'])
+        self.assertIsNone(records[1]['last_update'])
+        self.assertIsInstance(records[0]['total_cases'], int)
 
 class TestCovidModels(unittest.TestCase):
     def test_covid_country_data(self):